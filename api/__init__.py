@@ -3,6 +3,7 @@
 """
 
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from api.resources import init_resources
 
 from config import ProductionConfig, TestingConfig, DevelopmentConfig
@@ -18,6 +19,23 @@ def create_app():
     The list of routes and the initialization method for them can be found here: `api.resources`
 
     The database initialization methods can be found here: `api.db`
+
+    The background threads can be found here: `api.background`
+
+    The in-process caches can be found here: `api.cache`
+
+    The write-behind counters can be found here: `api.counters`
+
+    The JSON encoding of the responses can be found here: `api.serialization`
+
+    The timing of the requests and their metrics can be found here: `api.metrics`
+
+    The compression of the responses can be found here: `api.compression`
+
+    The ASGI variant of the app can be found here: `api.asgi`
+
+    Behind `PROXY_FIX_X_FOR` trusted proxies, the client IP is read from the `X-Forwarded-For` header
+    they set, see [ProxyFix](https://werkzeug.palletsprojects.com/en/2.2.x/middleware/proxy_fix/).
     """
 
     app = Flask(__name__)
@@ -33,6 +51,21 @@ def create_app():
 
     app.config.from_object(config)
 
+    if app.config['PROXY_FIX_X_FOR']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
+    from api.background import init_background_threads
+    init_background_threads(app)
+
+    from api.serialization import init_serialization
+    init_serialization(app)
+
+    from api.metrics import init_metrics
+    init_metrics(app)
+
+    from api.compression import init_compression
+    init_compression(app)
+
     if app.config['ENV'] == 'testing':
         from api.db import init_db_mock
         init_db_mock(app)
@@ -40,4 +73,17 @@ def create_app():
         from api.db import init_db
         init_db(app)
 
+    from api.db import init_db_commands
+    init_db_commands(app)
+
+    from api.cache import init_session_cache, init_token_denylist
+    init_token_denylist(app)
+    init_session_cache(app)
+
+    from api.passwords import init_password_hasher
+    init_password_hasher(app)
+
+    from api.counters import init_view_counter
+    init_view_counter(app)
+
     return app
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+""" ASGI module where the creation of the asyncio variant of the app occurs.
+
+The ASGI app serves the same routes as `api.create_app` (see `api.resources.constants.Routes`).
+The I/O bound routes listed in `api.asgi.views.ASYNC_VIEWS`, i.e. the login, the event search and the reads
+of one event, of one user and of the stats, await MongoDb and Redis through [motor](https://motor.readthedocs.io)
+and `redis.asyncio`, and the login awaits the process pool of the password hasher. All other routes,
+i.e. the lists, lookups, exports and the other writes, run the resources in worker threads on pymongo and redis.
+
+Run it with an ASGI server, e.g.:
+
+```bash
+$ uvicorn api.asgi:create_asgi_app --factory --workers 4
+```
+"""
+
+from api import create_app
+
+
+def create_asgi_app():
+    """This function initializes the ASGI app.
+
+    The Flask app is created with `api.create_app` and extended with the asyncio clients
+    of `api.db.init_async_db`, then wrapped by `api.asgi.app.AsgiApp`.
+
+    The Flask app is available as `app` of the ASGI app, and its test client sends the requests
+    through the ASGI app (see `api.asgi.testing`).
+    """
+
+    app = create_app()
+
+    if app.config['ENV'] == 'testing':
+        from api.db import init_async_db_mock
+        init_async_db_mock(app)
+    else:
+        from api.db import init_async_db
+        init_async_db(app)
+
+    from api.asgi.app import AsgiApp
+    from api.asgi.testing import AsgiTestClient
+
+    app.asgi_app = AsgiApp(app)
+    app.test_client_class = AsgiTestClient
+
+    return app.asgi_app
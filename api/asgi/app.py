@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+""" App module which holds the ASGI app wrapping the Flask app.
+
+Every request is matched against the routes of the Flask app (see `api.resources`):
+
+- Routes with a coroutine in `api.asgi.views.ASYNC_VIEWS` are served on the event loop,
+  inside a request context of the Flask app, so `request`, `current_app` and `make_response` work as usual.
+  They do not go through the WSGI middleware of the Flask app, so the ones applied by `api.create_app`
+  are applied to them here the same way: the `PROXY_FIX_X_FOR` trusted proxies and the timing of `api.metrics`.
+- All other routes are served by the Flask app in a worker thread of a pool sized by `ASGI_WORKER_THREADS`,
+  with the body of streamed responses (e.g. the NDJSON exports) sent chunk by chunk.
+"""
+
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.routing import RequestRedirect
+
+from api.asgi.views import ASYNC_VIEWS
+from api.metrics import record_response
+from api.metrics.spans import finish_request, start_request
+
+
+def build_environ(scope: dict, body: bytes):
+    """
+    This function builds the WSGI environment of an ASGI HTTP request, see
+    [PEP 3333](https://peps.python.org/pep-3333/) and the [ASGI spec](https://asgi.readthedocs.io/en/latest/specs/www.html).
+
+    __Returns:__
+
+    The WSGI environment
+    """
+
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f'HTTP/{scope["http_version"]}',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+
+        if name == 'CONTENT_LENGTH':
+            continue
+
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+
+    return environ
+
+
+class AsgiApp:
+    """
+    This class represents the ASGI app serving the routes of a Flask app.
+
+    __Parameters:__
+
+    app (app): The Flask app, initialized with the asyncio clients of `api.db.init_async_db`
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=app.config['ASGI_WORKER_THREADS'],
+                                           thread_name_prefix='asgi-worker')
+
+        x_for = app.config['PROXY_FIX_X_FOR']
+
+        self.proxy_fix = ProxyFix(_forwarded_environ, x_for=x_for) if x_for else None
+        self.timed = app.config['METRICS_ENABLED']
+        self.server_timing_enabled = app.config['SERVER_TIMING_ENABLED']
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        if scope['type'] != 'http':
+            raise ValueError(f'{scope["type"]} requests are not supported')
+
+        body = await self._read_body(receive)
+        environ = build_environ(scope, body)
+
+        view, view_args = self._match(environ)
+
+        if view is None:
+            await self._call_wsgi(environ, send)
+        else:
+            await self._call_view(view, view_args, environ, send)
+
+    def _match(self, environ):
+        adapter = self.app.url_map.bind_to_environ(environ, server_name=self.app.config['SERVER_NAME'])
+
+        try:
+            endpoint, view_args = adapter.match()
+        except (HTTPException, RequestRedirect):
+            return None, None
+
+        return ASYNC_VIEWS.get((endpoint, environ['REQUEST_METHOD'])), view_args
+
+    async def _call_view(self, view, view_args, environ, send):
+        # Timed from the same point as by `api.metrics.TimingMiddleware`, which wraps the `ProxyFix`
+        spans = start_request() if self.timed else None
+
+        if self.proxy_fix is not None:
+            environ = self.proxy_fix(environ, None)
+
+        with self.app.request_context(environ):
+            try:
+                try:
+                    response = self.app.preprocess_request()
+
+                    if response is None:
+                        response = await view(**view_args)
+                except Exception as e:
+                    response = self.app.handle_user_exception(e)
+
+                response = self.app.finalize_request(response)
+            except Exception as e:
+                response = self.app.handle_exception(e)
+
+            app_iter, status, headers = response.get_wsgi_response(environ)
+
+            if spans is not None:
+                finish_request()
+                record_response(self.app.metrics, environ, status, headers, spans, self.server_timing_enabled)
+
+            try:
+                await send({
+                    'type': 'http.response.start',
+                    'status': int(status.split(' ', 1)[0]),
+                    'headers': _encode_headers(headers)
+                })
+                await send({'type': 'http.response.body', 'body': b''.join(app_iter)})
+            finally:
+                response.close()
+
+    async def _call_wsgi(self, environ, send):
+        loop = asyncio.get_running_loop()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = headers
+
+        app_iter = await loop.run_in_executor(self.executor, self.app, environ, start_response)
+
+        try:
+            chunks = iter(app_iter)
+            chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+
+            await send({
+                'type': 'http.response.start',
+                'status': started['status'],
+                'headers': _encode_headers(started['headers'])
+            })
+
+            while chunk is not None:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+                chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(app_iter, 'close'):
+                await loop.run_in_executor(self.executor, app_iter.close)
+
+    async def _read_body(self, receive):
+        body = bytearray()
+
+        while True:
+            message = await receive()
+
+            if message['type'] == 'http.disconnect':
+                break
+
+            body.extend(message.get('body', b''))
+
+            if not message.get('more_body', False):
+                break
+
+        return bytes(body)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.app.async_redis.aclose()
+                self.app.async_mongo.close()
+                self.executor.shutdown(wait=False)
+
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def _forwarded_environ(environ, start_response):
+    # The app wrapped by the `ProxyFix` of the views, which returns the environment it was passed
+    return environ
+
+
+def _encode_headers(headers):
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+""" Testing module which holds the test client of the ASGI app.
+
+The client has the interface of the Flask test client, but sends the requests through
+the ASGI app, so the tests written for `api.create_app` also run against `api.asgi.create_asgi_app`.
+"""
+
+import asyncio
+
+from flask.testing import FlaskClient
+from werkzeug.http import HTTP_STATUS_CODES
+from werkzeug.test import run_wsgi_app
+
+
+def build_scope(environ: dict):
+    """
+    This function builds the ASGI scope of a WSGI environment, the reverse of `api.asgi.app.build_environ`.
+
+    __Returns:__
+
+    The ASGI scope
+    """
+
+    headers = []
+
+    for key, value in environ.items():
+        if key.startswith('HTTP_'):
+            headers.append((key[5:].replace('_', '-').lower().encode('latin-1'), value.encode('latin-1')))
+
+    for key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+        if environ.get(key):
+            headers.append((key.replace('_', '-').lower().encode('latin-1'), environ[key].encode('latin-1')))
+
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': environ.get('SERVER_PROTOCOL', 'HTTP/1.1').split('/', 1)[1],
+        'method': environ['REQUEST_METHOD'],
+        'scheme': environ.get('wsgi.url_scheme', 'http'),
+        'root_path': environ.get('SCRIPT_NAME', '').encode('latin-1').decode('utf-8'),
+        'path': environ['PATH_INFO'].encode('latin-1').decode('utf-8'),
+        'query_string': environ.get('QUERY_STRING', '').encode('latin-1'),
+        'headers': headers,
+        'server': (environ['SERVER_NAME'], int(environ['SERVER_PORT'])),
+        'client': (environ['REMOTE_ADDR'], 0) if environ.get('REMOTE_ADDR') else None
+    }
+
+
+def asgi_to_wsgi(asgi_app):
+    """
+    This function wraps an ASGI app in a WSGI app which runs every request in a new event loop.
+
+    It is only meant for the tests, as the whole response is buffered.
+    """
+
+    def wsgi_app(environ, start_response):
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length) if length else b''
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(asgi_app(build_scope(environ), receive, send))
+
+        start = messages[0]
+        status = f'{start["status"]} {HTTP_STATUS_CODES.get(start["status"], "UNKNOWN")}'
+        headers = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in start['headers']]
+
+        start_response(status, headers)
+
+        return [message.get('body', b'') for message in messages[1:]]
+
+    return wsgi_app
+
+
+class AsgiTestClient(FlaskClient):
+    """
+    This class represents the test client of the Flask app returned by `api.asgi.create_asgi_app`,
+    sending the requests through `app.asgi_app`.
+
+    As the requests run in their own event loop, only the app context is preserved
+    after a request when the client is used in a `with` block.
+    """
+
+    def run_wsgi_app(self, environ, buffered=False):
+        response = run_wsgi_app(asgi_to_wsgi(self.application.asgi_app), environ, buffered=buffered)
+
+        if self.preserve_context:
+            self._new_contexts.append(self.application.app_context())
+
+        return response
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+""" Views module which holds the coroutines serving the I/O bound routes of the ASGI app.
+
+Each coroutine answers the same route and returns the same responses as the `get` method
+of the resource registered for it in `api.resources`, but awaits MongoDb and Redis
+instead of blocking a worker thread.
+"""
+
+from bson import ObjectId
+from flask import make_response, current_app as app
+
+from api.cache.response import async_cached_response
+from api.counters.views import async_counted_view
+from api.passwords.hasher import PasswordHasherBusy
+from api.resources.auth import LOGIN_LIMITS, async_token_required, login_schema
+from api.resources.constants import HttpStatusCode
+from api.resources.events import event_fields, parse_search_args
+from api.resources.pagination import async_find_sorted_page
+from api.resources.ratelimit import async_rate_limited
+from api.resources.tokens import async_create_session
+from api.resources.users import user_fields
+
+
+@async_counted_view
+@async_cached_response('event|{id}', 'RESPONSE_CACHE_EVENT_TTL')
+async def get_event(id):
+    """
+    This coroutine returns the event found by id, see `api.resources.events.Event.get`.
+    """
+
+    if not ObjectId.is_valid(id):
+        return make_response('[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    event = await app.async_mongo.db.events.find_one({'_id': ObjectId(id)}, event_fields.projection())
+
+    if not event:
+        return make_response('[HTTP_404_NOT_FOUND]', HttpStatusCode.HTTP_404_NOT_FOUND)
+
+    return make_response({'data': event}, HttpStatusCode.HTTP_200_OK)
+
+
+async def search_events():
+    """
+    This coroutine returns one page of the events matching the filters, see `api.resources.events.EventSearch.get`.
+    """
+
+    try:
+        query, sort_field, direction, limit, after = parse_search_args()
+    except ValueError:
+        return make_response('[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    events, next_cursor = await async_find_sorted_page(app.async_mongo.db.events, query, sort_field, direction,
+                                                       limit, after, event_fields.projection())
+
+    return make_response({'data': events, 'next_cursor': next_cursor}, HttpStatusCode.HTTP_200_OK)
+
+
+@async_cached_response('user|{id}', 'RESPONSE_CACHE_USER_TTL')
+async def get_user(id):
+    """
+    This coroutine returns the user found by id, see `api.resources.users.User.get`.
+    """
+
+    if not ObjectId.is_valid(id):
+        return make_response('[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    user = await app.async_mongo.db.users.find_one({'_id': ObjectId(id)}, user_fields.projection())
+
+    if not user:
+        return make_response('[HTTP_404_NOT_FOUND]', HttpStatusCode.HTTP_404_NOT_FOUND)
+
+    return make_response({'data': user}, HttpStatusCode.HTTP_200_OK)
+
+
+@async_rate_limited('login', *LOGIN_LIMITS)
+async def login():
+    """
+    This coroutine executes the login, see `api.resources.auth.Login.post`.
+    The password is checked by the process pool of the password hasher while the event loop serves other requests.
+    """
+
+    args = login_schema.parse()
+    email = args['email'].strip()
+    password = args['password'].strip()
+
+    user = await app.async_mongo.db.users.find_one({'email': email})
+
+    if not user:
+        return make_response('[HTTP_404_NOT_FOUND]', HttpStatusCode.HTTP_404_NOT_FOUND)
+
+    try:
+        password_matches = await app.password_hasher.async_check(password, user['hashed_password'])
+    except PasswordHasherBusy:
+        return make_response('[HTTP_503_SERVICE_UNAVAILABLE]', HttpStatusCode.HTTP_503_SERVICE_UNAVAILABLE)
+
+    if not password_matches:
+        return make_response('[HTTP_401_UNAUTHORIZED]', HttpStatusCode.HTTP_401_UNAUTHORIZED)
+
+    await _rehash_password(user, password)
+
+    try:
+        access_token, refresh_token = await async_create_session(user)
+    except Exception:
+        app.logger.exception('The session could not be created')
+        return make_response('[HTTP_500_INTERNAL_SERVER_ERROR]', HttpStatusCode.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return make_response({
+        'token': access_token,
+        'refresh_token': refresh_token,
+        'expires_in': app.config['ACCESS_TOKEN_TTL']
+    }, HttpStatusCode.HTTP_201_CREATED)
+
+
+async def _rehash_password(user, password):
+    # Same as `api.resources.auth.Login._rehash_password`
+    if not app.password_hasher.needs_rehash(user['hashed_password']):
+        return
+
+    try:
+        hashed_password, password_salt = await app.password_hasher.async_hash(password)
+    except PasswordHasherBusy:
+        return
+
+    await app.async_mongo.db.users.update_one({'_id': user['_id'], 'hashed_password': user['hashed_password']},
+                                              {
+        '$set': {
+            'hashed_password': hashed_password,
+            'password_salt': password_salt
+        }
+    })
+
+
+@async_token_required
+async def get_stats(user_id):
+    """
+    This coroutine returns the counters of the worker, see `api.resources.stats.Stats.get`.
+    """
+
+    return make_response({'data': {
+        'token_denylist': app.token_denylist.stats(),
+        'session_cache': app.session_cache.stats()
+    }}, HttpStatusCode.HTTP_200_OK)
+
+
+ASYNC_VIEWS = {
+    ('event', 'GET'): get_event,
+    ('eventsearch', 'GET'): search_events,
+    ('user', 'GET'): get_user,
+    ('login', 'POST'): login,
+    ('stats', 'GET'): get_stats
+}
+"""The coroutines by endpoint and method, the other routes are served by the resources in worker threads"""
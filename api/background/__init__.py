@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+""" Background module where the background threads of the app are started.
+
+Threads do not survive a fork, so the threads started with `start_background_thread` are started again
+in every forked process, e.g. in every worker of a pre-fork server (such as gunicorn) preloading the app.
+One fork hook, registered once, restarts the threads of all apps.
+
+The threads are only started with `BACKGROUND_THREADS_ENABLED`, which is disabled by the testing config,
+so the apps created by the tests do not retry connecting to MongoDb or Redis in background.
+"""
+
+import os
+import threading
+import weakref
+
+_background_threads = weakref.WeakSet()
+
+
+class BackgroundThread:
+    """
+    This class represents a daemon thread of the app, which is started again in every forked process.
+
+    __Parameters:__
+
+    target (function): The function run by the thread
+
+    name (str): The name of the thread
+
+    args (tuple): The arguments of the function
+    """
+
+    def __init__(self, target, name: str, args: tuple = ()):
+        self.target = target
+        self.name = name
+        self.args = args
+
+    def start(self):
+        """
+        This method starts the thread in the current process.
+        """
+
+        threading.Thread(target=self.target, args=self.args, name=self.name, daemon=True).start()
+
+
+def init_background_threads(app):
+    """This function initializes the list of the background threads of the app, stored as `app.background_threads`.
+
+    __Parameters:__
+
+    app (app): The app instance
+    """
+
+    app.background_threads = []
+
+
+def start_background_thread(app, target, name: str, args: tuple = ()):
+    """This function starts a background thread of the app, if `BACKGROUND_THREADS_ENABLED`.
+
+    The thread is started again in every process forked afterwards.
+
+    __Parameters:__
+
+    app (app): The app instance
+
+    target (function): The function run by the thread
+
+    name (str): The name of the thread
+
+    args (tuple): The arguments of the function
+    """
+
+    if not app.config['BACKGROUND_THREADS_ENABLED']:
+        return
+
+    thread = BackgroundThread(target, name, args)
+
+    # The app keeps the thread alive, the fork hook only restarts the threads of the apps still in use
+    app.background_threads.append(thread)
+    _background_threads.add(thread)
+
+    thread.start()
+
+
+def _restart_after_fork():
+    for thread in list(_background_threads):
+        thread.start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+""" Cache module where the in-process caches are initialized.
+
+- Token denylist: `api.cache.denylist`
+- Session cache: `api.cache.session`
+- Response cache: `api.cache.response`
+"""
+
+from api.background import start_background_thread
+from api.cache.denylist import TokenDenylist, listen_for_revocations
+from api.cache.session import SessionCache, listen_for_invalidations
+
+
+def init_token_denylist(app):
+    """This function initializes the mirror of the token denylist used by `api.resources.auth.token_required`.
+
+    The mirror is stored in the app instance as `app.token_denylist`. 
+    A background thread (see `api.background`) loads the tokens denylisted in Redis
+    and listens for the tokens revoked by other workers.
+
+    __Parameters:__
+
+    app (app): The app instance
+    """
+
+    app.token_denylist = TokenDenylist(app.config['TOKEN_DENYLIST_CAPACITY'],
+                                       app.config['TOKEN_DENYLIST_ERROR_RATE'])
+
+    start_background_thread(app, listen_for_revocations, 'token-denylist', (app,))
+
+
+def init_session_cache(app):
+    """This function initializes the cache of the sessions validated by `api.resources.auth.Refresh`.
+
+    The cache is stored in the app instance as `app.session_cache`, sized by `SESSION_CACHE_MAX_SIZE`
+    users kept for `SESSION_CACHE_TTL` seconds. A background thread (see `api.background`) listens
+    for the sessions invalidated by other workers.
+
+    __Parameters:__
+
+    app (app): The app instance
+    """
+
+    app.session_cache = SessionCache(app.config['SESSION_CACHE_MAX_SIZE'], app.config['SESSION_CACHE_TTL'])
+
+    start_background_thread(app, listen_for_invalidations, 'session-invalidations', (app,))
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+""" Denylist module which holds the revoked tokens and their in-process mirror.
+
+Access tokens are short-lived and verified by `api.resources.auth.token_required` from their signature.
+A token revoked before it expires, e.g. by a logout, is denylisted by its id: the `jti` claim of the token,
+or the `sid` claim shared by all tokens of a session (see `api.resources.tokens`). The ids are added to the
+`TOKEN_DENYLIST_KEY` sorted set of Redis, scored by the time until which the tokens can be used, so an id
+expires with its tokens, and published on the Redis channel `TOKEN_DENYLIST_CHANNEL`.
+
+Every worker mirrors the denylist in a Bloom filter, which answers in memory that a token is certainly not
+revoked, the case of almost every request. The filter is built when the worker subscribes to the channel,
+then every published id is added, so the filter is refreshed incrementally. Only a possible positive,
+a revoked token or a false positive of the filter, is confirmed against Redis. As the ids cannot be removed
+from a Bloom filter, it is built again every `TOKEN_DENYLIST_REBUILD_INTERVAL` seconds without the expired ids.
+"""
+
+import hashlib
+import math
+import threading
+import time
+
+TOKEN_DENYLIST_CHANNEL = 'token-denylist'
+
+TOKEN_DENYLIST_KEY = 'token-denylist'
+
+
+class BloomFilter:
+    """
+    This class represents a Bloom filter of strings, sized for `capacity` strings with a false positive
+    rate of `error_rate`.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str):
+        # Double hashing of a single digest, see Kirsch and Mitzenmacher
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value: str):
+        """
+        This method adds a string to the filter.
+        """
+
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+        self.count += 1
+
+    def might_contain(self, value: str):
+        """
+        This method checks whether a string may have been added to the filter.
+
+        __Returns:__
+
+        False if the string was certainly not added, True if it was possibly added
+        """
+
+        bits = self._bits
+
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class TokenDenylist:
+    """
+    This class represents the in-process mirror of the denylisted token ids.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.checks = 0
+        self.hits = 0
+        self.loads = 0
+
+    def might_contain(self, token_id: str):
+        """
+        This method checks whether a token id may be denylisted.
+
+        __Returns:__
+
+        False if the token id is certainly not denylisted, True if it has to be confirmed against Redis
+        """
+
+        self.lookups += 1
+
+        return self._filter.might_contain(token_id)
+
+    def add(self, token_id: str):
+        """
+        This method adds a denylisted token id.
+        """
+
+        with self._lock:
+            self._filter.add(token_id)
+
+    def replace(self, token_ids: list):
+        """
+        This method replaces all denylisted token ids by the given ones, building a new filter sized for them.
+        """
+
+        bloom_filter = BloomFilter(max(self._capacity, 2 * len(token_ids)), self._error_rate)
+
+        for token_id in token_ids:
+            bloom_filter.add(token_id)
+
+        with self._lock:
+            self._filter = bloom_filter
+            self.loads += 1
+
+    def stats(self):
+        """
+        This method returns the counters of the denylist.
+
+        Every lookup is a token checked in memory, every check a possible positive confirmed against Redis,
+        and every hit a denylisted token.
+        """
+
+        return {
+            'size': self._filter.count,
+            'bytes': len(self._filter._bits),
+            'lookups': self.lookups,
+            'checks': self.checks,
+            'hits': self.hits,
+            'loads': self.loads
+        }
+
+
+def is_revoked(app, *token_ids: str):
+    """
+    This function checks whether any of the token ids is denylisted and its tokens have not expired.
+
+    The ids are looked up in the filter of the worker, and only the possible positives in Redis.
+    """
+
+    candidates = _revocation_candidates(app, token_ids)
+
+    if not candidates:
+        return False
+
+    return _confirm_revocation(app, app.redis.zmscore(TOKEN_DENYLIST_KEY, candidates))
+
+
+async def async_is_revoked(app, *token_ids: str):
+    """
+    This function is the same as `is_revoked` for the coroutines of the ASGI views (see `api.asgi`),
+    the possible positives are awaited from `app.async_redis`.
+    """
+
+    candidates = _revocation_candidates(app, token_ids)
+
+    if not candidates:
+        return False
+
+    return _confirm_revocation(app, await app.async_redis.zmscore(TOKEN_DENYLIST_KEY, candidates))
+
+
+def _revocation_candidates(app, token_ids):
+    # The token ids the filter of the worker may contain, which have to be confirmed against Redis
+    denylist = app.token_denylist
+
+    return [token_id for token_id in token_ids if denylist.might_contain(token_id)]
+
+
+def _confirm_revocation(app, scores):
+    # The scores of the candidates in Redis are the times until which their tokens can be used
+    denylist = app.token_denylist
+    denylist.checks += 1
+
+    now = time.time()
+    revoked = any(score is not None and score > now for score in scores)
+
+    if revoked:
+        denylist.hits += 1
+
+    return revoked
+
+
+def revoke_tokens(app, revoked: dict):
+    """
+    This function denylists token ids in Redis and in the filter of every worker.
+
+    __Parameters:__
+
+    revoked (dict): The time (a UNIX timestamp) until which the tokens can be used, by token id
+    """
+
+    pipeline = app.redis.pipeline(transaction=False)
+    pipeline.zadd(TOKEN_DENYLIST_KEY, revoked)
+    pipeline.zremrangebyscore(TOKEN_DENYLIST_KEY, '-inf', time.time())
+
+    for token_id in revoked:
+        pipeline.publish(TOKEN_DENYLIST_CHANNEL, token_id)
+
+    pipeline.execute()
+
+    for token_id in revoked:
+        app.token_denylist.add(token_id)
+
+
+def load_token_denylist(app):
+    """
+    This function builds the filter of the worker from the token ids denylisted in Redis.
+    """
+
+    token_ids = app.redis.zrangebyscore(TOKEN_DENYLIST_KEY, time.time(), '+inf')
+
+    app.token_denylist.replace([token_id.decode('utf-8') for token_id in token_ids])
+
+
+def listen_for_revocations(app, max_retry_interval: float = 30.0):
+    """
+    This function subscribes to `TOKEN_DENYLIST_CHANNEL` and adds the token ids published there to the filter.
+
+    The filter is built again after every (re)connection, as tokens may have been revoked in the meantime,
+    and every `TOKEN_DENYLIST_REBUILD_INTERVAL` seconds. Reconnections are retried with an exponential backoff
+    of up to `max_retry_interval` seconds.
+    """
+
+    retry_interval = 1.0
+
+    while True:
+        try:
+            pubsub = app.redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(TOKEN_DENYLIST_CHANNEL)
+
+            # Loaded once subscribed, so no token revoked in between is missed
+            load_token_denylist(app)
+            next_rebuild = time.time() + app.config['TOKEN_DENYLIST_REBUILD_INTERVAL']
+            retry_interval = 1.0
+
+            while True:
+                # Polled with a timeout below `REDIS_SOCKET_TIMEOUT`, as a blocking read would time out while idle
+                message = pubsub.get_message(timeout=1.0)
+
+                if message is not None:
+                    app.token_denylist.add(message['data'].decode('utf-8'))
+
+                if time.time() >= next_rebuild:
+                    load_token_denylist(app)
+                    next_rebuild = time.time() + app.config['TOKEN_DENYLIST_REBUILD_INTERVAL']
+        except Exception as e:
+            app.logger.warning(f'Token revocations could not be received, retrying in {retry_interval}s: {e}')
+
+            time.sleep(retry_interval)
+            retry_interval = min(retry_interval * 2, max_retry_interval)
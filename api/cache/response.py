@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+""" Response module which holds the read-through cache of the API responses in Redis.
+
+The responses of the decorated `get` methods are stored in Redis for the number of seconds configured
+for the route, so they are neither read from MongoDb nor serialized again while cached. Every response
+carries a strong `ETag`, so clients sending `If-None-Match` get a `304 Not Modified` without a body.
+
+Cached responses are grouped by namespace (e.g. `event|<id>` or `events`), which writes invalidate
+with `invalidate_responses`.
+
+The views of the ASGI app (see `api.asgi`) share the same cache through `async_cached_response`.
+"""
+
+import hashlib
+from functools import wraps
+
+from flask import Response, make_response, request, current_app as app
+from redis import RedisError
+
+RESPONSE_CACHE_PREFIX = 'response-cache'
+
+# Removes the cached responses of the namespaces passed as keys in one round trip
+INVALIDATE_SCRIPT = """
+for _, namespace_key in ipairs(KEYS) do
+    local keys = redis.call('SMEMBERS', namespace_key)
+
+    for i = 1, #keys, 1000 do
+        redis.call('DEL', unpack(keys, i, math.min(i + 999, #keys)))
+    end
+
+    redis.call('DEL', namespace_key)
+end
+
+return 0
+"""
+
+
+def _namespace_key(namespace: str):
+    return f'{RESPONSE_CACHE_PREFIX}-keys|{namespace}'
+
+
+def cached_response(namespace: str, ttl_config: str):
+    """
+    This function defines a function decorator for the `get` methods of the resources whose responses are cached.
+
+    __Example__:
+
+    ```
+    class Event(Resource):
+
+        @cached_response('event|{id}', 'RESPONSE_CACHE_EVENT_TTL')
+        def get(self, id):
+            ...
+    ```
+
+    __Parameters:__
+
+    namespace (str): The namespace of the cached responses, formatted with the arguments of the route
+
+    ttl_config (str): The name of the config holding the time to live in seconds, with 0 responses are not cached
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(self, *args, **kwargs):
+            ttl = app.config[ttl_config]
+            key = _response_key()
+
+            response = _read_response(key) if ttl > 0 else None
+
+            if response is None:
+                response = make_response(f(self, *args, **kwargs))
+
+                if not _tag_response(response):
+                    return response
+
+                if ttl > 0:
+                    _write_response(key, namespace.format(**kwargs), response, ttl)
+
+            return response.make_conditional(request)
+
+        return decorated
+
+    return decorator
+
+
+def async_cached_response(namespace: str, ttl_config: str):
+    """
+    This function defines the same decorator as `cached_response` for the coroutines of the ASGI views,
+    reading and writing the responses with `app.async_redis` (see `api.asgi`).
+
+    __Example__:
+
+    ```
+    @async_cached_response('event|{id}', 'RESPONSE_CACHE_EVENT_TTL')
+    async def get_event(id):
+        ...
+    ```
+    """
+
+    def decorator(f):
+        @wraps(f)
+        async def decorated(*args, **kwargs):
+            ttl = app.config[ttl_config]
+            key = _response_key()
+
+            response = await _async_read_response(key) if ttl > 0 else None
+
+            if response is None:
+                response = make_response(await f(*args, **kwargs))
+
+                if not _tag_response(response):
+                    return response
+
+                if ttl > 0:
+                    await _async_write_response(key, namespace.format(**kwargs), response, ttl)
+
+            return response.make_conditional(request)
+
+        return decorated
+
+    return decorator
+
+
+def invalidate_responses(*namespaces: str):
+    """
+    This function removes the cached responses of the given namespaces.
+
+    __Example__:
+
+    ```
+    invalidate_responses(f'event|{id}', 'events')
+    ```
+    """
+
+    namespace_keys = [_namespace_key(namespace) for namespace in namespaces]
+
+    try:
+        app.redis.eval(INVALIDATE_SCRIPT, len(namespace_keys), *namespace_keys)
+    except RedisError as e:
+        app.logger.warning(f'Cached responses of {namespaces} could not be invalidated: {e}')
+
+
+def _response_key():
+    return f'{RESPONSE_CACHE_PREFIX}|{request.full_path}'
+
+
+def _tag_response(response: Response):
+    if response.status_code != 200 or response.is_streamed:
+        return False
+
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+
+    return True
+
+
+def _cached_to_response(cached: dict):
+    if not cached:
+        return None
+
+    response = Response(cached[b'body'], mimetype=cached[b'mimetype'].decode('utf-8'))
+    response.set_etag(cached[b'etag'].decode('utf-8'))
+
+    return response
+
+
+def _pipeline_write(pipeline, key: str, namespace: str, response: Response, ttl: int):
+    etag, _ = response.get_etag()
+
+    pipeline.hset(key, mapping={'body': response.get_data(), 'etag': etag, 'mimetype': response.mimetype})
+    pipeline.expire(key, ttl)
+    pipeline.sadd(_namespace_key(namespace), key)
+    pipeline.expire(_namespace_key(namespace), ttl)
+
+
+def _read_response(key: str):
+    try:
+        cached = app.redis.hgetall(key)
+    except RedisError as e:
+        app.logger.warning(f'Cached response could not be read: {e}')
+        return None
+
+    return _cached_to_response(cached)
+
+
+def _write_response(key: str, namespace: str, response: Response, ttl: int):
+    try:
+        pipeline = app.redis.pipeline(transaction=False)
+        _pipeline_write(pipeline, key, namespace, response, ttl)
+        pipeline.execute()
+    except RedisError as e:
+        app.logger.warning(f'Response could not be cached: {e}')
+
+
+async def _async_read_response(key: str):
+    try:
+        cached = await app.async_redis.hgetall(key)
+    except RedisError as e:
+        app.logger.warning(f'Cached response could not be read: {e}')
+        return None
+
+    return _cached_to_response(cached)
+
+
+async def _async_write_response(key: str, namespace: str, response: Response, ttl: int):
+    try:
+        pipeline = app.async_redis.pipeline(transaction=False)
+        _pipeline_write(pipeline, key, namespace, response, ttl)
+        await pipeline.execute()
+    except RedisError as e:
+        app.logger.warning(f'Response could not be cached: {e}')
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+""" Session module which holds the in-process cache of the validated sessions.
+
+The access tokens are verified by `api.resources.auth.token_required` without any round trip
+(see `api.cache.denylist`). A refresh token is exchanged for a new access token by `api.resources.auth.Refresh`,
+which validates its session with a Redis `GET` of the session key and loads its user with a MongoDb `find_one`.
+The result is kept per worker for `SESSION_CACHE_TTL` seconds, so following refreshes of the same session
+do not need any round trip.
+
+When a user logs out or is updated, the sessions of the user are invalidated in every worker through
+the Redis channel `SESSION_INVALIDATION_CHANNEL`. A logged out session is rejected by the token denylist before
+the cache is looked up anyway, as long as `SESSION_CACHE_TTL` does not exceed `ACCESS_TOKEN_TTL`.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+SESSION_INVALIDATION_CHANNEL = 'session-invalidations'
+
+
+class SessionCache:
+    """
+    This class represents a bounded LRU cache of validated sessions with a time to live.
+
+    The sessions are keyed by the `sub` claim of the token and hold the user of the session
+    along with the ids (`sid` claims) of its validated sessions.
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock=time.monotonic):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, sub: str, sid: str):
+        """
+        This method looks up a validated session.
+
+        __Returns:__
+
+        The user of the session if it is cached and has not expired, otherwise `None`
+        """
+
+        with self._lock:
+            entry = self._entries.get(sub)
+            expires = entry[1].get(sid) if entry is not None else None
+
+            if expires is None or expires <= self._clock():
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(sub)
+            self.hits += 1
+
+            return entry[0]
+
+    def set(self, sub: str, sid: str, user: dict):
+        """
+        This method caches a validated session, evicting the least recently used user if the cache is full.
+        """
+
+        if self._max_size <= 0:
+            return
+
+        with self._lock:
+            now = self._clock()
+            entry = self._entries.get(sub)
+            sessions = {} if entry is None else {key: expires for key, expires in entry[1].items() if expires > now}
+            sessions[sid] = now + self._ttl
+
+            self._entries[sub] = (user, sessions)
+            self._entries.move_to_end(sub)
+
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, sub: str):
+        """
+        This method removes the sessions of a user from the cache.
+        """
+
+        with self._lock:
+            if self._entries.pop(sub, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """
+        This method removes all sessions from the cache.
+        """
+
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        This method returns the counters of the cache.
+
+        Every hit saves one Redis `GET` and one MongoDb `find_one`.
+        """
+
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'saved_redis_calls': self.hits,
+                'saved_mongo_calls': self.hits
+            }
+
+
+def invalidate_sessions(app, sub: str):
+    """
+    This function removes the sessions of a user from the cache of every worker.
+    """
+
+    app.session_cache.invalidate(sub)
+    app.redis.publish(SESSION_INVALIDATION_CHANNEL, sub)
+
+
+def listen_for_invalidations(app, max_retry_interval: float = 30.0):
+    """
+    This function subscribes to `SESSION_INVALIDATION_CHANNEL` and invalidates the sessions published there.
+
+    The whole cache is cleared after every (re)connection, as invalidations may have been published
+    in the meantime. Reconnections are retried with an exponential backoff of up to `max_retry_interval` seconds.
+    """
+
+    retry_interval = 1.0
+
+    while True:
+        try:
+            pubsub = app.redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(SESSION_INVALIDATION_CHANNEL)
+
+            app.session_cache.clear()
+            retry_interval = 1.0
+
+            while True:
+                # Polled with a timeout below `REDIS_SOCKET_TIMEOUT`, as a blocking read would time out while idle
+                message = pubsub.get_message(timeout=1.0)
+
+                if message is not None:
+                    app.session_cache.invalidate(message['data'].decode('utf-8'))
+        except Exception as e:
+            app.logger.warning(f'Session invalidations could not be received, retrying in {retry_interval}s: {e}')
+
+            time.sleep(retry_interval)
+            retry_interval = min(retry_interval * 2, max_retry_interval)
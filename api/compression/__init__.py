@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+""" Compression module where the compression of the responses is initialized.
+
+- Negotiation and gzip/brotli compression of the responses: `api.compression.response`
+"""
+
+from api.compression.response import compress_response
+
+
+def init_compression(app):
+    """This function initializes the compression of the responses.
+
+    With `COMPRESSION_ENABLED` the responses are compressed with the encoding accepted by the client,
+    by an `after_request` function, so the responses of the ASGI views are compressed as well.
+
+    __Parameters:__
+
+    app (app): The app instance
+    """
+
+    if app.config['COMPRESSION_ENABLED']:
+        app.after_request(compress_response)
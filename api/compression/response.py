@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+""" Response module which holds the compression of the API responses.
+
+The encoding of a response is negotiated with the `Accept-Encoding` header of the request, among
+`br` (if [brotli](https://pypi.org/project/Brotli/) is installed) and `gzip`, `br` being preferred
+when both are accepted with the same quality.
+
+Only the responses of the `COMPRESSION_MIMETYPES` are compressed, with a body of at least
+`COMPRESSION_MIN_SIZE` bytes, as compressing smaller bodies costs more than the bytes it saves.
+Streamed responses (e.g. the NDJSON exports), whose size is not known, are always compressed:
+every chunk is compressed and flushed as it is generated, so the client still receives each chunk
+as soon as it is ready.
+
+Compressed responses get a weak `ETag`, as their bytes differ from the uncompressed ones,
+which keeps the `If-None-Match` of the clients matching (see `api.cache.response`).
+"""
+
+import zlib
+
+from flask import Response, request, current_app as app
+
+from api.metrics.spans import span
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class GzipEncoder:
+    """
+    This class represents a gzip compression stream.
+    """
+
+    name = 'gzip'
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    """
+    This class represents a brotli compression stream.
+    """
+
+    name = 'br'
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def available_encodings():
+    """
+    This function returns the encodings which can be negotiated, in order of preference.
+    """
+
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def create_encoder(encoding: str, config):
+    """
+    This function creates the compression stream of an encoding, with the level set in the config.
+
+    __Returns:__
+
+    A `BrotliEncoder` for `br`, a `GzipEncoder` for `gzip`
+    """
+
+    if encoding == 'br':
+        return BrotliEncoder(config['COMPRESSION_BROTLI_QUALITY'])
+
+    return GzipEncoder(config['COMPRESSION_GZIP_LEVEL'])
+
+
+def compress_response(response: Response):
+    """
+    This function compresses the response with the encoding accepted by the client, see the module documentation.
+    It is registered as an `after_request` function by `api.compression.init_compression`.
+
+    __Returns:__
+
+    The response, compressed or not
+    """
+
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.mimetype not in app.config['COMPRESSION_MIMETYPES']
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    if not response.is_streamed and response.calculate_content_length() < app.config['COMPRESSION_MIN_SIZE']:
+        return response
+
+    encoding = request.accept_encodings.best_match(available_encodings())
+
+    if encoding is None:
+        return response
+
+    encoder = create_encoder(encoding, app.config)
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoder)
+        response.headers.pop('Content-Length', None)
+    else:
+        with span('compression'):
+            response.set_data(encoder.compress(response.get_data()) + encoder.finish())
+
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+
+    return response
+
+
+def _compress_stream(chunks, encoder):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+
+            data = encoder.compress(chunk) + encoder.flush()
+
+            if data:
+                yield data
+
+        yield encoder.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+""" Counters module where the write-behind counters are initialized.
+
+- Event views: `api.counters.views`
+"""
+
+from api.background import start_background_thread
+from api.counters.views import flush_periodically
+
+
+def init_view_counter(app):
+    """This function initializes the flusher of the event views counted by `api.counters.views.counted_view`.
+
+    A background thread (see `api.background`) applies the counted views to the events
+    every `VIEW_COUNT_FLUSH_INTERVAL` seconds.
+
+    __Parameters:__
+
+    app (app): The app instance
+    """
+
+    start_background_thread(app, flush_periodically, 'view-counts-flusher', (app,))
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+""" Views module which holds the write-behind counter of the event views.
+
+A view of an event is counted with a Redis `HINCRBY` on the `VIEW_COUNTS_KEY` hash, so reading
+an event never writes to MongoDb. The counts accumulated in Redis are applied to the `view_count`
+of the events by `flush_view_counts`, every `VIEW_COUNT_FLUSH_INTERVAL` seconds, from a snapshot of the hash
+with one unordered `bulk_write` per `VIEW_COUNT_BATCH_SIZE` events.
+
+The counts live in Redis until they are flushed, so they survive the restart of the workers.
+The `view_count` of an event is behind the views counted since the last flush.
+"""
+
+import time
+import uuid
+from functools import wraps
+
+from bson import ObjectId
+from flask import current_app as app
+from pymongo import UpdateOne
+from redis import RedisError, ResponseError
+
+VIEW_COUNTS_KEY = 'view-counts'
+
+VIEW_COUNTS_FLUSH_LOCK_KEY = 'view-counts-flush-lock'
+
+VIEW_COUNTS_SNAPSHOT_PREFIX = 'view-counts|flushing'
+
+VIEW_COUNTS_SNAPSHOTS_KEY = 'view-counts|snapshots'
+
+COUNTED_STATUS_CODES = (200, 304)
+"""The status codes of the responses counted as a view, including the cached ones"""
+
+
+def counted_view(f):
+    """
+    This function defines a function decorator for the `get` methods of the resources whose views are counted,
+    by the `id` argument of the route. It is applied above `api.cache.response.cached_response`,
+    so the views served from the response cache are counted as well.
+
+    __Example__:
+
+    ```
+    class Event(Resource):
+
+        @counted_view
+        @cached_response('event|{id}', 'RESPONSE_CACHE_EVENT_TTL')
+        def get(self, id):
+            ...
+    ```
+    """
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        response = f(*args, **kwargs)
+
+        if response.status_code in COUNTED_STATUS_CODES:
+            try:
+                app.redis.hincrby(VIEW_COUNTS_KEY, kwargs['id'], 1)
+            except RedisError as e:
+                app.logger.warning(f'View could not be counted: {e}')
+
+        return response
+
+    return decorated
+
+
+def async_counted_view(f):
+    """
+    This function defines the same decorator as `counted_view` for the coroutines of the ASGI views,
+    counting the views with `app.async_redis` (see `api.asgi`).
+    """
+
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        response = await f(*args, **kwargs)
+
+        if response.status_code in COUNTED_STATUS_CODES:
+            try:
+                await app.async_redis.hincrby(VIEW_COUNTS_KEY, kwargs['id'], 1)
+            except RedisError as e:
+                app.logger.warning(f'View could not be counted: {e}')
+
+        return response
+
+    return decorated
+
+
+def flush_view_counts(app):
+    """
+    This function applies the views counted in Redis to the `view_count` of the events.
+
+    The counted views are first moved with `RENAME` to a snapshot key of the flush, so the views counted
+    in the meantime go to a new hash, and no other flush reads the views being applied. The snapshot is
+    applied batch by batch, every batch being removed from the snapshot once written to MongoDb, then deleted.
+
+    The snapshots are listed in `VIEW_COUNTS_SNAPSHOTS_KEY` and leased while applied, so the snapshots
+    left by a flush which did not complete (e.g. a crashed worker) are applied by the next flush. Only the batch
+    being written when a flush stops can be applied twice.
+
+    A lock held for `VIEW_COUNT_FLUSH_INTERVAL` seconds makes a single worker flush the counts per interval.
+
+    __Returns:__
+
+    The number of events updated, or None if another worker holds the lock
+    """
+
+    interval = app.config['VIEW_COUNT_FLUSH_INTERVAL']
+
+    if not app.redis.set(VIEW_COUNTS_FLUSH_LOCK_KEY, 1, nx=True, ex=interval):
+        return None
+
+    updated = 0
+
+    for snapshot in app.redis.smembers(VIEW_COUNTS_SNAPSHOTS_KEY):
+        snapshot = snapshot.decode('utf-8')
+
+        if not app.redis.exists(_lease_key(snapshot)):
+            updated += _apply_snapshot(app, snapshot)
+
+    snapshot = f'{VIEW_COUNTS_SNAPSHOT_PREFIX}|{uuid.uuid4().hex}'
+
+    app.redis.set(_lease_key(snapshot), 1, ex=interval)
+    app.redis.sadd(VIEW_COUNTS_SNAPSHOTS_KEY, snapshot)
+
+    try:
+        app.redis.rename(VIEW_COUNTS_KEY, snapshot)
+    except ResponseError:
+        # No view was counted since the last flush
+        _remove_snapshot(app, snapshot)
+
+        return updated
+
+    return updated + _apply_snapshot(app, snapshot)
+
+
+def _lease_key(snapshot: str):
+    return f'{snapshot}|lease'
+
+
+def _apply_snapshot(app, snapshot: str):
+    interval = app.config['VIEW_COUNT_FLUSH_INTERVAL']
+    batch_size = app.config['VIEW_COUNT_BATCH_SIZE']
+
+    counts = [(event_id.decode('utf-8'), int(count)) for event_id, count in app.redis.hgetall(snapshot).items()]
+    updated = 0
+
+    for i in range(0, len(counts), batch_size):
+        batch = counts[i:i + batch_size]
+        requests = [UpdateOne({'_id': ObjectId(event_id)}, {'$inc': {'view_count': count}})
+                    for event_id, count in batch if ObjectId.is_valid(event_id)]
+
+        # The lease is renewed per batch, so a long flush is not taken for a stopped one
+        app.redis.set(_lease_key(snapshot), 1, ex=interval)
+
+        if requests:
+            updated += app.mongo.db.events.bulk_write(requests, ordered=False).modified_count
+
+        app.redis.hdel(snapshot, *[event_id for event_id, _ in batch])
+
+    _remove_snapshot(app, snapshot)
+
+    return updated
+
+
+def _remove_snapshot(app, snapshot: str):
+    pipeline = app.redis.pipeline(transaction=False)
+    pipeline.delete(snapshot, _lease_key(snapshot))
+    pipeline.srem(VIEW_COUNTS_SNAPSHOTS_KEY, snapshot)
+    pipeline.execute()
+
+
+def flush_periodically(app):
+    """
+    This function flushes the view counts every `VIEW_COUNT_FLUSH_INTERVAL` seconds, see `flush_view_counts`.
+
+    The counts are flushed once on start, so the snapshots left by a stopped worker are applied right away.
+    """
+
+    while True:
+        try:
+            flush_view_counts(app)
+        except Exception as e:
+            app.logger.warning(f'View counts could not be flushed: {e}')
+
+        time.sleep(app.config['VIEW_COUNT_FLUSH_INTERVAL'])
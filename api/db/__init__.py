@@ -2,13 +2,56 @@
 """ DB module where database related instances occurs.
 
 This module is responsible for holding methods that create instances of database stores.
+
+The indexes required by the resources are declared in `api.db.indexes`.
+
+The change history of the documents is handled in `api.db.changes`.
+
+The dates stored as strings are converted by `api.db.dates`.
+
+The process local clients and their pool stats are handled in `api.db.clients`.
+
+The MongoDb commands slower than `MONGO_SLOW_QUERY_MS` are logged by `api.db.slow_queries`.
 """
 
+import threading
+import time
+
+import click
+from flask.cli import AppGroup
+
+from api.background import start_background_thread
+from api.db.changes import compact_changes
+from api.db.dates import EVENT_DATE_FIELDS, convert_string_dates
+from api.db.clients import CommandTimingListener, ConnectionPoolStats, ProcessLocalClient, TimedAsyncRedis, \
+    TimedRedis
+from api.db.indexes import duplicate_emails, ensure_indexes, index_report, unique_email_index_exists
+from api.db.slow_queries import SlowQueryListener
+
+INDEXES_RETRY_INTERVAL = 60.0
+
+
 def init_db(app):
     """__This function initializes db instances for MongoDb and Redis.__
     
     The instances created here are stored in the app instance, 
     which can be used throughout the application
+
+    The clients are created on first use in each process (see `api.db.clients`), with the pool sizes
+    and timeouts of the `MONGO_*` and `REDIS_*` config.
+
+    The MongoDb commands slower than `MONGO_SLOW_QUERY_MS` are logged and counted by the
+    `SlowQueryListener` stored as `app.slow_queries` (see `api.db.slow_queries`).
+
+    The indexes of `api.db.indexes` are created by a background thread (see `api.background`), so the start
+    of the app does not wait for the MongoDb server. Failures are logged per collection and retried with
+    an exponential backoff, e.g. while duplicate emails prevent the `email_unique` index
+    (see `flask db duplicate-emails`), without preventing the indexes of the other collections.
+    The event `app.indexes_ready` is set once the `email_unique` index exists, and the resources relying
+    on it refuse their email writes until then. The thread runs again in every forked worker, so a worker
+    forked before the indexes were created sets its own event. Without `BACKGROUND_THREADS_ENABLED`
+    the indexes are created here instead, and if the `email_unique` index is still missing, the email writes
+    create them again at most every `INDEXES_RETRY_INTERVAL` seconds (see `check_indexes_ready`).
     
     __Example:__
     
@@ -24,11 +67,115 @@ def init_db(app):
     app (app): The app instance
     """
 
-    import redis
     from pymongo import MongoClient
-    
-    app.redis = redis.Redis(host=app.config['REDIS_HOST'], port=app.config['REDIS_PORT'])
-    app.mongo = MongoClient(host=app.config['MONGO_DB_HOST'], port=int(app.config['MONGO_DB_PORT']))
+
+    app.slow_queries = SlowQueryListener(app.config['MONGO_SLOW_QUERY_MS'], app.logger)
+
+    app.redis = ProcessLocalClient(lambda: TimedRedis(**_redis_options(app.config)))
+    app.mongo = ProcessLocalClient(lambda: MongoClient(**_mongo_options(app.config, app.slow_queries)))
+
+    app.indexes_ready = threading.Event()
+    app.indexes_retry_lock = threading.Lock()
+    app.indexes_retry_at = None
+
+    if app.config['BACKGROUND_THREADS_ENABLED']:
+        start_background_thread(app, _create_indexes, 'ensure-indexes', (app,))
+    elif not _ensure_app_indexes(app) and not app.indexes_ready.is_set():
+        app.indexes_retry_at = time.monotonic() + INDEXES_RETRY_INTERVAL
+
+
+def check_indexes_ready(app):
+    """
+    This function checks whether the `email_unique` index exists, see `app.indexes_ready`.
+
+    Without `BACKGROUND_THREADS_ENABLED` nothing creates the indexes after `init_db`, so a missing index is
+    created again by the first request checking it after `app.indexes_retry_at`. Concurrent requests do not wait
+    for it and are refused meanwhile.
+
+    __Parameters:__
+
+    app (app): The app instance
+
+    __Returns:__
+
+    True if the `email_unique` index exists, otherwise False
+    """
+
+    if app.indexes_ready.is_set():
+        return True
+
+    if app.indexes_retry_at is None or time.monotonic() < app.indexes_retry_at:
+        return False
+
+    if not app.indexes_retry_lock.acquire(blocking=False):
+        return False
+
+    try:
+        app.indexes_retry_at = time.monotonic() + INDEXES_RETRY_INTERVAL
+        _ensure_app_indexes(app)
+    finally:
+        app.indexes_retry_lock.release()
+
+    return app.indexes_ready.is_set()
+
+
+def _create_indexes(app, max_retry_interval: float = 60.0):
+    retry_interval = 1.0
+
+    while not _ensure_app_indexes(app):
+        app.logger.warning(f'The indexes will be created again in {retry_interval}s')
+
+        time.sleep(retry_interval)
+        retry_interval = min(retry_interval * 2, max_retry_interval)
+
+
+def _ensure_app_indexes(app):
+    # Creates the indexes once and sets `app.indexes_ready` if the `email_unique` index exists,
+    # returns whether all indexes were created
+    try:
+        failures = ensure_indexes(app.mongo.db)
+
+        if unique_email_index_exists(app.mongo.db):
+            app.indexes_ready.set()
+    except Exception:
+        app.logger.exception('The indexes could not be created')
+        return False
+
+    for collection, error in failures.items():
+        app.logger.error(f'The indexes of {collection} could not be created: {error}')
+
+    return not failures
+
+
+def _mongo_options(config, slow_queries: SlowQueryListener):
+    event_listeners = [ConnectionPoolStats(), CommandTimingListener()]
+
+    if config['MONGO_SLOW_QUERY_MS'] is not None:
+        event_listeners.append(slow_queries)
+
+    return {
+        'host': config['MONGO_DB_HOST'],
+        'port': int(config['MONGO_DB_PORT']),
+        'maxPoolSize': config['MONGO_MAX_POOL_SIZE'],
+        'minPoolSize': config['MONGO_MIN_POOL_SIZE'],
+        'maxIdleTimeMS': config['MONGO_MAX_IDLE_TIME_MS'],
+        'waitQueueTimeoutMS': config['MONGO_WAIT_QUEUE_TIMEOUT_MS'],
+        'connectTimeoutMS': config['MONGO_CONNECT_TIMEOUT_MS'],
+        'socketTimeoutMS': config['MONGO_SOCKET_TIMEOUT_MS'],
+        'serverSelectionTimeoutMS': config['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+        'event_listeners': event_listeners
+    }
+
+
+def _redis_options(config):
+    return {
+        'host': config['REDIS_HOST'],
+        'port': config['REDIS_PORT'],
+        'max_connections': config['REDIS_MAX_CONNECTIONS'],
+        'socket_timeout': config['REDIS_SOCKET_TIMEOUT'],
+        'socket_connect_timeout': config['REDIS_SOCKET_CONNECT_TIMEOUT'],
+        'health_check_interval': config['REDIS_HEALTH_CHECK_INTERVAL']
+    }
 
 
 def init_db_mock(app):
@@ -57,3 +204,179 @@ def init_db_mock(app):
 
     app.redis = mock.Mock()
     app.mongo = mongomock.MongoClient()
+
+    # mongomock does not publish command events, so no command is logged
+    app.slow_queries = SlowQueryListener(app.config['MONGO_SLOW_QUERY_MS'], app.logger)
+
+    ensure_indexes(app.mongo.db)
+    app.indexes_ready = threading.Event()
+    app.indexes_ready.set()
+    app.indexes_retry_lock = threading.Lock()
+    app.indexes_retry_at = None
+
+
+def init_async_db(app):
+    """__This function initializes the asyncio db instances for MongoDb and Redis.__
+
+    They are used by the views of the ASGI app (see `api.asgi`), next to the instances of `init_db`
+    which are used by the views running in worker threads.
+
+    __Example:__
+
+    ```
+    from flask import current_app as app
+
+    await app.async_mongo.db.users.find_one({...})
+    await app.async_redis.get(...)
+    ```
+
+    __Parameters:__
+
+    app (app): The app instance
+    """
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    app.async_redis = ProcessLocalClient(lambda: TimedAsyncRedis(**_redis_options(app.config)))
+    app.async_mongo = ProcessLocalClient(lambda: AsyncIOMotorClient(**_mongo_options(app.config,
+                                                                                      app.slow_queries)))
+
+
+def init_async_db_mock(app):
+    """This function initializes the asyncio mock instances for MongoDb and Redis.
+
+    They wrap the mock instances of `init_db_mock`, so the data and the Redis return values
+    set up by the tests are seen by both the ASGI and the WSGI views.
+
+    __Parameters:__
+
+    app (app): The app instance
+    """
+
+    from mongomock_motor import AsyncMongoMockClient
+    from unittest import mock
+
+    def pipeline(*args, **kwargs):
+        pipeline = app.redis.pipeline(*args, **kwargs)
+        return mock.Mock(wraps=pipeline, execute=mock.AsyncMock(wraps=pipeline.execute))
+
+    app.async_redis = mock.AsyncMock(wraps=app.redis)
+    app.async_redis.pipeline = mock.Mock(side_effect=pipeline)
+    app.async_mongo = AsyncMongoMockClient(mock_mongo_client=app.mongo)
+
+
+db_cli = AppGroup('db', help='Database maintenance commands.')
+
+
+@db_cli.command('ensure-indexes')
+def ensure_indexes_command():
+    """Create the indexes declared in api.db.indexes."""
+
+    from flask import current_app as app
+
+    failures = ensure_indexes(app.mongo.db)
+
+    for collection, error in failures.items():
+        click.echo(f'{collection:<20}{error}')
+
+    if failures:
+        raise click.ClickException(f'The indexes of {len(failures)} collection(s) could not be created')
+
+    click.echo('Indexes created')
+
+
+@db_cli.command('duplicate-emails')
+def duplicate_emails_command():
+    """List the emails shared by several users, which prevent the email_unique index."""
+
+    from flask import current_app as app
+
+    duplicates = duplicate_emails(app.mongo.db)
+
+    for email, user_ids in duplicates:
+        click.echo(f'{email:<40}{", ".join(str(user_id) for user_id in user_ids)}')
+
+    if duplicates:
+        raise click.ClickException(f'{len(duplicates)} email(s) are used by several users')
+
+    click.echo('No duplicate emails')
+
+
+@db_cli.command('index-report')
+def index_report_command():
+    """Explain every query shape and flag the ones doing a COLLSCAN."""
+
+    from flask import current_app as app
+
+    collection_scans = 0
+
+    for shape, collection_scan in index_report(app.mongo.db):
+        status = 'COLLSCAN' if collection_scan else 'IXSCAN'
+        collection_scans += collection_scan
+
+        click.echo(f'{status:<10}{shape.collection:<10}{shape.name}')
+
+    if collection_scans:
+        raise click.ClickException(f'{collection_scans} query shape(s) fall back to COLLSCAN')
+
+
+@db_cli.command('compact-changes')
+def compact_changes_command():
+    """Move the embedded changes arrays to the change collections."""
+
+    from flask import current_app as app
+    from api.resources.users import prepare_user_fields
+
+    db = app.mongo.db
+
+    events, _ = compact_changes(db.events, db.event_changes, 'event_id')
+    users, skipped = compact_changes(db.users, db.user_changes, 'user_id', prepare_user_fields)
+
+    click.echo(f'{events} event(s) and {users} user(s) compacted')
+
+    for user_id in skipped:
+        app.logger.warning(f'The changes of user {user_id} could not be compacted: they violate a unique index')
+
+    # The compacted changes may have set string dates
+    errors = _convert_event_dates(db)
+
+    if skipped:
+        errors.append(f'{len(skipped)} user(s) violating a unique index (see `flask db duplicate-emails`): '
+                      f'{", ".join(str(user_id) for user_id in skipped)}')
+
+    if errors:
+        raise click.ClickException('\n'.join(errors))
+
+
+@db_cli.command('convert-dates')
+def convert_dates_command():
+    """Convert the event dates stored as strings to datetimes."""
+
+    from flask import current_app as app
+
+    errors = _convert_event_dates(app.mongo.db)
+
+    if errors:
+        raise click.ClickException('\n'.join(errors))
+
+
+def _convert_event_dates(db):
+    converted, invalid = convert_string_dates(db.events, EVENT_DATE_FIELDS)
+
+    click.echo(f'{converted} event(s) with string dates converted')
+
+    if not invalid:
+        return []
+
+    return [f'{len(invalid)} event(s) with invalid dates: {", ".join(str(event_id) for event_id in invalid)}']
+
+
+def init_db_commands(app):
+    """This function registers the `flask db` commands in the app instance.
+
+    __Parameters:__
+
+    app (app): The app instance
+    """
+
+    app.cli.add_command(db_cli)
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+""" Changes module which holds the logic for the change history of the documents.
+
+The current values of a document are stored in the document itself, while every edit is appended
+to a separate change collection (e.g. `events` and `event_changes`). Each edit increments the `version`
+of the document, which is stored along with the change record, so the history of a document can be read
+in order through the index on the document id and version.
+
+Reading a document does not depend on the number of edits made to it.
+"""
+
+from datetime import datetime
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def apply_changes(collection, change_collection, key: str, document_id, fields: dict, user_id: str,
+                  recorded_fields: dict = None):
+    """
+    This function sets the changed fields on a document and appends the change to its history.
+
+    The fields and the new version are set with one atomic update of the document, the change record
+    is inserted afterwards with that version.
+
+    __Parameters:__
+
+    collection (Collection): The collection of the document
+
+    change_collection (Collection): The collection of the change history
+
+    key (str): The name of the field referencing the document in the change history, e.g. `event_id`
+
+    document_id (ObjectId): The id of the document
+
+    fields (dict): The fields to be set
+
+    user_id (str): The id of the user making the change
+
+    recorded_fields (dict): The fields to be stored in the history, `fields` if not passed
+
+    __Returns:__
+
+    The document with its `_id` and `version` or `None` if the document was not found
+    """
+
+    if not fields:
+        return collection.find_one({'_id': document_id}, {'version': True})
+
+    document = collection.find_one_and_update({'_id': document_id},
+                                              {'$set': fields, '$inc': {'version': 1}},
+                                              projection={'version': True},
+                                              return_document=ReturnDocument.AFTER)
+
+    if document is None:
+        return None
+
+    change_collection.insert_one({
+        key: document_id,
+        'version': document['version'],
+        'fields': fields if recorded_fields is None else recorded_fields,
+        'updated_by_user': user_id,
+        'updated_datetime': datetime.utcnow()
+    })
+
+    return document
+
+
+def compact_changes(collection, change_collection, key: str, prepare_fields=None):
+    """
+    This function migrates the embedded `changes` arrays to the change history.
+
+    For each document with a `changes` array, the changes are inserted in the change collection,
+    their fields are set on the document in the order they were made and the array is removed.
+
+    The change records are inserted before the document is updated, so a run interrupted in between
+    only leaves records which are found again by the next run: the unique index on the document id and version
+    rejects them as duplicates, which are taken as already inserted. The records inserted for a document which
+    is not updated (because it was edited in the meantime, or its fields violate a unique index, e.g. a replayed
+    email taken by another user since) are removed again, so their versions do not collide with new edits.
+
+    __Parameters:__
+
+    collection (Collection): The collection of the documents
+
+    change_collection (Collection): The collection of the change history
+
+    key (str): The name of the field referencing the document in the change history, e.g. `event_id`
+
+    prepare_fields (function): A function receiving the fields of a change and returning a tuple with the 
+    fields to be set and the fields to be recorded, the fields are set and recorded as they are if not passed
+
+    __Returns:__
+
+    A tuple with the number of documents compacted and the ids of the documents skipped because their fields
+    violate a unique index, documents edited while being compacted are skipped as well and compacted by the next run
+    """
+
+    compacted = 0
+    skipped = []
+
+    for document in collection.find({'changes': {'$exists': True}}, {'changes': True, 'version': True}):
+        initial_version = document.get('version')
+        version = initial_version or 0
+        current_fields = {}
+        records = []
+
+        for change in document['changes']:
+            fields = change.get('fields', {})
+            recorded_fields = fields
+
+            if prepare_fields:
+                fields, recorded_fields = prepare_fields(fields)
+
+            version += 1
+            current_fields.update(fields)
+
+            records.append({
+                key: document['_id'],
+                'version': version,
+                'fields': recorded_fields,
+                'updated_by_user': change.get('updated_by_user'),
+                'updated_datetime': change.get('updated_datetime')
+            })
+
+        inserted_ids = _insert_records(change_collection, records)
+
+        # The document is only compacted if it was not edited since it was read
+        try:
+            result = collection.update_one({'_id': document['_id'], 'version': initial_version},
+                                           {
+                '$set': dict(current_fields, version=version),
+                '$unset': {'changes': ''}
+            })
+        except DuplicateKeyError:
+            skipped.append(document['_id'])
+            result = None
+
+        if result is None or not result.matched_count:
+            if inserted_ids:
+                change_collection.delete_many({'_id': {'$in': inserted_ids}})
+            continue
+
+        compacted += 1
+
+    return compacted, skipped
+
+
+def _insert_records(change_collection, records: list):
+    """
+    This function inserts change records, ignoring the records already inserted.
+
+    __Returns:__
+
+    The ids of the records inserted
+    """
+
+    if not records:
+        return []
+
+    try:
+        return change_collection.insert_many(records, ordered=False).inserted_ids
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+
+        if any(error.get('code') != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+
+        duplicates = {error['index'] for error in errors}
+
+        return [record['_id'] for index, record in enumerate(records) if index not in duplicates]
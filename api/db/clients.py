@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+""" Clients module which holds the process local clients of MongoDb and Redis and their pool stats.
+
+Pre-fork servers (e.g. gunicorn) create the app once and fork the workers afterwards. Clients created
+before the fork would share their sockets between the workers, so the clients are wrapped in a
+`ProcessLocalClient`, which creates the client on first use and again in every forked process.
+
+The connections of the pools are counted by `ConnectionPoolStats` for MongoDb and read from the
+connection pool for Redis, see `mongo_pool_stats` and `redis_pool_stats`.
+
+The time spent in MongoDb and Redis is recorded as the `mongo` and `redis` spans of the current
+request (see `api.metrics.spans`) by `CommandTimingListener`, `TimedRedis` and `TimedAsyncRedis`.
+"""
+
+import os
+import threading
+import weakref
+
+import redis
+import redis.asyncio
+from pymongo import monitoring
+from pymongo.client_options import ClientOptions
+
+from api.metrics.spans import record, span
+
+_process_local_clients = weakref.WeakSet()
+
+
+class ProcessLocalClient:
+    """
+    This class represents a client which is created lazily, once per process.
+
+    All attributes are looked up on the client, so it is used as the client itself:
+
+    ```
+    app.redis = ProcessLocalClient(lambda: redis.Redis(...))
+    app.redis.get(...)
+    ```
+
+    __Parameters:__
+
+    factory (function): The function creating the client
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._client = None
+
+        _process_local_clients.add(self)
+
+    @property
+    def client(self):
+        """
+        The client of the current process, created on first use.
+        """
+
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _reset(self):
+        # The sockets of the client belong to the parent process, so the client is dropped without closing it
+        self._lock = threading.Lock()
+        self._client = None
+
+
+def _reset_after_fork():
+    for client in list(_process_local_clients):
+        client._reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class ConnectionPoolStats(monitoring.ConnectionPoolListener):
+    """
+    This class counts the connections of the MongoDb connection pools of one client.
+
+    It is passed to the client as event listener:
+
+    ```
+    MongoClient(..., event_listeners=[ConnectionPoolStats()])
+    ```
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.checked_in = 0
+        self.check_out_failures = 0
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        """
+        This method returns the counters of the connections.
+
+        __Returns:__
+
+        A dict with the connections `open`, `checked_out` and `idle`, and the totals of
+        connections `created` and `closed` and of `check_out_failures` (e.g. wait queue timeouts)
+        """
+
+        with self._lock:
+            open_connections = self.created - self.closed
+            checked_out = self.checked_out - self.checked_in
+
+            return {
+                'open': open_connections,
+                'checked_out': checked_out,
+                'idle': open_connections - checked_out,
+                'created': self.created,
+                'closed': self.closed,
+                'check_out_failures': self.check_out_failures
+            }
+
+    def connection_created(self, event):
+        self._count('created')
+
+    def connection_closed(self, event):
+        self._count('closed')
+
+    def connection_checked_out(self, event):
+        self._count('checked_out')
+
+    def connection_checked_in(self, event):
+        self._count('checked_in')
+
+    def connection_check_out_failed(self, event):
+        self._count('check_out_failures')
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+class CommandTimingListener(monitoring.CommandListener):
+    """
+    This class records the duration of the MongoDb commands as the `mongo` span of the current request.
+
+    As [motor](https://motor.readthedocs.io) runs the commands in its own threads, the commands of the
+    asyncio client are not recorded.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record('mongo', event.duration_micros / 1e6)
+
+    def failed(self, event):
+        record('mongo', event.duration_micros / 1e6)
+
+
+class TimedPipeline(redis.client.Pipeline):
+    """
+    This class represents a Redis pipeline whose execution is recorded as the `redis` span.
+    """
+
+    def execute(self, raise_on_error: bool = True):
+        with span('redis'):
+            return super().execute(raise_on_error)
+
+
+class TimedRedis(redis.Redis):
+    """
+    This class represents a Redis client whose commands are recorded as the `redis` span of the current request.
+    """
+
+    def execute_command(self, *args, **options):
+        with span('redis'):
+            return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None):
+        return TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class TimedAsyncPipeline(redis.asyncio.client.Pipeline):
+    """
+    This class represents an asyncio Redis pipeline whose execution is recorded as the `redis` span.
+    """
+
+    async def execute(self, raise_on_error: bool = True):
+        with span('redis'):
+            return await super().execute(raise_on_error)
+
+
+class TimedAsyncRedis(redis.asyncio.Redis):
+    """
+    This class represents an asyncio Redis client whose commands are recorded as the `redis` span.
+    """
+
+    async def execute_command(self, *args, **options):
+        with span('redis'):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None):
+        return TimedAsyncPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def mongo_pool_stats(client):
+    """
+    This function returns the pool stats of a MongoDb client created with a `ConnectionPoolStats` listener.
+
+    __Returns:__
+
+    The stats of `ConnectionPoolStats.stats` along with the `max_pool_size`,
+    or None if the client has no `ConnectionPoolStats` listener (e.g. mongomock)
+    """
+
+    options = getattr(client, 'options', None)
+
+    if not isinstance(options, ClientOptions):
+        return None
+
+    for listener in options.event_listeners:
+        if isinstance(listener, ConnectionPoolStats):
+            return {'max_pool_size': options.pool_options.max_pool_size, **listener.stats()}
+
+    return None
+
+
+def redis_pool_stats(client):
+    """
+    This function returns the pool stats of a Redis client.
+
+    __Returns:__
+
+    A dict with the `max_connections` and the connections `open`, `checked_out` and `idle`,
+    or None if the client has no connection pool (e.g. the mock of the tests)
+    """
+
+    pool = getattr(client, 'connection_pool', None)
+
+    if not isinstance(pool, (redis.ConnectionPool, redis.asyncio.ConnectionPool)):
+        return None
+
+    checked_out = len(pool._in_use_connections)
+    idle = len(pool._available_connections)
+
+    return {
+        'max_connections': pool.max_connections,
+        'open': checked_out + idle,
+        'checked_out': checked_out,
+        'idle': idle
+    }
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+""" Dates module which holds the migration of the dates stored as strings.
+
+The dates of the events were stored as the strings passed in the requests, before the schemas converted them
+to datetimes (see `api.schemas.parse_datetime`). String dates do not match the range queries of the resources,
+e.g. `EventSearch.get`, so they are converted in place with:
+
+```bash
+$ flask db convert-dates
+```
+
+The conversion is also run by `flask db compact-changes`, as the embedded changes may hold string dates.
+"""
+
+from api.schemas import parse_datetime
+
+EVENT_DATE_FIELDS = ('start_datetime', 'end_datetime')
+"""The date fields of the events"""
+
+
+def convert_string_dates(collection, fields: tuple):
+    """
+    This function converts the string dates of the documents of a collection to datetimes.
+
+    Every string is converted with `api.schemas.parse_datetime`. A document is only updated if its dates
+    were not edited since they were read, and the strings which are not a date are left as they are.
+
+    __Parameters:__
+
+    collection (Collection): The collection of the documents
+
+    fields (tuple): The names of the date fields
+
+    __Returns:__
+
+    A tuple with the number of documents converted and the ids of the documents with invalid dates
+    """
+
+    converted = 0
+    invalid = []
+    projection = {field: True for field in fields}
+
+    for document in collection.find({'$or': [{field: {'$type': 'string'}} for field in fields]}, projection):
+        dates = {}
+
+        for field in fields:
+            if isinstance(document.get(field), str):
+                try:
+                    dates[field] = parse_datetime(document[field])
+                except ValueError:
+                    invalid.append(document['_id'])
+                    break
+        else:
+            original = {field: document[field] for field in dates}
+            result = collection.update_one(dict(original, _id=document['_id']), {'$set': dates})
+            converted += result.modified_count
+
+    return converted, invalid
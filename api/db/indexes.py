@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+""" Indexes module which holds the registry of the indexes required by the resources.
+
+Every query issued by the resources must be backed by one of the indexes in `INDEXES`.
+The query shapes issued by the resources are listed in `QUERY_SHAPES`, so they can be
+checked against the query planner with `index_report`.
+
+Both can be run from the command line:
+
+```bash
+$ flask db ensure-indexes
+$ flask db index-report
+```
+
+The `email_unique` index cannot be created while several users share an email, which
+`flask db duplicate-emails` lists, so they can be merged before deploying.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+INDEXES = {
+    'users': [
+        IndexModel([('email', ASCENDING)], name='email_unique', unique=True),
+    ],
+    'events': [
+        # Search indexes: equality on cuisine, then the sort keys, then the range filters,
+        # so the range filters are applied on the index keys before the events are fetched
+        IndexModel([('start_datetime', ASCENDING), ('_id', ASCENDING), ('price_per_person', ASCENDING),
+                    ('max_guests_allowed', ASCENDING)], name='start_datetime_search'),
+        IndexModel([('cuisine', ASCENDING), ('start_datetime', ASCENDING), ('_id', ASCENDING),
+                    ('price_per_person', ASCENDING), ('max_guests_allowed', ASCENDING)],
+                   name='cuisine_start_datetime_search'),
+        IndexModel([('price_per_person', ASCENDING), ('_id', ASCENDING), ('start_datetime', ASCENDING),
+                    ('max_guests_allowed', ASCENDING)], name='price_per_person_search'),
+        IndexModel([('cuisine', ASCENDING), ('price_per_person', ASCENDING), ('_id', ASCENDING),
+                    ('start_datetime', ASCENDING), ('max_guests_allowed', ASCENDING)],
+                   name='cuisine_price_per_person_search'),
+    ],
+    'event_changes': [
+        IndexModel([('event_id', ASCENDING), ('version', ASCENDING)], name='event_id_version', unique=True),
+    ],
+    'user_changes': [
+        IndexModel([('user_id', ASCENDING), ('version', ASCENDING)], name='user_id_version', unique=True),
+    ],
+}
+"""The indexes of each collection, created by `ensure_indexes`"""
+
+OBSOLETE_INDEXES = {
+    # No resource queries the events by host
+    'events': ['host_id_start_datetime'],
+}
+"""The indexes which are no longer backing any query, dropped by `ensure_indexes`"""
+
+QueryShape = namedtuple('QueryShape', ['name', 'collection', 'query', 'sort'])
+
+QUERY_SHAPES = [
+    QueryShape('Login.post', 'users', {'email': ''}, None),
+    QueryShape('UserList.get', 'users', {'_id': {'$gt': ObjectId()}}, [('_id', ASCENDING)]),
+    QueryShape('User.get', 'users', {'_id': ObjectId()}, None),
+    QueryShape('Refresh.post', 'users', {'_id': ObjectId(), 'email': ''}, None),
+    QueryShape('UserLookup.get', 'users', {'_id': {'$in': [ObjectId()]}}, None),
+    QueryShape('user history', 'user_changes', {'user_id': ObjectId()}, [('version', ASCENDING)]),
+    QueryShape('EventList.get', 'events', {'_id': {'$gt': ObjectId()}}, [('_id', ASCENDING)]),
+    QueryShape('Event.get', 'events', {'_id': ObjectId()}, None),
+    QueryShape('event history', 'event_changes', {'event_id': ObjectId()}, [('version', ASCENDING)]),
+    QueryShape('EventLookup.get', 'events', {'_id': {'$in': [ObjectId()]}}, None),
+    QueryShape('EventReservations.post', 'events',
+               {'_id': ObjectId(), 'guests': {'$ne': ''},
+                '$expr': {'$lt': [{'$size': {'$ifNull': ['$guests', []]}}, '$max_guests_allowed']}}, None),
+    QueryShape('EventSearch.get', 'events', {}, [('start_datetime', ASCENDING), ('_id', ASCENDING)]),
+    QueryShape('EventSearch.get by cuisine', 'events',
+               {'cuisine': {'$in': ['']}, 'start_datetime': {'$gte': datetime.utcnow()}},
+               [('start_datetime', ASCENDING), ('_id', ASCENDING)]),
+    QueryShape('EventSearch.get by price', 'events',
+               {'price_per_person': {'$lte': 0.0}, 'max_guests_allowed': {'$gte': 0}},
+               [('start_datetime', DESCENDING), ('_id', DESCENDING)]),
+    QueryShape('EventSearch.get sorted by price', 'events',
+               {'start_datetime': {'$gte': datetime.utcnow()}, 'max_guests_allowed': {'$gte': 0}},
+               [('price_per_person', ASCENDING), ('_id', ASCENDING)]),
+    QueryShape('EventSearch.get by cuisine sorted by price', 'events',
+               {'cuisine': {'$in': ['']}, 'price_per_person': {'$gte': 0.0}},
+               [('price_per_person', DESCENDING), ('_id', DESCENDING)]),
+]
+"""The query shapes issued by the resources, checked by `index_report`"""
+
+
+def ensure_indexes(db):
+    """
+    This function creates all indexes of `INDEXES` and drops the indexes of `OBSOLETE_INDEXES`.
+
+    Creating an index which already exists with the same specification is a no-op, 
+    so this function can be called on every start of the app.
+
+    The indexes of each collection are created independently, so an index which can not be created
+    (e.g. `email_unique` while several users share an email) does not prevent the indexes of the other
+    collections. Errors reaching the server are raised.
+
+    __Parameters:__
+
+    db (Database): The database where the collections are stored
+
+    __Returns:__
+
+    The errors of the collections whose indexes could not be created or dropped, by collection name
+    """
+
+    failures = {}
+
+    for collection in list(INDEXES) + [name for name in OBSOLETE_INDEXES if name not in INDEXES]:
+        try:
+            _ensure_collection_indexes(db[collection], INDEXES.get(collection, []),
+                                       OBSOLETE_INDEXES.get(collection, []))
+        except OperationFailure as e:
+            failures[collection] = e
+
+    return failures
+
+
+def _ensure_collection_indexes(collection, indexes, obsolete_index_names):
+    if indexes:
+        collection.create_indexes(indexes)
+
+    existing_names = collection.index_information().keys()
+
+    for index_name in obsolete_index_names:
+        if index_name in existing_names:
+            collection.drop_index(index_name)
+
+
+def unique_email_index_exists(db):
+    """
+    This function checks whether the `email_unique` index exists, which the resources writing emails rely on.
+    """
+
+    return 'email_unique' in db.users.index_information()
+
+
+def duplicate_emails(db):
+    """
+    This function finds the emails shared by several users, which prevent the creation of the `email_unique` index.
+
+    __Returns:__
+
+    A list of tuples with the email and the ids of its users, ordered by email
+    """
+
+    duplicates = db.users.aggregate([
+        {'$group': {'_id': '$email', 'user_ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}},
+        {'$sort': {'_id': 1}}
+    ])
+
+    return [(duplicate['_id'], duplicate['user_ids']) for duplicate in duplicates]
+
+
+def collection_scan_stages(plan):
+    """
+    This function walks through a query plan returned by `explain()` looking for collection scans.
+
+    __Returns:__
+
+    The list of `COLLSCAN` stages found in the plan
+    """
+
+    stages = []
+
+    if isinstance(plan, dict):
+        if plan.get('stage') == 'COLLSCAN':
+            stages.append(plan)
+
+        for value in plan.values():
+            stages.extend(collection_scan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(collection_scan_stages(value))
+
+    return stages
+
+
+def index_report(db):
+    """
+    This function explains every query shape of `QUERY_SHAPES`.
+
+    __Returns:__
+
+    A list of tuples with the query shape and whether its winning plan falls back to a collection scan
+    """
+
+    report = []
+
+    for shape in QUERY_SHAPES:
+        cursor = db[shape.collection].find(shape.query)
+
+        if shape.sort:
+            cursor = cursor.sort(shape.sort)
+
+        plan = cursor.limit(1).explain()['queryPlanner']['winningPlan']
+
+        report.append((shape, bool(collection_scan_stages(plan))))
+
+    return report
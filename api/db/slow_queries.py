@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+""" Slow queries module which logs the MongoDb commands slower than a threshold.
+
+`SlowQueryListener` is registered as command listener of the MongoDb clients by `api.db.init_db`
+when `MONGO_SLOW_QUERY_MS` is set. Every command taking at least `MONGO_SLOW_QUERY_MS` milliseconds
+is logged with the route of the request which issued it, its query shape and its duration, e.g.:
+
+```
+Slow query on GET /api/v1/events: events.find {"filter": {"_id": {"$gt": "?"}}, "sort": {"_id": 1}, "limit": "?"} took 152.3ms
+```
+
+The query shape is the command with its values replaced by `?`, so the same query issued with
+different values has the same shape and no user data is logged. The slow commands are counted per
+query shape and route, and returned by `GET /api/v1/stats/slow-queries`.
+"""
+
+import json
+import threading
+
+from flask import has_request_context, request
+from pymongo import monitoring
+
+SHAPE_FIELDS = ('filter', 'query', 'sort', 'projection', 'hint', 'limit', 'skip', 'pipeline', 'updates',
+                'deletes', 'update', 'key')
+"""The fields of a command kept in its query shape, the others (e.g. the inserted documents) are left out"""
+
+SORT_FIELDS = ('sort', '$sort')
+"""The fields whose values are sort directions, which are kept in the query shape"""
+
+
+def query_shape(command_name: str, command: dict):
+    """
+    This function returns the query shape of a MongoDb command: the collection, the command name
+    and the `SHAPE_FIELDS` of the command with their values replaced by `?`.
+
+    __Example:__
+
+    ```
+    query_shape('find', {'find': 'users', 'filter': {'email': 'jane@doe.com'}, 'limit': 1})
+    # 'users.find {"filter": {"email": "?"}, "limit": "?"}'
+    ```
+    """
+
+    collection = command.get('collection', command.get(command_name))
+    # The `update` command holds the collection in its `update` field, and findAndModify the update
+    fields = {name: _normalize(command[name], name in SORT_FIELDS) for name in SHAPE_FIELDS
+              if name in command and name != command_name}
+
+    return f'{collection}.{command_name} {json.dumps(fields)}'
+
+
+def _normalize(value, keep_values: bool = False):
+    if isinstance(value, dict):
+        return {key: _normalize(item, keep_values or key in SORT_FIELDS) for key, item in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        shapes = []
+
+        for item in value:
+            if not isinstance(item, (dict, list, tuple)):
+                # Lists of values (e.g. of $in) have the same shape whatever their length
+                return '?'
+
+            shape = _normalize(item, keep_values)
+
+            # Statements of the same shape (e.g. of a bulk update) are kept once
+            if shape not in shapes:
+                shapes.append(shape)
+
+        return shapes
+
+    if keep_values and isinstance(value, int):
+        return value
+
+    return '?'
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """
+    This class logs the MongoDb commands slower than the threshold and counts them per query shape and route.
+
+    It is passed to the clients as event listener:
+
+    ```
+    MongoClient(..., event_listeners=[SlowQueryListener(100, app.logger)])
+    ```
+
+    The route is read from the request context of the thread issuing the command, commands issued
+    outside of a request (e.g. by background threads or by the asyncio client) have no route.
+
+    __Parameters:__
+
+    threshold_ms (float): The duration in milliseconds from which a command is slow
+
+    logger (Logger): The logger the slow commands are logged to
+    """
+
+    def __init__(self, threshold_ms: float, logger):
+        self.threshold_ms = threshold_ms
+        self.logger = logger
+
+        self._started = {}
+        self._shapes = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        # The succeeded and failed events carry neither the command nor the request context
+        route = None
+
+        if has_request_context() and request.url_rule is not None:
+            route = f'{request.method} {request.url_rule.rule}'
+
+        self._started[(event.connection_id, event.request_id)] = (event.command, route)
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+    def _finished(self, event):
+        started = self._started.pop((event.connection_id, event.request_id), None)
+        duration_ms = event.duration_micros / 1000
+
+        if started is None or duration_ms < self.threshold_ms:
+            return
+
+        command, route = started
+        shape = query_shape(event.command_name, command)
+
+        self.logger.warning(f'Slow query on {route or "no route"}: {shape} took {duration_ms:.1f}ms')
+
+        with self._lock:
+            counters = self._shapes.get((shape, route))
+
+            if counters is None:
+                counters = self._shapes[(shape, route)] = [0, 0.0, 0.0]
+
+            counters[0] += 1
+            counters[1] += duration_ms
+            counters[2] = max(counters[2], duration_ms)
+
+    def stats(self):
+        """
+        This method returns the slow commands counted per query shape and route.
+
+        __Returns:__
+
+        A list of dicts with the `shape`, the `route`, the `count` of slow commands and their
+        `total_ms` and `max_ms` durations, sorted from the most to the least frequent
+        """
+
+        with self._lock:
+            stats = [{
+                'shape': shape,
+                'route': route,
+                'count': count,
+                'total_ms': round(total_ms, 3),
+                'max_ms': round(max_ms, 3)
+            } for (shape, route), (count, total_ms, max_ms) in self._shapes.items()]
+
+        return sorted(stats, key=lambda stat: (-stat['count'], -stat['total_ms']))
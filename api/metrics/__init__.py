@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+""" Metrics module where the timing of the requests is initialized.
+
+- Spans of the work done per request (MongoDb, Redis, bcrypt and jwt): `api.metrics.spans`
+- Latency histograms and error counts in the Prometheus format: `api.metrics.prometheus`
+
+With `SERVER_TIMING_ENABLED` every response carries a [Server-Timing](https://www.w3.org/TR/server-timing/)
+header with the milliseconds spent per span and in `total`, e.g. `mongo;dur=1.2, bcrypt;dur=240.5, total;dur=243.1`.
+As it tells every client where the time of a request goes (e.g. in bcrypt on a login), it is only enabled
+by the development config. The metrics are exported on `/metrics` to authenticated users (see `api.resources.metrics`).
+
+The requests are timed by a WSGI middleware until the response starts, so the time spent streaming
+the body of a response (e.g. the NDJSON exports) is not included.
+"""
+
+from time import perf_counter
+
+from api.metrics.prometheus import RequestMetrics
+from api.metrics.spans import finish_request, start_request
+
+
+def init_metrics(app):
+    """This function initializes the request metrics, stored in the app instance as `app.metrics`.
+
+    With `METRICS_ENABLED` the requests are timed by `TimingMiddleware`, which adds the `Server-Timing` header
+    to the responses with `SERVER_TIMING_ENABLED`.
+
+    __Parameters:__
+
+    app (app): The app instance
+    """
+
+    app.metrics = RequestMetrics(app.config['METRICS_BUCKETS'])
+
+    if app.config['METRICS_ENABLED']:
+        app.wsgi_app = TimingMiddleware(app.wsgi_app, app.metrics, app.config['SERVER_TIMING_ENABLED'])
+
+
+class TimingMiddleware:
+    """
+    This class represents the WSGI middleware recording the spans and the metrics of every request.
+
+    __Parameters:__
+
+    wsgi_app (function): The WSGI app to time
+
+    metrics (RequestMetrics): The metrics the requests are recorded in
+
+    server_timing_enabled (bool): Whether the `Server-Timing` header is added to the responses
+    """
+
+    def __init__(self, wsgi_app, metrics: RequestMetrics, server_timing_enabled: bool = False):
+        self.wsgi_app = wsgi_app
+        self.metrics = metrics
+        self.server_timing_enabled = server_timing_enabled
+
+    def __call__(self, environ, start_response):
+        spans = start_request()
+
+        def timed_start_response(status, headers, exc_info=None):
+            record_response(self.metrics, environ, status, headers, spans, self.server_timing_enabled)
+
+            return start_response(status, headers, exc_info)
+
+        try:
+            return self.wsgi_app(environ, timed_start_response)
+        finally:
+            finish_request()
+
+
+def record_response(metrics: RequestMetrics, environ: dict, status: str, headers: list, spans,
+                    server_timing_enabled: bool = False):
+    """
+    This function records a request when its response starts, and adds the `Server-Timing` header to the headers
+    if `server_timing_enabled`.
+
+    The route is read from the request created by Flask for the environment, requests not matching
+    any route are recorded as `unmatched`.
+    """
+
+    seconds = perf_counter() - spans.start
+
+    request = environ.get('werkzeug.request')
+    url_rule = getattr(request, 'url_rule', None)
+    route = url_rule.rule if url_rule is not None else 'unmatched'
+
+    metrics.observe(environ['REQUEST_METHOD'], route, status[:3], seconds, spans.durations)
+
+    if server_timing_enabled:
+        headers.append(('Server-Timing', server_timing(spans.durations, seconds)))
+
+
+def server_timing(durations: dict, total: float):
+    """
+    This function formats the spans as value of the `Server-Timing` header.
+
+    __Returns:__
+
+    The metrics separated by comma, with their duration in milliseconds
+    """
+
+    if not durations:
+        return f'total;dur={total * 1000:.3f}'
+
+    metrics = [f'{name};dur={seconds * 1000:.3f}' for name, seconds in durations.items()]
+    metrics.append(f'total;dur={total * 1000:.3f}')
+
+    return ', '.join(metrics)
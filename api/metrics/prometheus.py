@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+""" Prometheus module which holds the metrics of the requests in the
+[text exposition format](https://prometheus.io/docs/instrumenting/exposition_formats/).
+
+The metrics are kept per worker process, so every worker is scraped on its own.
+"""
+
+import threading
+from bisect import bisect_left
+from collections import deque
+
+
+def _labels(names, values, extra: str = ''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+
+    if extra:
+        pairs.append(extra)
+
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(value: float):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """
+    This class represents a Prometheus counter with labels.
+
+    __Parameters:__
+
+    lock (Lock): The lock guarding the values, shared by the metrics updated together
+    """
+
+    def __init__(self, name: str, documentation: str, labels: tuple, lock=None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+
+        self._values = {}
+        self._lock = lock or threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._inc(label_values, amount)
+
+    def _inc(self, label_values: tuple, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labels, label_values)} {_format(value)}')
+
+        return lines
+
+
+class Histogram:
+    """
+    This class represents a Prometheus histogram with labels.
+
+    __Parameters:__
+
+    buckets (tuple): The upper bounds of the buckets, in increasing order, without `+Inf`
+
+    lock (Lock): The lock guarding the values, shared by the metrics updated together
+    """
+
+    def __init__(self, name: str, documentation: str, labels: tuple, buckets: tuple, lock=None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+
+        self._values = {}
+        self._lock = lock or threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            self._observe(value, label_values)
+
+    def _observe(self, value: float, label_values: tuple):
+        # Observations are counted in their bucket only, the cumulative counts are computed when rendering
+        values = self._values.get(label_values)
+
+        if values is None:
+            values = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+
+        values[0][bisect_left(self.buckets, value)] += 1
+        values[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+
+        with self._lock:
+            for label_values, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _format(bound)
+                    labels = _labels(self.labels, label_values, f'le="{le}"')
+
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+
+                lines.append(f'{self.name}_sum{_labels(self.labels, label_values)} {repr(total)}')
+                lines.append(f'{self.name}_count{_labels(self.labels, label_values)} {cumulative}')
+
+        return lines
+
+
+class RequestMetrics:
+    """
+    This class represents the metrics of the requests handled by the worker:
+
+    - `http_request_duration_seconds`: histogram of the latency by method and route
+    - `http_request_span_duration_seconds`: histogram of the time spent in MongoDb, Redis, bcrypt and jwt by route
+    - `http_requests_total`: counter of the requests by method, route and status
+    - `http_request_errors_total`: counter of the requests answered with a `5xx` status by method and route
+
+    The requests are buffered without taking the lock and only added to the metrics when these are rendered,
+    i.e. when `/metrics` is scraped, or by the request filling the buffer up to `max_pending` requests.
+    So a request neither waits for the lock nor updates the histograms.
+
+    __Parameters:__
+
+    buckets (tuple): The upper bounds of the buckets of the histograms in seconds
+
+    max_pending (int): The maximum number of requests buffered before they are added to the metrics
+    """
+
+    def __init__(self, buckets: tuple, max_pending: int = 4096):
+        # A single lock for all metrics, so the buffered requests are recorded with one acquisition
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._max_pending = max_pending
+
+        self.duration = Histogram('http_request_duration_seconds', 'Latency of the requests.',
+                                  ('method', 'route'), buckets, self._lock)
+        self.span_duration = Histogram('http_request_span_duration_seconds',
+                                       'Time spent per span (mongo, redis, bcrypt, jwt) during the requests.',
+                                       ('method', 'route', 'span'), buckets, self._lock)
+        self.requests = Counter('http_requests_total', 'Requests handled.', ('method', 'route', 'status'),
+                                self._lock)
+        self.errors = Counter('http_request_errors_total', 'Requests answered with a server error.',
+                              ('method', 'route'), self._lock)
+
+    def observe(self, method: str, route: str, status: str, seconds: float, spans: dict):
+        """
+        This method records one request.
+
+        __Parameters:__
+
+        status (str): The status code of the response, e.g. `200`
+        """
+
+        # Appending to a deque is thread safe without the lock
+        self._pending.append((method, route, status, seconds, spans))
+
+        if len(self._pending) >= self._max_pending:
+            self._flush()
+
+    def _flush(self):
+        pending = self._pending
+
+        with self._lock:
+            while pending:
+                method, route, status, seconds, spans = pending.popleft()
+                key = (method, route)
+
+                self.duration._observe(seconds, key)
+                self.requests._inc((method, route, status))
+
+                for name, span_seconds in spans.items():
+                    self.span_duration._observe(span_seconds, (method, route, name))
+
+                if status[0] == '5':
+                    self.errors._inc(key)
+
+    def render(self):
+        """
+        This method returns all metrics in the text exposition format, including the buffered requests.
+        """
+
+        self._flush()
+
+        lines = []
+
+        for metric in (self.duration, self.span_duration, self.requests, self.errors):
+            lines.extend(metric.render())
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+""" Spans module which holds the time spent per kind of work during the current request.
+
+The work is timed where it happens, e.g.:
+
+```
+with span('jwt'):
+    data = jwt.decode(...)
+```
+
+The spans are only recorded between `start_request` and `finish_request`, which are called by the
+`api.metrics.TimingMiddleware` and by the ASGI app for its views. Work done outside of a request (e.g. by background threads)
+is not recorded. The current spans are held in a context variable, so they follow the request
+in its thread or, for the views of the ASGI app, in its task.
+"""
+
+from contextlib import nullcontext
+from contextvars import ContextVar
+from time import perf_counter
+
+
+class RequestSpans:
+    """
+    This class represents the spans of one request: its start and the seconds spent per span name.
+    """
+
+    __slots__ = ('start', 'durations')
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.durations = {}
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+
+_current_spans = ContextVar('request_spans', default=None)
+
+
+def start_request():
+    """
+    This function starts recording the spans of a request.
+
+    __Returns:__
+
+    The `RequestSpans` of the request
+    """
+
+    spans = RequestSpans()
+    _current_spans.set(spans)
+
+    return spans
+
+
+def finish_request():
+    """
+    This function stops recording the spans of the current request.
+
+    __Returns:__
+
+    The `RequestSpans` of the request, or None if no request was started
+    """
+
+    spans = _current_spans.get()
+    _current_spans.set(None)
+
+    return spans
+
+
+def record(name: str, seconds: float):
+    """
+    This function adds the seconds to the span of the current request, if any.
+    """
+
+    spans = _current_spans.get()
+
+    if spans is not None:
+        spans.add(name, seconds)
+
+
+def span(name: str):
+    """
+    This function times the work of the `with` block as the span of the given name.
+
+    Outside of a request the block is not timed at all.
+
+    __Returns:__
+
+    The context manager timing the block
+    """
+
+    spans = _current_spans.get()
+
+    if spans is None:
+        return _NOT_TIMED
+
+    return _Span(spans, name)
+
+
+class _Span:
+    # A plain context manager, as a generator based one costs several times more per block
+    __slots__ = ('spans', 'name', 'start')
+
+    def __init__(self, spans: RequestSpans, name: str):
+        self.spans = spans
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.spans.add(self.name, perf_counter() - self.start)
+
+
+_NOT_TIMED = nullcontext()
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+""" Passwords module where the password hasher is initialized.
+
+The hasher itself can be found here: `api.passwords.hasher`
+"""
+
+from api.passwords.hasher import PasswordHasher
+
+
+def init_password_hasher(app):
+    """This function initializes the password hasher.
+
+    The hasher is stored in the app instance as `app.password_hasher` and is configured with:
+
+    - `BCRYPT_ROUNDS`: The bcrypt cost factor
+    - `PASSWORD_HASHER_WORKERS`: The number of processes hashing passwords
+    - `PASSWORD_HASHER_MAX_PENDING`: The maximum number of hashes being computed or waiting for a process,
+      0 for no limit
+
+    __Parameters:__
+
+    app (app): The app instance
+    """
+
+    app.password_hasher = PasswordHasher(app.config['BCRYPT_ROUNDS'],
+                                         app.config['PASSWORD_HASHER_WORKERS'],
+                                         app.config['PASSWORD_HASHER_MAX_PENDING'])
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+""" Hasher module which holds the logic for hashing and checking passwords with [bcrypt](https://pypi.org/project/bcrypt/).
+
+bcrypt is CPU bound by design, so the work is done in a process pool and not in the thread handling the request.
+The number of pending hashes is bounded: when the pool is saturated `PasswordHasherBusy` is raised
+immediately instead of queuing the request behind all others.
+
+The processes of the pool are started by a `forkserver` (or `spawn` where not available) and not forked
+from the app process, which runs threads (e.g. the pymongo monitors and the background threads of `api.cache`
+and `api.counters`): forking a process running threads can deadlock, and would start the background threads
+of `api.background` in every process of the pool.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+from api.metrics.spans import span
+
+
+class PasswordHasherBusy(Exception):
+    """
+    This exception is raised when the maximum number of pending hashes has been reached.
+    """
+
+
+def hash_password(password: bytes, rounds: int):
+    """
+    This function hashes a password with a new salt.
+
+    __Returns:__
+
+    A tuple with the hashed password and the salt
+    """
+
+    password_salt = bcrypt.gensalt(rounds)
+
+    return bcrypt.hashpw(password, password_salt), password_salt
+
+
+def check_password(password: bytes, hashed_password: bytes):
+    """
+    This function checks a password against its hash.
+
+    __Returns:__
+
+    True if the password matches the hash
+    """
+
+    return bcrypt.checkpw(password, hashed_password)
+
+
+def _pool_context():
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+    return multiprocessing.get_context(start_method)
+
+
+class PasswordHasher:
+    """
+    This class represents the password hasher of the app.
+
+    __Parameters:__
+
+    rounds (int): The bcrypt cost factor of new hashes
+
+    workers (int): The number of processes of the pool, with 0 the hashes are computed in the calling thread
+
+    max_pending (int): The maximum number of hashes being computed or waiting for a process, with 0 unbounded
+    """
+
+    def __init__(self, rounds: int, workers: int, max_pending: int):
+        self.rounds = rounds
+
+        self._workers = workers
+        self._pending = threading.BoundedSemaphore(max_pending) if max_pending > 0 else None
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def hash(self, password: str):
+        """
+        This method hashes a password with the configured cost factor.
+
+        __Returns:__
+
+        A tuple with the hashed password and the salt
+
+        __Raises:__
+
+        PasswordHasherBusy if the maximum number of pending hashes has been reached
+        """
+
+        return self._run(hash_password, password.encode('utf-8'), self.rounds)
+
+    def check(self, password: str, hashed_password: bytes):
+        """
+        This method checks a password against its hash.
+
+        __Returns:__
+
+        True if the password matches the hash
+
+        __Raises:__
+
+        PasswordHasherBusy if the maximum number of pending hashes has been reached
+        """
+
+        return self._run(check_password, password.encode('utf-8'), hashed_password)
+
+    async def async_hash(self, password: str):
+        """
+        This method hashes a password like `hash`, awaiting the process pool instead of blocking the thread,
+        for the coroutines of the ASGI views (see `api.asgi`).
+
+        __Returns:__
+
+        A tuple with the hashed password and the salt
+
+        __Raises:__
+
+        PasswordHasherBusy if the maximum number of pending hashes has been reached
+        """
+
+        return await self._async_run(hash_password, password.encode('utf-8'), self.rounds)
+
+    async def async_check(self, password: str, hashed_password: bytes):
+        """
+        This method checks a password against its hash like `check`, awaiting the process pool
+        instead of blocking the thread.
+
+        __Returns:__
+
+        True if the password matches the hash
+
+        __Raises:__
+
+        PasswordHasherBusy if the maximum number of pending hashes has been reached
+        """
+
+        return await self._async_run(check_password, password.encode('utf-8'), hashed_password)
+
+    def needs_rehash(self, hashed_password: bytes):
+        """
+        This method checks whether a hash was created with a cost factor other than the configured one.
+
+        A hash whose cost factor can not be read (e.g. not a bcrypt hash) is hashed again as well.
+
+        __Returns:__
+
+        True if the password should be hashed again
+        """
+
+        if isinstance(hashed_password, str):
+            hashed_password = hashed_password.encode('utf-8')
+
+        try:
+            rounds = int(hashed_password.split(b'$')[2])
+        except (AttributeError, IndexError, TypeError, ValueError):
+            return True
+
+        return rounds != self.rounds
+
+    def _run(self, function, *args):
+        if self._pending is None:
+            return self._call(function, *args)
+
+        if not self._pending.acquire(blocking=False):
+            raise PasswordHasherBusy()
+
+        try:
+            return self._call(function, *args)
+        finally:
+            self._pending.release()
+
+    def _call(self, function, *args):
+        with span('bcrypt'):
+            if self._workers <= 0:
+                return function(*args)
+
+            return self._get_executor().submit(function, *args).result()
+
+    async def _async_run(self, function, *args):
+        if self._pending is None:
+            return await self._async_call(function, *args)
+
+        if not self._pending.acquire(blocking=False):
+            raise PasswordHasherBusy()
+
+        try:
+            return await self._async_call(function, *args)
+        finally:
+            self._pending.release()
+
+    async def _async_call(self, function, *args):
+        with span('bcrypt'):
+            if self._workers <= 0:
+                return function(*args)
+
+            return await asyncio.wrap_future(self._get_executor().submit(function, *args))
+
+    def _get_executor(self):
+        # The pool is created on first use in each process, a pool inherited from a forked parent can not be used
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self._workers, mp_context=_pool_context())
+                self._executor_pid = os.getpid()
+
+            return self._executor
@@ -4,9 +4,12 @@
 
 from flask_restful import Api
 
-from api.resources.auth import Login, Logout
-from api.resources.events import EventList, Event
-from api.resources.users import UserList, User
+from api.resources.auth import Login, Logout, Refresh
+from api.resources.events import EventList, Event, EventBulk, EventExport, EventLookup, EventSearch, \
+    EventReservations
+from api.resources.users import UserList, User, UserExport, UserLookup
+from api.resources.stats import PoolStats, SlowQueryStats, Stats
+from api.resources.metrics import Metrics
 from api.resources.constants import Routes
 
 
@@ -17,8 +20,20 @@ def init_resources(app):
     api = Api(app)
 
     api.add_resource(EventList, Routes.EVENTS_V1)
+    api.add_resource(EventExport, Routes.EVENTS_EXPORT_V1)
+    api.add_resource(EventSearch, Routes.EVENTS_SEARCH_V1)
+    api.add_resource(EventBulk, Routes.EVENTS_BULK_V1)
+    api.add_resource(EventLookup, Routes.EVENTS_LOOKUP_V1)
     api.add_resource(Event, f'{Routes.EVENTS_V1}/<string:id>')
+    api.add_resource(EventReservations, f'{Routes.EVENTS_V1}/<string:id>/reservations')
     api.add_resource(UserList, Routes.USERS_V1)
+    api.add_resource(UserExport, Routes.USERS_EXPORT_V1)
+    api.add_resource(UserLookup, Routes.USERS_LOOKUP_V1)
     api.add_resource(User, f'{Routes.USERS_V1}/<string:id>')
     api.add_resource(Login, Routes.LOGIN_V1)
-    api.add_resource(Logout, Routes.LOGOUT_V1)
\ No newline at end of file
+    api.add_resource(Logout, Routes.LOGOUT_V1)
+    api.add_resource(Refresh, Routes.REFRESH_V1)
+    api.add_resource(Stats, Routes.STATS_V1)
+    api.add_resource(PoolStats, Routes.STATS_POOLS_V1)
+    api.add_resource(SlowQueryStats, Routes.STATS_SLOW_QUERIES_V1)
+    api.add_resource(Metrics, Routes.METRICS)
\ No newline at end of file
@@ -2,15 +2,40 @@
 """ Auth module which is responsible for the user authentication and authorization
 """
 
-from flask import make_response, request, current_app as app
-from flask_restful import Resource, reqparse
-from datetime import datetime, timedelta
+from flask import g, make_response, request, current_app as app
+from flask_restful import Resource
 from functools import wraps
 from bson import ObjectId
 import jwt
-import bcrypt
+import time
 
+from api.cache.denylist import async_is_revoked, is_revoked, revoke_tokens
+from api.cache.session import invalidate_sessions
+from api.passwords.hasher import PasswordHasherBusy
 from api.resources.constants import HttpStatusCode
+from api.resources.ratelimit import RateLimit, client_ip, rate_limited, request_email
+from api.resources.tokens import ACCESS_TOKEN, REFRESH_TOKEN, create_session, create_token, decode_token, \
+    session_key, verify_token
+from api.schemas import Field, Schema
+
+login_schema = Schema(
+    Field('email'),
+    Field('password'),
+    location='values'
+)
+"""The arguments of the login"""
+
+LOGIN_LIMITS = (
+    RateLimit('ip', client_ip, 'RATE_LIMIT_LOGIN_IP'),
+    RateLimit('email', request_email, 'RATE_LIMIT_LOGIN_EMAIL')
+)
+"""The rate limits of the login, see `api.resources.ratelimit`"""
+
+refresh_schema = Schema(
+    Field('refresh_token'),
+    location='values'
+)
+"""The arguments of the refresh of an access token"""
 
 
 def token_required(f):
@@ -31,10 +56,16 @@ def token_required(f):
     The token is __invalid__ if:
 
     - Token secret key does not match app secret key
-    - Token issuer does not match client requesting the resource (route)
-    - Token audience does not match app domain
-    - Token has expired or was not found in redis data store
-    - Token user could not be found in the database
+    - Token is not an access token (e.g. a refresh token)
+    - Token or its session was revoked (e.g. by a logout)
+
+    An expired token is answered with [TOKEN_EXPIRED] and the status 401, so the client knows
+    it has to refresh it (see `Refresh`).
+
+    The access tokens are short-lived (see `api.resources.tokens`), so they are verified from their signature
+    and the token denylist mirrored in memory (see `api.cache.denylist`). Redis is only queried for the tokens
+    the denylist may contain, so a valid token is verified without any Redis or MongoDb round trip.
+    The claims of the token are available as `g.token_claims`.
 
     __Returns:__
 
@@ -42,63 +73,121 @@ def token_required(f):
     """
     @wraps(f)
     def decorated(self, *args, **kwargs):
-        token = None
+        user_id = _authenticate()
 
-        if 'Access-Token' in request.headers:
-            token = request.headers['Access-Token']
-        else:
-            return make_response('[HTTP_403_FORBIDDEN]', HttpStatusCode.HTTP_403_FORBIDDEN)
+        if not isinstance(user_id, str):
+            return user_id
 
-        try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+        return f(self, user_id, *args, **kwargs)
+
+    return decorated
 
-            claim_sub = data['sub']
-            claim_email = data['email']
 
-            token_alive = app.redis.get(claim_sub)
+def async_token_required(f):
+    """
+    This function defines the same decorator as `token_required` for the coroutines of the ASGI views
+    (see `api.asgi`). As the token is verified in memory, nothing is awaited but the Redis check of the tokens
+    the denylist may contain, revoked tokens or false positives, which uses `app.async_redis`.
 
-            if not token_alive:
-                return make_response('[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+    __Example__:
 
-            user_id = claim_sub.replace('auth|', '')
+    ```
+    @async_token_required
+    async def get_stats(user_id):
+        ...
+    ```
 
-            user = app.mongo.db.users.find_one({'_id': ObjectId(user_id), 'email': claim_email})
+    __Returns:__
 
-            if not user:
-                return make_response('[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+    The user id to the decorated coroutine
+    """
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        user_id = await _async_authenticate()
 
-        except Exception as e:
-            # TODO: Log the exception
-            return make_response('[INVALID_TOKEN]', HttpStatusCode.HTTP_500_INTERNAL_SERVER_ERROR)
+        if not isinstance(user_id, str):
+            return user_id
 
-        return f(self, user_id, *args, **kwargs)
+        return await f(user_id, *args, **kwargs)
 
     return decorated
 
 
+def _authenticate():
+    # Returns the user id of the access token of the request, or the error response
+    data = _verify_access_token()
+
+    if isinstance(data, dict) and is_revoked(app, data['jti'], data['sid']):
+        return make_response('[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    return _token_user_id(data)
+
+
+async def _async_authenticate():
+    # Same as `_authenticate`, with the denylist checked against `app.async_redis`
+    data = _verify_access_token()
+
+    if isinstance(data, dict) and await async_is_revoked(app, data['jti'], data['sid']):
+        return make_response('[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    return _token_user_id(data)
+
+
+def _verify_access_token():
+    # Returns the claims of the access token of the request, not checked against the denylist, or the error response
+    if 'Access-Token' not in request.headers:
+        return make_response('[HTTP_403_FORBIDDEN]', HttpStatusCode.HTTP_403_FORBIDDEN)
+
+    try:
+        data = verify_token(request.headers['Access-Token'], ACCESS_TOKEN)
+    except jwt.ExpiredSignatureError:
+        return make_response('[TOKEN_EXPIRED]', HttpStatusCode.HTTP_401_UNAUTHORIZED)
+    except jwt.InvalidTokenError:
+        return make_response('[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+    except Exception:
+        app.logger.exception('The access token could not be verified')
+        return make_response('[HTTP_500_INTERNAL_SERVER_ERROR]', HttpStatusCode.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    if data is None:
+        return make_response('[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    return data
+
+
+def _token_user_id(data):
+    # Returns the user id of the verified claims, or the error response
+    if not isinstance(data, dict):
+        return data
+
+    g.token_claims = data
+
+    return data['sub'].replace('auth|', '')
+
+
 class Login(Resource):
     """
     This class represents the resouce responsible for executing the user login.
     """
 
-    def __init__(self):
-        self.parser = reqparse.RequestParser()
-        self.parser.add_argument('email', required=True)
-        self.parser.add_argument('password', required=True)
-
+    @rate_limited('login', *LOGIN_LIMITS)
     def post(self):
         """
         This method executes the login based on email and password passed in the arguments.
+
+        The logins are rate limited per IP and per email, see `api.resources.ratelimit`.
         
         __Returns:__
 
+        * If too many logins were tried: A json response with the text [HTTP_429_TOO_MANY_REQUESTS]
         * If user not found: A json response with the text [HTTP_404_NOT_FOUND]
         * If password does not match: A json response with the text [HTTP_401_UNAUTHORIZED]
+        * If the password hasher is busy: A json response with the text [HTTP_503_SERVICE_UNAVAILABLE]
         * If internal server error: A json response with text [HTTP_500_INTERNAL_SERVER_ERROR]
-        * If success: A json response with an access token
+        * If success: A json response with the access `token`, the `refresh_token` of the new session
+          and the seconds until the access token `expires_in`, see `api.resources.tokens`
         """
 
-        args = self.parser.parse_args()
+        args = login_schema.parse()
         email = args['email'].strip()
         password = args['password'].strip()
 
@@ -109,30 +198,120 @@ class Login(Resource):
         if not user:
             return make_response('[HTTP_404_NOT_FOUND]', HttpStatusCode.HTTP_404_NOT_FOUND)
 
-        if bcrypt.checkpw(password.encode('utf-8'), user['hashed_password']):
+        try:
+            password_matches = app.password_hasher.check(password, user['hashed_password'])
+        except PasswordHasherBusy:
+            return make_response('[HTTP_503_SERVICE_UNAVAILABLE]', HttpStatusCode.HTTP_503_SERVICE_UNAVAILABLE)
+
+        if password_matches:
+            self._rehash_password(user, password)
+
             try:
-                expires_in = timedelta(days=60)
+                access_token, refresh_token = create_session(user)
+
+                return make_response({
+                    'token': access_token,
+                    'refresh_token': refresh_token,
+                    'expires_in': app.config['ACCESS_TOKEN_TTL']
+                }, HttpStatusCode.HTTP_201_CREATED)
+            except Exception:
+                app.logger.exception('The session could not be created')
+                return make_response('[HTTP_500_INTERNAL_SERVER_ERROR]', HttpStatusCode.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return make_response('[HTTP_401_UNAUTHORIZED]', HttpStatusCode.HTTP_401_UNAUTHORIZED)
 
-                user_id = str(user['_id'])
+    def _rehash_password(self, user, password):
+        """
+        This method hashes the password again if it was hashed with a cost factor other than `BCRYPT_ROUNDS`.
 
-                payload = {
-                    'exp': datetime.utcnow() + expires_in,
-                    'iat': datetime.utcnow(),
-                    'sub': f'auth|{user_id}',
-                    'email': email,
-                    'phone:': user['phone']
-                }
+        The hash is only replaced if it was not changed in the meantime. If the hasher is busy 
+        the password is hashed again on the next login.
+        """
 
-                token = jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256').decode('utf-8')
+        if not app.password_hasher.needs_rehash(user['hashed_password']):
+            return
 
-                app.redis.setex(payload['sub'], int(expires_in.total_seconds()), token)
+        try:
+            hashed_password, password_salt = app.password_hasher.hash(password)
+        except PasswordHasherBusy:
+            return
 
-                return make_response({'token': token}, HttpStatusCode.HTTP_201_CREATED)
-            except Exception as e:
-                # TODO: Log the exception
-                return make_response('[HTTP_500_INTERNAL_SERVER_ERROR]', HttpStatusCode.HTTP_500_INTERNAL_SERVER_ERROR)
+        app.mongo.db.users.update_one({'_id': user['_id'], 'hashed_password': user['hashed_password']},
+                                      {
+            '$set': {
+                'hashed_password': hashed_password,
+                'password_salt': password_salt
+            }
+        })
 
-        return make_response('[HTTP_401_UNAUTHORIZED]', HttpStatusCode.HTTP_401_UNAUTHORIZED)
+
+class Refresh(Resource):
+    """
+    This class represents the resource responsible for renewing the access token of a session.
+    """
+
+    def post(self):
+        """
+        This method creates a new access token from the refresh token passed in the arguments.
+
+        The session must not be revoked and its key must still exist in Redis, see `api.resources.tokens`.
+        The validated sessions are cached per worker, see `api.cache.session`.
+
+        __Returns:__
+
+        * If the refresh token has expired: A json response with the text [TOKEN_EXPIRED]
+        * If the refresh token is not valid or its session ended: A json response with the text [INVALID_TOKEN]
+        * If internal server error: A json response with text [HTTP_500_INTERNAL_SERVER_ERROR]
+        * If success: A json response with the access `token` and the seconds until it `expires_in`
+        """
+
+        args = refresh_schema.parse()
+
+        try:
+            data = decode_token(args['refresh_token'], REFRESH_TOKEN)
+
+            if data is None:
+                return make_response('[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+            user = app.session_cache.get(data['sub'], data['sid'])
+
+            if user is None:
+                user = self._validate_session(data)
+
+                if not user:
+                    return make_response('[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+                app.session_cache.set(data['sub'], data['sid'], user)
+
+            token = create_token(user, data['sid'], ACCESS_TOKEN)
+        except jwt.ExpiredSignatureError:
+            return make_response('[TOKEN_EXPIRED]', HttpStatusCode.HTTP_401_UNAUTHORIZED)
+        except jwt.InvalidTokenError:
+            return make_response('[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+        except Exception:
+            app.logger.exception('The access token could not be refreshed')
+            return make_response('[HTTP_500_INTERNAL_SERVER_ERROR]', HttpStatusCode.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return make_response({'token': token, 'expires_in': app.config['ACCESS_TOKEN_TTL']},
+                             HttpStatusCode.HTTP_201_CREATED)
+
+    def _validate_session(self, data):
+        """
+        This method checks that the session key of the refresh token exists in Redis
+        and loads the user of the token, which must still have the email of the token.
+
+        __Returns:__
+
+        The user with its `email` and `phone`, or None if the session ended or the user was not found
+        """
+
+        user_id = data['sub'].replace('auth|', '')
+
+        if not app.redis.get(session_key(user_id, data['sid'])):
+            return None
+
+        return app.mongo.db.users.find_one({'_id': ObjectId(user_id), 'email': data['email']},
+                                           {'email': 1, 'phone': 1})
 
 
 class Logout(Resource):
@@ -143,15 +322,24 @@ class Logout(Resource):
     @token_required
     def delete(self, user_id):
         """
-        This method removes the token of the authenticated user from Redis.
+        This method ends the session of the access token: its key is removed from Redis, so its refresh token
+        cannot be used anymore, and the token and the session are denylisted in all workers until their access
+        tokens expire, see `api.cache.denylist`.
 
         __Returns__:
             
         This method does not return content as per default for HTTP Status Code 204
         """
 
-        # TODO: Blacklist the Token?
-        app.redis.delete(f'auth|{user_id}')
+        claims = g.token_claims
 
-        return make_response('[HTTP_204_NO_CONTENT]', HttpStatusCode.HTTP_204_NO_CONTENT)
+        app.redis.delete(session_key(user_id, claims['sid']))
+        invalidate_sessions(app, claims['sub'])
+        revoke_tokens(app, {
+            claims['jti']: claims['exp'],
+            # The session key is deleted, so no access token can be refreshed anymore: the other access tokens
+            # of the session expire at most ACCESS_TOKEN_TTL seconds from now
+            claims['sid']: time.time() + app.config['ACCESS_TOKEN_TTL']
+        })
 
+        return make_response('[HTTP_204_NO_CONTENT]', HttpStatusCode.HTTP_204_NO_CONTENT)
@@ -6,14 +6,18 @@ class HttpStatusCode:
     HTTP_200_OK = 200
     HTTP_201_CREATED = 201
     HTTP_204_NO_CONTENT = 204
+    HTTP_207_MULTI_STATUS = 207
 
     HTTP_400_BAD_REQUEST = 400
     HTTP_401_UNAUTHORIZED = 401
     HTTP_403_FORBIDDEN = 403
     HTTP_404_NOT_FOUND = 404
     HTTP_409_CONFLICT = 409
+    HTTP_413_PAYLOAD_TOO_LARGE = 413
+    HTTP_429_TOO_MANY_REQUESTS = 429
 
     HTTP_500_INTERNAL_SERVER_ERROR = 500
+    HTTP_503_SERVICE_UNAVAILABLE = 503
 
 
 class Routes:
@@ -22,6 +26,17 @@ class Routes:
     """
 
     EVENTS_V1 = '/api/v1/events'
+    EVENTS_EXPORT_V1 = '/api/v1/events/export'
+    EVENTS_SEARCH_V1 = '/api/v1/events/search'
+    EVENTS_BULK_V1 = '/api/v1/events/bulk'
+    EVENTS_LOOKUP_V1 = '/api/v1/events/lookup'
     USERS_V1 = '/api/v1/users'
+    USERS_EXPORT_V1 = '/api/v1/users/export'
+    USERS_LOOKUP_V1 = '/api/v1/users/lookup'
     LOGIN_V1 = '/api/v1/auth/login'
     LOGOUT_V1 = '/api/v1/auth/logout'
+    REFRESH_V1 = '/api/v1/auth/refresh'
+    STATS_V1 = '/api/v1/stats'
+    STATS_POOLS_V1 = '/api/v1/stats/pools'
+    STATS_SLOW_QUERIES_V1 = '/api/v1/stats/slow-queries'
+    METRICS = '/metrics'
@@ -15,52 +15,131 @@ Currently the event is represented by the arguments of the HTTP request, which a
 
 """
 
-from flask import make_response, current_app as app
-from flask_restful import Resource, reqparse
+from flask import make_response, request, current_app as app
+from flask_restful import Resource
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
 
+from api.cache.response import cached_response, invalidate_responses
+from api.counters.views import counted_view
+from api.db.changes import apply_changes
 from api.resources.constants import HttpStatusCode
 from api.resources.auth import token_required
+from api.resources.export import ndjson_response
+from api.resources.fields import Fieldset
+from api.resources.lookup import find_by_ids, lookup_schema, parse_ids
+from api.resources.pagination import find_page, find_sorted_page, parse_page_args
+from api.schemas import Field, Schema, ValidationError, parse_datetime
+
+
+event_schema = Schema(
+    Field('name'),
+    Field('start_datetime', type=parse_datetime),
+    Field('end_datetime', type=parse_datetime),
+    Field('max_guests_allowed', type=int),
+    Field('cuisine', many=True),
+    Field('price_per_person', type=float),
+    Field('description')
+)
+"""The arguments of a new event"""
+
+event_update_schema = event_schema.partial(
+    Field('guests', required=False, many=True),
+    Field('rating', required=False)
+)
+"""The arguments of an event update, where only the arguments to be changed are passed"""
+
+search_schema = Schema(
+    Field('cuisine', required=False, many=True),
+    Field('start_from', type=parse_datetime, required=False),
+    Field('start_to', type=parse_datetime, required=False),
+    Field('price_min', type=float, required=False),
+    Field('price_max', type=float, required=False),
+    Field('guests', type=int, required=False),
+    Field('sort', required=False, default='start_datetime',
+          choices=('start_datetime', '-start_datetime', 'price_per_person', '-price_per_person')),
+    location='args'
+)
+"""The filters of the event search"""
+
+SEARCH_SORT_TYPES = {
+    'start_datetime': (datetime,),
+    'price_per_person': (int, float)
+}
+"""The types of the values of the sort fields of the event search"""
+
+event_fields = Fieldset(
+    'host_id', 'name', 'start_datetime', 'end_datetime', 'max_guests_allowed', 'cuisine', 'price_per_person',
+    'description', 'guests', 'rating', 'published:', 'view_count', 'version', 'created_by_user', 'created_datetime',
+    hidden=('changes',)
+)
+"""The fields of the events which can be requested with `?fields=`"""
+
+
+def build_event(args, user_id: str):
+    """
+    This function builds the document of a new event from the parsed arguments.
 
-base_parser = reqparse.RequestParser()
-base_parser.add_argument('name', required=True, location='json')
-base_parser.add_argument('start_datetime', required=True, location='json')
-base_parser.add_argument('end_datetime', required=True, location='json')
-base_parser.add_argument('max_guests_allowed', required=True, type=int, location='json')
-base_parser.add_argument('cuisine', required=True, action='append', location='json')
-base_parser.add_argument('price_per_person', required=True, type=float, location='json')
-base_parser.add_argument('description', required=True, location='json')
+    __Returns:__
 
+    The event document to be inserted
+    """
 
-class Event(Resource):
+    return {
+        'host_id': user_id,
+        'name': args['name'],
+        'start_datetime': args['start_datetime'],
+        'end_datetime': args['end_datetime'],
+        'max_guests_allowed': args['max_guests_allowed'],
+        'cuisine': args['cuisine'],
+        'price_per_person': args['price_per_person'],
+        'description': args['description'],
+        'published:': True,
+        'view_count': 0,
+        'created_by_user': user_id,
+        'created_datetime': datetime.utcnow()
+    }
+
+
+def lookup_events(ids):
+    """
+    This function returns the events of the given ids, see `api.resources.lookup`.
 
-    def __init__(self):
-        """
-        This class represents the event resource.
-        
-        Here also a copy of the request parser is made and all 
-        arguments are set as not required as for `get` and `put`
-        required arguments are not needed. 
+    __Returns:__
 
-        The request parser is extended for `put` with following arguments: 
-        - `guests`
-        - `rating`
-        """
+    * If too many ids are requested: A json response with the text [HTTP_413_PAYLOAD_TOO_LARGE]
+    * If success: A json response with the events in the order of the ids
+    """
+
+    try:
+        events = find_by_ids(app.mongo.db.events, ids, event_fields.projection())
+    except ValueError:
+        return make_response('[HTTP_413_PAYLOAD_TOO_LARGE]', HttpStatusCode.HTTP_413_PAYLOAD_TOO_LARGE)
+
+    return make_response({'data': events}, HttpStatusCode.HTTP_200_OK)
 
-        self.parser = base_parser.copy()
 
-        # TODO: Use list comprehension with new symbol in Python 3.8: 
-        # https://stackoverflow.com/questions/10291997/how-can-i-do-assignments-in-a-list-comprehension
-        for arg in self.parser.args:
-            arg.required = False
+class Event(Resource):
+    """
+    This class represents the event resource.
 
-        self.parser.add_argument('guests', action='append', location='json')
-        self.parser.add_argument('rating', location='json')
+    The arguments of `put` are validated with `event_update_schema`.
+    """
 
+    @counted_view
+    @cached_response('event|{id}', 'RESPONSE_CACHE_EVENT_TTL')
     def get(self, id):
         """
         This method returns the event found by id.
+
+        The fields of the event can be selected with the `fields` query string argument, see `api.resources.fields`.
+
+        The response is cached in Redis for `RESPONSE_CACHE_EVENT_TTL` seconds, see `api.cache.response`.
+
+        The view is counted in Redis and added to the `view_count` of the event by a background flusher,
+        see `api.counters.views`.
         
         __Returns:__
 
@@ -74,19 +153,20 @@ class Event(Resource):
 
         object_id = ObjectId(id)
 
-        event = app.mongo.db.events.find_one({'_id': object_id})
+        event = app.mongo.db.events.find_one({'_id': object_id}, event_fields.projection())
 
         if not event:
             return make_response('[HTTP_404_NOT_FOUND]', HttpStatusCode.HTTP_404_NOT_FOUND)
 
-        event['_id'] = str(event['_id'])
-
         return make_response({'data': event}, HttpStatusCode.HTTP_200_OK)
 
     @token_required
     def put(self, user_id, id):
         """
         This method updates the event and is only accessible with authentication token.
+
+        The fields passed are set on the event and the change is appended to the `event_changes`
+        collection, see `api.db.changes`.
         
         __Returns:__
 
@@ -98,30 +178,18 @@ class Event(Resource):
         if not ObjectId.is_valid(id):
             return make_response('[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
 
-        args = self.parser.parse_args()
-
-        object_id = ObjectId(id)
+        args = event_update_schema.parse()
 
-        events = app.mongo.db.events
+        fields = {key: value for key,
+                  value in args.items() if value is not None}
 
-        event = app.mongo.db.events.find_one({'_id': object_id})
+        event = apply_changes(app.mongo.db.events, app.mongo.db.event_changes, 'event_id', ObjectId(id),
+                              fields, user_id)
 
         if not event:
             return make_response('[HTTP_404_NOT_FOUND]', HttpStatusCode.HTTP_404_NOT_FOUND)
 
-        fields = {key: value for key,
-                  value in args.items() if value is not None}
-
-        events.update_one({'_id': object_id},
-                          {
-            '$push': {
-                'changes': {
-                    'fields': fields,
-                    'updated_by_user': user_id,
-                    'updated_datetime': datetime.utcnow()
-                }
-            }
-        })
+        invalidate_responses(f'event|{id}', 'events')
 
         return '[HTTP_204_NO_CONTENT]', HttpStatusCode.HTTP_204_NO_CONTENT
 
@@ -131,23 +199,40 @@ class EventList(Resource):
     This class represents events resource.
     """
 
+    @cached_response('events', 'RESPONSE_CACHE_EVENT_LIST_TTL')
     def get(self):
         """
-        This method returns the list of events.
+        This method returns one page of the list of events ordered by id.
+
+        The response is cached in Redis for `RESPONSE_CACHE_EVENT_LIST_TTL` seconds, see `api.cache.response`.
+
+        The page is selected with the `limit` and `cursor` query string arguments, see `api.resources.pagination`.
+
+        If the `ids` query string argument is passed (e.g. `?ids=a,b,c`), the events of these ids are returned
+        instead, see `api.resources.lookup`.
+
+        The fields of the events can be selected with the `fields` query string argument, see `api.resources.fields`.
         
         __Returns:__
 
-        A json response with list of events or an empty list if no events in the database
+        * If limit or cursor are invalid: A json response with the text [HTTP_400_BAD_REQUEST]
+        * If too many ids are requested: A json response with the text [HTTP_413_PAYLOAD_TOO_LARGE]
+        * If ids are passed: A json response with the events in the order of the ids
+        * If success: A json response with the page of events (or an empty list if no events in the database)
+          and the `next_cursor`, which is `null` on the last page
         """
 
-        response = []
-        events = app.mongo.db.events.find()
+        if request.args.get('ids') is not None:
+            return lookup_events(parse_ids(request.args['ids']))
 
-        for event in events:
-            event['_id'] = str(event['_id'])
-            response.append(event)
+        try:
+            limit, after = parse_page_args()
+        except ValueError:
+            return make_response('[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
 
-        return make_response({'data': response}, HttpStatusCode.HTTP_200_OK)
+        events, next_cursor = find_page(app.mongo.db.events, {}, limit, after, event_fields.projection())
+
+        return make_response({'data': events, 'next_cursor': next_cursor}, HttpStatusCode.HTTP_200_OK)
 
     @token_required
     def post(self, user_id):
@@ -159,23 +244,273 @@ class EventList(Resource):
         * If success: A json response with the text [HTTP_201_CREATED]
         """
 
-        args = base_parser.parse_args()
+        args = event_schema.parse()
 
         events = app.mongo.db.events
 
-        events.insert_one({
-            'host_id': user_id,
-            'name': args['name'],
-            'start_datetime': args['start_datetime'],
-            'end_datetime': args['end_datetime'],
-            'max_guests_allowed': args['max_guests_allowed'],
-            'cuisine': args['cuisine'],
-            'price_per_person': args['price_per_person'],
-            'description': args['description'],
-            'published:': True,
-            'view_count:': 0,
-            'created_by_user': user_id,
-            'created_datetime': datetime.utcnow()
-        })
+        events.insert_one(build_event(args, user_id))
+
+        invalidate_responses('events')
 
         return make_response('[HTTP_201_CREATED]', HttpStatusCode.HTTP_201_CREATED)
+
+
+class EventExport(Resource):
+    """
+    This class represents the export of all events.
+    """
+
+    @token_required
+    def get(self, user_id):
+        """
+        This method streams all events as NDJSON, see `api.resources.export`, with the fields selected
+        by the `fields` query string argument, see `api.resources.fields`.
+
+        __Returns:__
+
+        A streamed response with one event per line
+        """
+
+        return ndjson_response(app.mongo.db.events, projection=event_fields.projection())
+
+
+def parse_search_args():
+    """
+    This function parses the filters, the sort and the page of the event search of the current request,
+    see `EventSearch.get`.
+
+    __Returns:__
+
+    A tuple with the MongoDb query, the sort field, the sort direction, the page size
+    and the keyset values after which the page starts (or `None` for the first page)
+
+    __Raises:__
+
+    ValueError if the limit or the cursor are invalid
+    """
+
+    args = search_schema.parse()
+
+    sort_field = args['sort'].lstrip('-')
+    direction = DESCENDING if args['sort'].startswith('-') else ASCENDING
+
+    limit, after = parse_page_args(key_count=2, sort_types=SEARCH_SORT_TYPES[sort_field])
+
+    query = {}
+
+    if args['cuisine']:
+        query['cuisine'] = {'$in': args['cuisine']}
+
+    start_datetime = {}
+
+    if args['start_from'] is not None:
+        start_datetime['$gte'] = args['start_from']
+
+    if args['start_to'] is not None:
+        start_datetime['$lte'] = args['start_to']
+
+    if start_datetime:
+        query['start_datetime'] = start_datetime
+
+    price_per_person = {}
+
+    if args['price_min'] is not None:
+        price_per_person['$gte'] = args['price_min']
+
+    if args['price_max'] is not None:
+        price_per_person['$lte'] = args['price_max']
+
+    if price_per_person:
+        query['price_per_person'] = price_per_person
+
+    if args['guests'] is not None:
+        query['max_guests_allowed'] = {'$gte': args['guests']}
+
+    return query, sort_field, direction, limit, after
+
+
+class EventSearch(Resource):
+    """
+    This class represents the search of events.
+    """
+
+    def get(self):
+        """
+        This method returns one page of the events matching the filters passed in the query string:
+
+        - `cuisine`: Events offering the cuisine, can be passed multiple times to match any of them
+        - `start_from` and `start_to`: Range of the start datetime
+        - `price_min` and `price_max`: Range of the price per person
+        - `guests`: Events allowing at least this number of guests
+        - `sort`: `start_datetime` (default) or `price_per_person`, prefixed with `-` for descending order
+
+        The page is selected with the `limit` and `cursor` query string arguments, see `api.resources.pagination`,
+        and the fields of the events with the `fields` argument, see `api.resources.fields`.
+        Every combination of filters and sort is backed by one of the search indexes of `api.db.indexes`.
+
+        __Returns:__
+
+        * If limit or cursor are invalid: A json response with the text [HTTP_400_BAD_REQUEST]
+        * If success: A json response with the page of events and the `next_cursor`, 
+          which is `null` on the last page
+        """
+
+        try:
+            query, sort_field, direction, limit, after = parse_search_args()
+        except ValueError:
+            return make_response('[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+        events, next_cursor = find_sorted_page(app.mongo.db.events, query, sort_field, direction, limit, after,
+                                               event_fields.projection())
+
+        return make_response({'data': events, 'next_cursor': next_cursor}, HttpStatusCode.HTTP_200_OK)
+
+
+class EventReservations(Resource):
+    """
+    This class represents the reservations of an event.
+    """
+
+    @token_required
+    def post(self, user_id, id):
+        """
+        This method reserves a seat of the event for the authenticated user.
+
+        The capacity check and the reservation are done with one conditional update, 
+        so concurrent reservations can not overbook the event.
+
+        __Returns:__
+
+        * If id is invalid: A json response with the text [HTTP_400_BAD_REQUEST]
+        * If event not found: A json response with the text [HTTP_404_NOT_FOUND]
+        * If the user already has a reservation: A json response with the text [ALREADY_RESERVED]
+        * If the event is full: A json response with the text [EVENT_FULL]
+        * If success: A json response with the text [HTTP_201_CREATED]
+        """
+
+        if not ObjectId.is_valid(id):
+            return make_response('[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+        object_id = ObjectId(id)
+
+        events = app.mongo.db.events
+
+        event = events.find_one_and_update({
+            '_id': object_id,
+            'guests': {'$ne': user_id},
+            '$expr': {'$lt': [{'$size': {'$ifNull': ['$guests', []]}}, '$max_guests_allowed']}
+        },
+            {
+            '$push': {
+                'guests': user_id
+            }
+        }, projection={'_id': True})
+
+        if event:
+            invalidate_responses(f'event|{id}', 'events')
+
+            return make_response('[HTTP_201_CREATED]', HttpStatusCode.HTTP_201_CREATED)
+
+        # The reason of the rejection is only looked up when the reservation fails
+        event = events.find_one({'_id': object_id}, {'guests': True})
+
+        if not event:
+            return make_response('[HTTP_404_NOT_FOUND]', HttpStatusCode.HTTP_404_NOT_FOUND)
+
+        if user_id in (event.get('guests') or []):
+            return make_response('[ALREADY_RESERVED]', HttpStatusCode.HTTP_409_CONFLICT)
+
+        return make_response('[EVENT_FULL]', HttpStatusCode.HTTP_409_CONFLICT)
+
+
+class EventBulk(Resource):
+    """
+    This class represents the bulk creation of events.
+    """
+
+    @token_required
+    def post(self, user_id):
+        """
+        This method creates the events passed as a json array.
+
+        Each event is validated with `event_schema`, as in `EventList.post`. The valid events are
+        inserted with unordered `insert_many` in chunks of `BULK_INSERT_CHUNK_SIZE` events, so one 
+        failing event does not prevent the others from being created.
+
+        __Returns:__
+
+        * If the body is not a json array: A json response with the text [HTTP_400_BAD_REQUEST]
+        * If more than `BULK_MAX_EVENTS` events are passed: A json response with the text [HTTP_413_PAYLOAD_TOO_LARGE]
+        * Otherwise: A json response with one report per event, in the order they were passed, with the 
+          `index` of the event and its `status` along with the `id` of the created event or an error `message`
+        """
+
+        items = request.get_json(silent=True)
+
+        if not isinstance(items, list):
+            return make_response('[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+        if len(items) > app.config['BULK_MAX_EVENTS']:
+            return make_response('[HTTP_413_PAYLOAD_TOO_LARGE]', HttpStatusCode.HTTP_413_PAYLOAD_TOO_LARGE)
+
+        report = [None] * len(items)
+        documents = []
+        indexes = []
+
+        for index, item in enumerate(items):
+            try:
+                args = event_schema.validate(item)
+            except ValidationError as e:
+                report[index] = {'index': index, 'status': HttpStatusCode.HTTP_400_BAD_REQUEST, 'message': e.errors}
+                continue
+
+            documents.append(build_event(args, user_id))
+            indexes.append(index)
+
+        chunk_size = app.config['BULK_INSERT_CHUNK_SIZE']
+
+        for start in range(0, len(documents), chunk_size):
+            chunk = documents[start:start + chunk_size]
+            errors = {}
+
+            try:
+                app.mongo.db.events.insert_many(chunk, ordered=False)
+            except BulkWriteError as e:
+                errors = {error['index']: error for error in e.details['writeErrors']}
+
+            for offset, document in enumerate(chunk):
+                index = indexes[start + offset]
+
+                if offset in errors:
+                    status = HttpStatusCode.HTTP_409_CONFLICT if errors[offset]['code'] == 11000 \
+                        else HttpStatusCode.HTTP_500_INTERNAL_SERVER_ERROR
+                    report[index] = {'index': index, 'status': status, 'message': errors[offset]['errmsg']}
+                else:
+                    report[index] = {'index': index, 'status': HttpStatusCode.HTTP_201_CREATED,
+                                     'id': str(document['_id'])}
+
+        if documents:
+            invalidate_responses('events')
+
+        return make_response({'data': report}, HttpStatusCode.HTTP_207_MULTI_STATUS)
+
+
+class EventLookup(Resource):
+    """
+    This class represents the lookup of events by id.
+    """
+
+    def post(self):
+        """
+        This method returns the events of the ids passed in the json body as `ids`, 
+        for lists of ids too long for the query string.
+
+        __Returns:__
+
+        * If too many ids are requested: A json response with the text [HTTP_413_PAYLOAD_TOO_LARGE]
+        * If success: A json response with the events in the order of the ids
+        """
+
+        args = lookup_schema.parse()
+
+        return lookup_events(args['ids'])
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+""" Export module which holds the logic for streaming whole collections as [NDJSON](http://ndjson.org/).
+
+The documents are read from the pymongo cursor in batches of `EXPORT_BATCH_SIZE` documents
+and written to the response as soon as a batch is serialized, so the memory used by an export
+is bounded by the batch size and not by the size of the collection.
+
+The documents are encoded by the JSON provider of the app, see `api.serialization`.
+"""
+
+from flask import Response, current_app as app
+
+
+def ndjson_response(collection, query=None, projection=None):
+    """
+    This function creates a streamed response with one json document per line.
+
+    __Parameters:__
+
+    collection (Collection): The collection to be exported
+
+    query (dict): The filter of the documents to be exported, all documents if not passed
+
+    projection (dict): The MongoDb projection of the documents, all fields if not passed
+
+    __Returns:__
+
+    A response with mimetype `application/x-ndjson` whose body is generated while the cursor is iterated
+    """
+
+    batch_size = app.config['EXPORT_BATCH_SIZE']
+
+    dumps = app.json.dumps
+    cursor = collection.find(query or {}, projection, batch_size=batch_size)
+
+    def generate():
+        try:
+            lines = []
+
+            for document in cursor:
+                lines.append(dumps(document))
+
+                if len(lines) == batch_size:
+                    yield '\n'.join(lines) + '\n'
+                    lines = []
+
+            if lines:
+                yield '\n'.join(lines) + '\n'
+        finally:
+            cursor.close()
+
+    return Response(generate(), mimetype='application/x-ndjson')
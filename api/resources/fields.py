@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+""" Fields module which holds the sparse fieldsets of the read resources.
+
+The read resources accept the `fields` query string argument, a comma separated list of the fields
+to be returned (e.g. `/api/v1/events?fields=name,start_datetime`). The fields are checked against
+the fields allowed for the resource and passed to MongoDb as the projection of the query, so neither
+MongoDb, the serializer nor the network handle the fields the client did not ask for. The `_id` is always returned.
+
+Without `fields` the documents are returned without their hidden fields, e.g. the password hash of the users
+or the legacy `changes` array (see `api.db.changes`), which can not be requested either.
+"""
+
+from api.schemas import Field, Schema
+
+
+class Fieldset:
+    """
+    This class represents the fields of a resource which can be requested with the `fields` argument.
+
+    __Example__:
+
+    ```
+    event_fields = Fieldset('name', 'start_datetime', hidden=('changes',))
+
+    events = app.mongo.db.events.find({}, event_fields.projection())
+    ```
+
+    __Parameters:__
+
+    allowed (str): The fields which can be requested
+
+    hidden (tuple): The fields stored in the documents which are never returned
+    """
+
+    def __init__(self, *allowed: str, hidden: tuple = ()):
+        self.allowed = frozenset(allowed)
+        self.default = {field: False for field in hidden} or None
+        self._schema = Schema(Field('fields', type=self._parse, required=False), location='args')
+
+    def _parse(self, value: str):
+        fields = [field.strip() for field in value.split(',') if field.strip()]
+
+        if not fields:
+            raise ValueError('No field requested')
+
+        for field in fields:
+            if field not in self.allowed:
+                raise ValueError(f'{field} is not a valid field')
+
+        return {field: True for field in fields}
+
+    def projection(self):
+        """
+        This method returns the projection of the fields requested in the current request.
+
+        __Returns:__
+
+        The projection including the requested fields, or excluding the hidden fields if `fields` is not passed
+
+        The request is aborted with `400 Bad Request` if a field is not allowed, see `api.schemas`.
+        """
+
+        fields = self._schema.parse()['fields']
+
+        if fields is None and self.default is not None:
+            # A copy, as the projection may be modified by the driver
+            return dict(self.default)
+
+        return fields
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+""" Lookup module which holds the logic for fetching many documents by id with one query.
+
+The ids can be passed in the query string of the list resources (e.g. `/api/v1/users?ids=a,b,c`)
+or in the json body of the lookup resources (e.g. `{"ids": ["a", "b", "c"]}`) for long lists.
+
+The documents are returned in the order of the ids requested. Ids which are not valid or not found 
+are returned in their position with an `error` instead of the document fields.
+"""
+
+from bson import ObjectId
+from flask import current_app as app
+
+from api.schemas import Field, Schema
+
+lookup_schema = Schema(Field('ids', many=True))
+"""The ids of the lookup resources"""
+
+
+def parse_ids(value: str):
+    """
+    This function splits the comma separated ids of the query string.
+
+    __Returns:__
+
+    The list of ids
+    """
+
+    return [id.strip() for id in value.split(',') if id.strip()]
+
+
+def find_by_ids(collection, ids, projection=None):
+    """
+    This function fetches the documents of the given ids with one `$in` query.
+
+    The fields of the documents are selected with the MongoDb `projection`, all fields if not passed.
+
+    __Returns:__
+
+    The list of documents in the order of the ids, with `{'_id': id, 'error': '[HTTP_404_NOT_FOUND]'}`
+    for the ids not found and `{'_id': id, 'error': '[HTTP_400_BAD_REQUEST]'}` for the invalid ids
+
+    __Raises:__
+
+    ValueError if more than `MAX_LOOKUP_IDS` ids are requested
+    """
+
+    if len(ids) > app.config['MAX_LOOKUP_IDS']:
+        raise ValueError('[TOO_MANY_IDS]')
+
+    object_ids = {ObjectId(id) for id in ids if ObjectId.is_valid(id)}
+
+    cursor = collection.find({'_id': {'$in': list(object_ids)}}, projection)
+
+    documents = {str(document['_id']): document for document in cursor}
+
+    results = []
+
+    for id in ids:
+        if not ObjectId.is_valid(id):
+            results.append({'_id': id, 'error': '[HTTP_400_BAD_REQUEST]'})
+        elif str(ObjectId(id)) not in documents:
+            results.append({'_id': id, 'error': '[HTTP_404_NOT_FOUND]'})
+        else:
+            # Ids requested more than once get their own copy of the document
+            results.append(dict(documents[str(ObjectId(id))]))
+
+    return results
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+""" Metrics module which exposes the request metrics of the current worker to Prometheus.
+"""
+
+from flask import Response, current_app as app
+from flask_restful import Resource
+
+from api.resources.auth import token_required
+
+
+class Metrics(Resource):
+    """
+    This class represents the metrics resource.
+    """
+
+    @token_required
+    def get(self, user_id):
+        """
+        This method returns the latency histograms and the request and error counts of the worker
+        which handles the request, see `api.metrics.prometheus.RequestMetrics`.
+
+        Like the stats routes, the metrics are only returned to authenticated users, see `api.resources.stats`.
+
+        __Returns:__
+
+        A text response in the Prometheus text exposition format
+        """
+
+        return Response(app.metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+""" Pagination module which holds the logic for keyset (cursor) pagination of list resources.
+
+List resources accept the following query string arguments:
+
+- Limit - The page size, capped by `MAX_PAGE_SIZE` of the app config
+- Cursor - The opaque `next_cursor` returned by the previous page
+
+The fields of the documents can be selected with the `fields` argument, see `api.resources.fields`.
+
+Pages are read with `_id` range queries instead of `skip`, so the cost of fetching a page
+does not grow with the size of the collection nor with the position of the page.
+"""
+
+import base64
+import binascii
+
+import bson
+from bson.errors import BSONError
+from flask import current_app as app
+from pymongo import ASCENDING
+
+from api.schemas import Field, Schema
+
+page_schema = Schema(
+    Field('limit', type=int, required=False),
+    Field('cursor', required=False),
+    location='args'
+)
+"""The pagination arguments of the list resources"""
+
+
+def encode_cursor(*values):
+    """
+    This function encodes the keyset values of the last document of a page into an opaque cursor.
+
+    __Returns:__
+
+    A url safe string to be sent to the client as `next_cursor`
+    """
+
+    return base64.urlsafe_b64encode(bson.encode({'k': list(values)})).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    This function decodes a cursor created by `encode_cursor`.
+
+    __Returns:__
+
+    The list of keyset values encoded in the cursor
+
+    __Raises:__
+
+    ValueError if the cursor is malformed
+    """
+
+    try:
+        values = bson.decode(base64.urlsafe_b64decode(cursor.encode('ascii')))['k']
+    except (binascii.Error, BSONError, KeyError, UnicodeEncodeError, IndexError) as e:
+        raise ValueError('[INVALID_CURSOR]') from e
+
+    if not isinstance(values, list):
+        raise ValueError('[INVALID_CURSOR]')
+
+    return values
+
+
+def parse_page_args(key_count: int = 1, sort_types: tuple = None):
+    """
+    This function parses the pagination arguments of the current request.
+
+    The requested limit is capped by `MAX_PAGE_SIZE`, when it is not passed `DEFAULT_PAGE_SIZE` is used.
+
+    __Parameters:__
+
+    key_count (int): The number of keyset values in the cursor, the last one being the `_id`
+
+    sort_types (tuple): The types the sort value of the cursor, the first one, may have besides `None`.
+    As the value is put in the query, any other value (e.g. a document like `{'$ne': None}`) is rejected
+
+    __Returns:__
+
+    A tuple with the page size and the keyset values after which the page starts (or `None` for the first page)
+
+    __Raises:__
+
+    ValueError if the limit is not positive or the cursor is malformed
+    """
+
+    args = page_schema.parse()
+
+    limit = args['limit']
+
+    if limit is None:
+        limit = app.config['DEFAULT_PAGE_SIZE']
+    elif limit < 1:
+        raise ValueError('[INVALID_LIMIT]')
+
+    limit = min(limit, app.config['MAX_PAGE_SIZE'])
+
+    after = None
+
+    if args['cursor']:
+        after = decode_cursor(args['cursor'])
+
+        if len(after) != key_count or not isinstance(after[-1], bson.ObjectId):
+            raise ValueError('[INVALID_CURSOR]')
+
+        if sort_types is not None and not _is_sort_value(after[0], sort_types):
+            raise ValueError('[INVALID_CURSOR]')
+
+    return limit, after
+
+
+def _is_sort_value(value, sort_types: tuple):
+    # bool is a subclass of int, but never the value of a numeric sort field
+    return value is None or (isinstance(value, sort_types) and not isinstance(value, bool))
+
+
+def find_page(collection, query, limit, after=None, projection=None):
+    """
+    This function reads one page of documents ordered by `_id`.
+
+    One document more than the limit is read to know whether there is a next page without an extra count query.
+    The fields of the documents are selected with the MongoDb `projection`, all fields if not passed.
+
+    __Returns:__
+
+    A tuple with the list of documents and the cursor of the next page (or `None` for the last page)
+    """
+
+    if after is not None:
+        query = {'$and': [query, {'_id': {'$gt': after[0]}}]}
+
+    documents = list(collection.find(query, projection).sort('_id', ASCENDING).limit(limit + 1))
+
+    next_cursor = None
+
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1]['_id'])
+
+    return documents, next_cursor
+
+
+def find_sorted_page(collection, query, sort_field: str, direction: int, limit: int, after=None, projection=None):
+    """
+    This function reads one page of documents ordered by a field and then by `_id`.
+
+    The keyset of the page is the pair of the sort field and the `_id`, so documents with the same value
+    in the sort field are neither skipped nor repeated between pages. A compound index starting with
+    the sort field and `_id` is required for the page to be read without sorting in memory.
+    Documents without a value in the sort field come first in ascending order and last in descending order.
+
+    __Parameters:__
+
+    sort_field (str): The field the documents are ordered by
+
+    direction (int): `pymongo.ASCENDING` or `pymongo.DESCENDING`
+
+    after (list): The sort field value and `_id` of the last document of the previous page
+
+    projection (dict): The MongoDb projection of the documents, all fields if not passed. The sort field
+    is added to a projection including fields, as it is needed for the cursor of the next page
+
+    __Returns:__
+
+    A tuple with the list of documents and the cursor of the next page (or `None` for the last page)
+    """
+
+    query, projection, sort = _sorted_page_query(query, sort_field, direction, after, projection)
+
+    documents = list(collection.find(query, projection).sort(sort).limit(limit + 1))
+
+    return _sorted_page(documents, sort_field, limit)
+
+
+async def async_find_sorted_page(collection, query, sort_field: str, direction: int, limit: int, after=None,
+                                 projection=None):
+    """
+    This function reads one page of documents like `find_sorted_page`, from a [motor](https://motor.readthedocs.io)
+    collection for the coroutines of the ASGI views (see `api.asgi`).
+
+    __Returns:__
+
+    A tuple with the list of documents and the cursor of the next page (or `None` for the last page)
+    """
+
+    query, projection, sort = _sorted_page_query(query, sort_field, direction, after, projection)
+
+    documents = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+
+    return _sorted_page(documents, sort_field, limit)
+
+
+def _sorted_page_query(query, sort_field: str, direction: int, after, projection):
+    # Returns the query, the projection and the sort of a page of `find_sorted_page`
+    if after is not None:
+        query = {'$and': [query, _after_sort_value(sort_field, direction, *after)]}
+
+    if projection and any(projection.values()):
+        projection = {**projection, sort_field: True}
+
+    return query, projection, [(sort_field, direction), ('_id', direction)]
+
+
+def _sorted_page(documents: list, sort_field: str, limit: int):
+    # Returns the documents of a page of `find_sorted_page` and the cursor of the next page
+    next_cursor = None
+
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1].get(sort_field), documents[-1]['_id'])
+
+    return documents, next_cursor
+
+
+def _after_sort_value(sort_field: str, direction: int, value, last_id):
+    # MongoDb sorts null (and missing) values before any other value, while the comparison operators
+    # only match values of the same type: the nulls are matched explicitly on their side of the order
+    operator = '$gt' if direction == ASCENDING else '$lt'
+    same_value = {sort_field: value, '_id': {operator: last_id}}
+
+    if value is None:
+        if direction == ASCENDING:
+            return {'$or': [{sort_field: {'$ne': None}}, same_value]}
+
+        return same_value
+
+    if direction == ASCENDING:
+        return {'$or': [{sort_field: {operator: value}}, same_value]}
+
+    return {'$or': [{sort_field: {operator: value}}, {sort_field: None}, same_value]}
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+""" Rate limit module which holds the sliding window rate limiter of the expensive routes.
+
+The requests are logged per limited key (e.g. the client IP or the email) in a Redis sorted set
+scored by their time. A request is allowed if fewer than `limit` requests of the same key were allowed
+during the last `window` seconds, so, unlike fixed windows, no burst of twice the limit is allowed around
+the start of a window. All keys of a request are checked and logged by one Lua script, so the check is
+atomic across the workers and costs one round trip.
+
+Rejected requests are answered with `429 Too Many Requests` and a `Retry-After` header before
+the decorated method runs, so they cost neither a bcrypt hash nor a MongoDb query.
+"""
+
+import math
+import os
+import time
+from collections import namedtuple
+from functools import wraps
+
+from flask import make_response, request, current_app as app
+from redis import RedisError
+
+from api.resources.constants import HttpStatusCode
+
+RATE_LIMIT_PREFIX = 'rate-limit'
+
+# Checks the windows passed as keys, with the limit and the window in milliseconds of each key passed after
+# the current time and the id of the request. The request is logged in every window only if all windows allow it.
+# Returns 0 if the request is allowed, otherwise the milliseconds until the oldest request leaves the window.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local retry_after = 0
+
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 2 + 1])
+    local window = tonumber(ARGV[i * 2 + 2])
+
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        retry_after = math.max(retry_after, tonumber(oldest[2]) + window - now, 1)
+    end
+end
+
+if retry_after > 0 then
+    return retry_after
+end
+
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[2])
+    redis.call('PEXPIRE', key, ARGV[i * 2 + 2])
+end
+
+return 0
+"""
+
+RateLimit = namedtuple('RateLimit', ['name', 'key', 'config'])
+"""A limit of a route: `key()` returns the limited key of the current request, e.g. its IP, or None to skip
+the limit, and `config` is the name of the config holding the `(limit, window in seconds)` of the limit"""
+
+
+def client_ip():
+    """
+    This function returns the IP of the client of the current request.
+
+    Behind proxies, it is the IP forwarded by the `PROXY_FIX_X_FOR` trusted proxies, see `api.create_app`.
+    """
+
+    return request.remote_addr
+
+
+def request_email():
+    """
+    This function returns the email passed in the arguments of the current request, lower cased,
+    or None if no email is passed.
+    """
+
+    source = request.get_json(silent=True)
+
+    if not isinstance(source, dict):
+        source = request.values
+
+    email = source.get('email')
+
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def rate_limited(route: str, *limits: RateLimit):
+    """
+    This function defines a function decorator for the methods of the resources whose requests are rate limited.
+    With `RATE_LIMIT_ENABLED` unset the requests are not limited.
+
+    __Example__:
+
+    ```
+    class Login(Resource):
+
+        @rate_limited('login', RateLimit('ip', client_ip, 'RATE_LIMIT_LOGIN_IP'),
+                      RateLimit('email', request_email, 'RATE_LIMIT_LOGIN_EMAIL'))
+        def post(self):
+            ...
+    ```
+
+    __Parameters:__
+
+    route (str): The name of the route, which prefixes the keys of its windows
+
+    limits (RateLimit): The limits the request must satisfy
+
+    __Returns:__
+
+    A json response with the text [HTTP_429_TOO_MANY_REQUESTS] and a `Retry-After` header in seconds
+    if a limit is exceeded, otherwise the response of the decorated function
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if app.config['RATE_LIMIT_ENABLED']:
+                retry_after = _check_limits(route, limits)
+
+                if retry_after:
+                    return _too_many_requests(retry_after)
+
+            return f(*args, **kwargs)
+
+        return decorated
+
+    return decorator
+
+
+def async_rate_limited(route: str, *limits: RateLimit):
+    """
+    This function defines the same decorator as `rate_limited` for the coroutines of the ASGI views
+    (see `api.asgi`), with the windows checked through `app.async_redis`.
+
+    __Example__:
+
+    ```
+    @async_rate_limited('login', *LOGIN_LIMITS)
+    async def login():
+        ...
+    ```
+
+    __Returns:__
+
+    A json response with the text [HTTP_429_TOO_MANY_REQUESTS] and a `Retry-After` header in seconds
+    if a limit is exceeded, otherwise the response of the decorated coroutine
+    """
+
+    def decorator(f):
+        @wraps(f)
+        async def decorated(*args, **kwargs):
+            if app.config['RATE_LIMIT_ENABLED']:
+                retry_after = await _async_check_limits(route, limits)
+
+                if retry_after:
+                    return _too_many_requests(retry_after)
+
+            return await f(*args, **kwargs)
+
+        return decorated
+
+    return decorator
+
+
+def _too_many_requests(retry_after: int):
+    response = make_response('[HTTP_429_TOO_MANY_REQUESTS]', HttpStatusCode.HTTP_429_TOO_MANY_REQUESTS)
+    response.headers['Retry-After'] = str(math.ceil(retry_after / 1000))
+
+    return response
+
+
+def _check_limits(route: str, limits: tuple):
+    args = _script_args(route, limits)
+
+    if args is None:
+        return 0
+
+    try:
+        return int(app.redis.eval(SLIDING_WINDOW_SCRIPT, *args))
+    except RedisError as e:
+        # Without Redis the requests are not limited rather than rejected
+        app.logger.warning(f'Rate limit of {route} could not be checked: {e}')
+
+        return 0
+
+
+async def _async_check_limits(route: str, limits: tuple):
+    args = _script_args(route, limits)
+
+    if args is None:
+        return 0
+
+    try:
+        return int(await app.async_redis.eval(SLIDING_WINDOW_SCRIPT, *args))
+    except RedisError as e:
+        app.logger.warning(f'Rate limit of {route} could not be checked: {e}')
+
+        return 0
+
+
+def _script_args(route: str, limits: tuple):
+    # Returns the number of keys, the keys and the arguments of `SLIDING_WINDOW_SCRIPT`, or None without any key
+    keys = []
+    windows = []
+
+    for limit in limits:
+        key = limit.key()
+
+        if key is None:
+            continue
+
+        requests, seconds = app.config[limit.config]
+
+        keys.append(f'{RATE_LIMIT_PREFIX}|{route}|{limit.name}|{key}')
+        windows.extend((requests, int(seconds * 1000)))
+
+    if not keys:
+        return None
+
+    return (len(keys), *keys, int(time.time() * 1000), os.urandom(8).hex(), *windows)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+""" Stats module which exposes the runtime counters of the current worker.
+"""
+
+from flask import make_response, current_app as app
+from flask_restful import Resource
+
+from api.db.clients import mongo_pool_stats, redis_pool_stats
+from api.resources.constants import HttpStatusCode
+from api.resources.auth import token_required
+
+
+class Stats(Resource):
+    """
+    This class represents the stats resource.
+    """
+
+    @token_required
+    def get(self, user_id):
+        """
+        This method returns the counters of the worker which handles the request.
+
+        - Token denylist: size of the filter and the tokens checked against it, see `api.cache.denylist`
+        - Session cache: hits, misses and the Redis and MongoDb calls saved by `api.cache.session`
+
+        __Returns:__
+
+        A json response with the counters
+        """
+
+        return make_response({'data': {
+            'token_denylist': app.token_denylist.stats(),
+            'session_cache': app.session_cache.stats()
+        }}, HttpStatusCode.HTTP_200_OK)
+
+
+class PoolStats(Resource):
+    """
+    This class represents the stats of the connection pools.
+    """
+
+    @token_required
+    def get(self, user_id):
+        """
+        This method returns the connections of the MongoDb and Redis pools of the worker which handles the request,
+        with the connections `checked_out` by requests and the `idle` ones, see `api.db.clients`.
+
+        The pools of the asyncio clients are returned as well when the worker runs the ASGI app (see `api.asgi`).
+
+        __Returns:__
+
+        A json response with the stats by pool, `null` for the clients without a pool (e.g. the mocks of the tests)
+        """
+
+        pools = {
+            'mongo': mongo_pool_stats(app.mongo),
+            'redis': redis_pool_stats(app.redis)
+        }
+
+        if hasattr(app, 'async_mongo'):
+            pools['async_mongo'] = mongo_pool_stats(app.async_mongo)
+            pools['async_redis'] = redis_pool_stats(app.async_redis)
+
+        return make_response({'data': pools}, HttpStatusCode.HTTP_200_OK)
+
+
+class SlowQueryStats(Resource):
+    """
+    This class represents the stats of the slow MongoDb commands.
+    """
+
+    @token_required
+    def get(self, user_id):
+        """
+        This method returns the MongoDb commands slower than `MONGO_SLOW_QUERY_MS` issued by the worker
+        which handles the request, counted per query shape and route, see `api.db.slow_queries`.
+
+        __Returns:__
+
+        A json response with the query shapes, the most frequent first
+        """
+
+        return make_response({'data': app.slow_queries.stats()}, HttpStatusCode.HTTP_200_OK)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+""" Tokens module which holds the creation and the verification of the tokens of a session.
+
+A login opens a session, identified by the `sid` claim, with two signed JWTs:
+
+- Access token - Sent in the `Access-Token` header of the authenticated requests. It expires after
+  `ACCESS_TOKEN_TTL` seconds and is verified from its signature only, see `api.resources.auth.token_required`.
+- Refresh token - Exchanged for a new access token on `POST /api/v1/auth/refresh`. It expires after
+  `REFRESH_TOKEN_TTL` seconds and is only valid as long as the session key `auth|<user id>|<sid>` exists in Redis.
+
+A token revoked before it expires (e.g. by a logout) is rejected through the denylist of `api.cache.denylist`.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import jwt
+from flask import current_app as app
+
+from api.cache.denylist import is_revoked
+from api.metrics.spans import span
+
+ACCESS_TOKEN = 'access'
+
+REFRESH_TOKEN = 'refresh'
+
+
+def session_key(user_id: str, sid: str):
+    """
+    This function returns the Redis key of a session, which holds its refresh token.
+    """
+
+    return f'auth|{user_id}|{sid}'
+
+
+def create_token(user, sid: str, token_type: str):
+    """
+    This function creates a token of the session for the user.
+
+    __Parameters:__
+
+    user (dict): The user, with its `_id`, `email` and `phone`
+
+    sid (str): The id of the session
+
+    token_type (str): `ACCESS_TOKEN` or `REFRESH_TOKEN`
+
+    __Returns:__
+
+    The encoded token
+    """
+
+    ttl = app.config['ACCESS_TOKEN_TTL'] if token_type == ACCESS_TOKEN else app.config['REFRESH_TOKEN_TTL']
+    now = datetime.utcnow()
+
+    payload = {
+        'exp': now + timedelta(seconds=ttl),
+        'iat': now,
+        'sub': f'auth|{str(user["_id"])}',
+        'email': user['email'],
+        'phone:': user['phone'],
+        'sid': sid,
+        'jti': uuid.uuid4().hex,
+        'type': token_type
+    }
+
+    with span('jwt'):
+        return jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256').decode('utf-8')
+
+
+def create_session(user):
+    """
+    This function opens a new session for the user and stores its refresh token in Redis.
+
+    __Returns:__
+
+    The access token and the refresh token of the session
+    """
+
+    sid = uuid.uuid4().hex
+
+    access_token = create_token(user, sid, ACCESS_TOKEN)
+    refresh_token = create_token(user, sid, REFRESH_TOKEN)
+
+    app.redis.setex(session_key(str(user['_id']), sid), app.config['REFRESH_TOKEN_TTL'], refresh_token)
+
+    return access_token, refresh_token
+
+
+async def async_create_session(user):
+    """
+    This function opens a new session like `create_session`, with its refresh token stored through `app.async_redis`
+    for the coroutines of the ASGI views (see `api.asgi`).
+
+    __Returns:__
+
+    The access token and the refresh token of the session
+    """
+
+    sid = uuid.uuid4().hex
+
+    access_token = create_token(user, sid, ACCESS_TOKEN)
+    refresh_token = create_token(user, sid, REFRESH_TOKEN)
+
+    await app.async_redis.setex(session_key(str(user['_id']), sid), app.config['REFRESH_TOKEN_TTL'], refresh_token)
+
+    return access_token, refresh_token
+
+
+def verify_token(token: str, token_type: str):
+    """
+    This function verifies the signature and the expiration of a token and decodes it, 
+    without checking whether it was revoked.
+
+    __Returns:__
+
+    The claims of the token, or None if the token is not of the given type
+
+    __Raises:__
+
+    jwt.InvalidTokenError if the token is not valid, e.g. expired
+    """
+
+    with span('jwt'):
+        data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+
+    if data.get('type') != token_type:
+        return None
+
+    return data
+
+
+def decode_token(token: str, token_type: str):
+    """
+    This function verifies the signature and the expiration of a token and decodes it.
+
+    __Returns:__
+
+    The claims of the token, or None if the token is not of the given type or the token or its session is revoked
+
+    __Raises:__
+
+    jwt.InvalidTokenError if the token is not valid, e.g. expired
+    """
+
+    data = verify_token(token, token_type)
+
+    if data is None or is_revoked(app, data['jti'], data['sid']):
+        return None
+
+    return data
@@ -13,52 +13,116 @@ Currently the user is represented by the arguments of the HTTP request, which ar
 
 """
 
-from flask import make_response, current_app as app
-from flask_restful import Resource, reqparse
+from flask import make_response, request, current_app as app
+from flask_restful import Resource
 from datetime import datetime
 from bson import ObjectId
-import bcrypt
+from pymongo.errors import DuplicateKeyError
 
+from api.cache.response import cached_response, invalidate_responses
+from api.cache.session import invalidate_sessions
+from api.db import check_indexes_ready
+from api.db.changes import apply_changes
+from api.passwords.hasher import PasswordHasherBusy
 from api.resources.constants import HttpStatusCode
 from api.resources.auth import token_required
+from api.resources.export import ndjson_response
+from api.resources.fields import Fieldset
+from api.resources.lookup import find_by_ids, lookup_schema, parse_ids
+from api.resources.ratelimit import RateLimit, client_ip, rate_limited, request_email
+from api.resources.pagination import find_page, parse_page_args
+from api.schemas import Field, Schema, parse_boolean
+
+
+user_schema = Schema(
+    Field('email'),
+    Field('first_name'),
+    Field('last_name'),
+    Field('password'),
+    Field('phone')
+)
+"""The arguments of a new user"""
+
+user_update_schema = user_schema.partial(
+    Field('is_host', type=parse_boolean, required=False),
+    Field('rating', required=False)
+)
+"""The arguments of a user update, where only the arguments to be changed are passed"""
+
+user_fields = Fieldset(
+    'email', 'first_name', 'last_name', 'phone', 'is_host', 'rating', 'published:', 'version', 'created_by_user',
+    'created_datetime',
+    hidden=('hashed_password', 'password_salt', 'changes')
+)
+"""The fields of the users which can be requested with `?fields=`, the password hash is never returned"""
+
+
+def prepare_user_fields(fields):
+    """
+    This function prepares the changed fields of a user to be stored.
 
+    A changed password is hashed and never stored in the change history, 
+    only the fact that it has been changed is recorded.
 
-base_parser = reqparse.RequestParser()
-base_parser.add_argument('email', required=True, location='json')
-base_parser.add_argument('first_name', required=True, location='json')
-base_parser.add_argument('last_name', required=True, location='json')
-base_parser.add_argument('password', required=True, location='json')
-base_parser.add_argument('phone', required=True, location='json')
+    __Returns:__
 
+    A tuple with the fields to be set on the user and the fields to be recorded in the change history
 
-class User(Resource):
+    __Raises:__
+
+    PasswordHasherBusy if the password hasher is busy
     """
+
+    if 'password' not in fields:
+        return fields, fields
+
+    fields = dict(fields)
+    recorded_fields = dict(fields)
+
+    hashed_password, password_salt = app.password_hasher.hash(fields.pop('password').strip())
+
+    fields['hashed_password'] = hashed_password
+    fields['password_salt'] = password_salt
+
+    del recorded_fields['password']
+    recorded_fields['password_changed'] = True
+
+    return fields, recorded_fields
+
+
+def lookup_users(ids):
     """
+    This function returns the users of the given ids, see `api.resources.lookup`.
 
-    def __init__(self):
-        """
-        This class represents the user resource.
-        
-        Here also a copy of the request parser is made and all 
-        arguments are set as not required as for `get` and `put`
-        required arguments are not needed. 
+    __Returns:__
 
-        The request parser is extended for `put` with following arguments: 
-        - `is_host`
-        - `rating`
-        """
+    * If too many ids are requested: A json response with the text [HTTP_413_PAYLOAD_TOO_LARGE]
+    * If success: A json response with the users in the order of the ids
+    """
 
-        self.parser = base_parser.copy()
+    try:
+        users = find_by_ids(app.mongo.db.users, ids, user_fields.projection())
+    except ValueError:
+        return make_response('[HTTP_413_PAYLOAD_TOO_LARGE]', HttpStatusCode.HTTP_413_PAYLOAD_TOO_LARGE)
 
-        for arg in self.parser.args:
-            arg.required = False
+    return make_response({'data': users}, HttpStatusCode.HTTP_200_OK)
 
-        self.parser.add_argument('is_host', type=bool, location='json')
-        self.parser.add_argument('rating', location='json')
 
+class User(Resource):
+    """
+    This class represents the user resource.
+
+    The arguments of `put` are validated with `user_update_schema`.
+    """
+
+    @cached_response('user|{id}', 'RESPONSE_CACHE_USER_TTL')
     def get(self, id):
         """
         This method returns the user found by id.
+
+        The fields of the user can be selected with the `fields` query string argument, see `api.resources.fields`.
+
+        The response is cached in Redis for `RESPONSE_CACHE_USER_TTL` seconds, see `api.cache.response`.
         
         __Returns:__
 
@@ -72,58 +136,61 @@ class User(Resource):
 
         object_id = ObjectId(id)
 
-        user = app.mongo.db.users.find_one({'_id': object_id})
+        user = app.mongo.db.users.find_one({'_id': object_id}, user_fields.projection())
 
         if not user:
             return make_response('[HTTP_404_NOT_FOUND]', HttpStatusCode.HTTP_404_NOT_FOUND)
 
-        user['_id'] = str(user['_id'])
-        user['hashed_password'] = user['hashed_password'].decode('utf-8')
-        user['password_salt'] = user['password_salt'].decode('utf-8')
-
         return make_response({'data': user}, HttpStatusCode.HTTP_200_OK)
 
     @token_required
     def put(self, user_id, id):
         """
         This method updates the user and is only accessible with authentication token.
+
+        The fields passed are set on the user and the change is appended to the `user_changes`
+        collection, see `api.db.changes`.
         
         __Returns:__
 
         * If id is invalid: A json response with the text [HTTP_400_BAD_REQUEST]
         * If user not found: A json response with the text [HTTP_404_NOT_FOUND]
+        * If email is used by another user: A json response with the text [HTTP_409_CONFLICT]
+        * If the email is changed before the indexes are created or the password hasher is busy:
+          A json response with the text [HTTP_503_SERVICE_UNAVAILABLE]
         * If success: No content as per default for HTTP Status Code 204
         """
 
         if not ObjectId.is_valid(id):
             return make_response('[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
 
-        args = self.parser.parse_args()
+        args = user_update_schema.parse()
 
-        object_id = ObjectId(id)
+        fields = {key: value for key,
+                  value in args.items() if value is not None}
 
-        users = app.mongo.db.users
+        # Without the unique index an email used by another user would not be detected
+        if 'email' in fields and not check_indexes_ready(app):
+            return make_response('[HTTP_503_SERVICE_UNAVAILABLE]', HttpStatusCode.HTTP_503_SERVICE_UNAVAILABLE)
 
-        user = app.mongo.db.users.find_one({'_id': object_id})
+        try:
+            fields, recorded_fields = prepare_user_fields(fields)
+        except PasswordHasherBusy:
+            return make_response('[HTTP_503_SERVICE_UNAVAILABLE]', HttpStatusCode.HTTP_503_SERVICE_UNAVAILABLE)
+
+        # The update occurs only if arguments have been passed via request
+        try:
+            user = apply_changes(app.mongo.db.users, app.mongo.db.user_changes, 'user_id', ObjectId(id),
+                                 fields, user_id, recorded_fields)
+        except DuplicateKeyError:
+            return make_response('[HTTP_409_CONFLICT]', HttpStatusCode.HTTP_409_CONFLICT)
 
         if not user:
             return make_response('[HTTP_404_NOT_FOUND]', HttpStatusCode.HTTP_404_NOT_FOUND)
 
-        fields = {key: value for key,
-                  value in args.items() if value is not None}
-
-        # The update occurs only if arguments have been passed via request
-        if len(fields):
-            users.update_one({'_id': object_id},
-                            {
-                '$push': {
-                    'changes': {
-                        'fields': fields,
-                        'updated_by_user': user_id,
-                        'updated_datetime': datetime.utcnow()
-                    }
-                }
-            })
+        invalidate_responses(f'user|{id}')
+        # The cached sessions hold the email and phone of the user, which the refreshed tokens are created with
+        invalidate_sessions(app, f'auth|{id}')
 
         return '[HTTP_204_NO_CONTENT]', HttpStatusCode.HTTP_204_NO_CONTENT
 
@@ -135,64 +202,124 @@ class UserList(Resource):
 
     def get(self):
         """
-        This method returns the list of users.
+        This method returns one page of the list of users ordered by id.
+
+        The page is selected with the `limit` and `cursor` query string arguments, see `api.resources.pagination`.
+
+        If the `ids` query string argument is passed (e.g. `?ids=a,b,c`), the users of these ids are returned
+        instead, see `api.resources.lookup`.
+
+        The fields of the users can be selected with the `fields` query string argument, see `api.resources.fields`.
         
         __Returns:__
 
-        A json response with list of users or an empty list if no users in the database
+        * If limit or cursor are invalid: A json response with the text [HTTP_400_BAD_REQUEST]
+        * If too many ids are requested: A json response with the text [HTTP_413_PAYLOAD_TOO_LARGE]
+        * If ids are passed: A json response with the users in the order of the ids
+        * If success: A json response with the page of users (or an empty list if no users in the database)
+          and the `next_cursor`, which is `null` on the last page
         """
 
-        response = []
-        users = app.mongo.db.users.find()
+        if request.args.get('ids') is not None:
+            return lookup_users(parse_ids(request.args['ids']))
 
-        for user in users:
-            user['_id'] = str(user['_id'])
-            user['hashed_password'] = user['hashed_password'].decode('utf-8')
-            user['password_salt'] = user['password_salt'].decode('utf-8')
+        try:
+            limit, after = parse_page_args()
+        except ValueError:
+            return make_response('[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
 
-            response.append(user)
+        users, next_cursor = find_page(app.mongo.db.users, {}, limit, after, user_fields.projection())
 
-        return make_response({'data': response}, HttpStatusCode.HTTP_200_OK)
+        return make_response({'data': users, 'next_cursor': next_cursor}, HttpStatusCode.HTTP_200_OK)
 
+    @rate_limited('registration', RateLimit('ip', client_ip, 'RATE_LIMIT_REGISTRATION_IP'),
+                  RateLimit('email', request_email, 'RATE_LIMIT_REGISTRATION_EMAIL'))
     def post(self):
         """
-        This method creates a new user.
+        This method creates a new user with one insert.
+
+        The id of the user is generated before the insert, so the user is created along with its
+        `created_by_user`. An existing email is detected by the unique `email_unique` index
+        (see `api.db.indexes`), also when the same email is registered concurrently.
+
+        The registrations are rate limited per IP and per email, see `api.resources.ratelimit`.
         
         __Returns:__
 
+        * If too many registrations were tried: A json response with the text [HTTP_429_TOO_MANY_REQUESTS]
         * If user already exists: A json response with the text [HTTP_409_CONFLICT]
+        * If the indexes are not created yet or the password hasher is busy:
+          A json response with the text [HTTP_503_SERVICE_UNAVAILABLE]
         * If success: A json response with the text [HTTP_201_CREATED]
         """
 
-        args = base_parser.parse_args()
+        args = user_schema.parse()
 
-        email = args['email'].strip()
+        # Without the unique index an existing email would not be detected
+        if not check_indexes_ready(app):
+            return make_response('[HTTP_503_SERVICE_UNAVAILABLE]', HttpStatusCode.HTTP_503_SERVICE_UNAVAILABLE)
 
-        existing_user = app.mongo.db.users.find_one({'email': email})
+        try:
+            hashed_password, password_salt = app.password_hasher.hash(args['password'].strip())
+        except PasswordHasherBusy:
+            return make_response('[HTTP_503_SERVICE_UNAVAILABLE]', HttpStatusCode.HTTP_503_SERVICE_UNAVAILABLE)
 
-        if existing_user is None:
-            password_salt = bcrypt.gensalt()
+        user_id = ObjectId()
 
-            hashed_password = bcrypt.hashpw(args['password'].strip().encode('utf-8'), password_salt)
-
-            inserted_id = app.mongo.db.users.insert_one({
-                'email': email,
+        try:
+            app.mongo.db.users.insert_one({
+                '_id': user_id,
+                'email': args['email'].strip(),
                 'first_name': args['first_name'].strip(),
                 'last_name': args['last_name'].strip(),
                 'hashed_password': hashed_password,
                 'password_salt': password_salt,
                 'phone': args['phone'].strip(),
                 'published:': True,
+                'created_by_user': str(user_id),
                 'created_datetime': datetime.utcnow()
-            }).inserted_id
-
-            app.mongo.db.users.update_one({'_id': inserted_id},
-                                      {
-                '$set': {
-                    'created_by_user': str(inserted_id)
-                }
             })
+        except DuplicateKeyError:
+            return make_response('[HTTP_409_CONFLICT]', HttpStatusCode.HTTP_409_CONFLICT)
+
+        return make_response('[HTTP_201_CREATED]', HttpStatusCode.HTTP_201_CREATED)
+
+
+class UserExport(Resource):
+    """
+    This class represents the export of all users.
+    """
+
+    @token_required
+    def get(self, user_id):
+        """
+        This method streams all users as NDJSON, see `api.resources.export`, with the fields selected
+        by the `fields` query string argument, see `api.resources.fields`.
+
+        __Returns:__
+
+        A streamed response with one user per line
+        """
+
+        return ndjson_response(app.mongo.db.users, projection=user_fields.projection())
+
+
+class UserLookup(Resource):
+    """
+    This class represents the lookup of users by id.
+    """
+
+    def post(self):
+        """
+        This method returns the users of the ids passed in the json body as `ids`, 
+        for lists of ids too long for the query string.
+
+        __Returns:__
+
+        * If too many ids are requested: A json response with the text [HTTP_413_PAYLOAD_TOO_LARGE]
+        * If success: A json response with the users in the order of the ids
+        """
 
-            return make_response('[HTTP_201_CREATED]', HttpStatusCode.HTTP_201_CREATED)
+        args = lookup_schema.parse()
 
-        return make_response('[HTTP_409_CONFLICT]', HttpStatusCode.HTTP_409_CONFLICT)
+        return lookup_users(args['ids'])
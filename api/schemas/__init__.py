@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+""" Schemas module which holds the validation of the request arguments.
+
+The schemas are built once when the resources are imported, and not for every request. 
+Validating a request returns the arguments converted to their types (e.g. `datetime` for dates).
+
+__Example:__
+
+```
+event_schema = Schema(
+    Field('name'),
+    Field('max_guests_allowed', type=int),
+    Field('cuisine', many=True)
+)
+
+event_update_schema = event_schema.partial(Field('rating', required=False))
+
+args = event_schema.parse()
+```
+
+When the arguments are not valid, the request is aborted with `400 Bad Request` and a `message`
+holding the error of the first invalid argument, e.g. `{"message": {"name": "Missing required parameter in the JSON body"}}`.
+"""
+
+from datetime import datetime, timezone
+
+from flask import request
+from flask_restful import abort
+from werkzeug.http import parse_date
+
+_MISSING_MESSAGES = {
+    'json': 'Missing required parameter in the JSON body',
+    'args': 'Missing required parameter in the query string',
+    'values': 'Missing required parameter in the JSON body or the post body or the query string'
+}
+
+
+class ValidationError(ValueError):
+    """
+    This exception is raised when the arguments are not valid.
+
+    The errors are stored in `errors` by argument name.
+    """
+
+    def __init__(self, errors: dict):
+        super().__init__(errors)
+
+        self.errors = errors
+
+
+def parse_datetime(value):
+    """
+    This function converts datetime arguments.
+
+    Both [ISO 8601](https://en.wikipedia.org/wiki/ISO_8601) and HTTP dates are accepted.
+    Datetimes with timezone are converted to UTC.
+
+    __Returns:__
+
+    A naive UTC datetime, as stored by MongoDb
+
+    __Raises:__
+
+    ValueError if the value is not a datetime
+    """
+
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            parsed = parse_date(str(value))
+
+    if parsed is None:
+        raise ValueError(f'{value} is not a valid datetime')
+
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return parsed
+
+
+def parse_boolean(value):
+    """
+    This function converts boolean arguments, accepting `true`/`false` and `1`/`0` as well.
+
+    __Raises:__
+
+    ValueError if the value is not a boolean
+    """
+
+    if isinstance(value, bool):
+        return value
+
+    if str(value).lower() in ('true', '1'):
+        return True
+
+    if str(value).lower() in ('false', '0'):
+        return False
+
+    raise ValueError(f'{value} is not a valid boolean')
+
+
+class Field:
+    """
+    This class represents one argument of a schema.
+
+    __Parameters:__
+
+    name (str): The name of the argument
+
+    type (function): The function converting the value, raising `ValueError` or `TypeError` if not valid
+
+    required (bool): Whether the argument must be passed
+
+    many (bool): Whether the argument is a list, a single value is converted to a list of one value
+
+    choices (tuple): The values allowed
+
+    default: The value of the argument when it is not passed
+    """
+
+    __slots__ = ('name', 'type', 'required', 'many', 'choices', 'default')
+
+    def __init__(self, name: str, type=str, required: bool = True, many: bool = False, choices=None, default=None):
+        self.name = name
+        self.type = type
+        self.required = required
+        self.many = many
+        self.choices = choices
+        self.default = default
+
+    def optional(self):
+        """
+        This method returns a copy of the field which is not required.
+        """
+
+        return Field(self.name, self.type, False, self.many, self.choices, self.default)
+
+    def convert(self, value):
+        """
+        This method converts a value of the argument.
+
+        __Raises:__
+
+        ValueError if the value is not valid
+        """
+
+        if value is None:
+            return None
+
+        if self.many:
+            values = value if isinstance(value, list) else [value]
+
+            return [self._convert_one(value) for value in values]
+
+        return self._convert_one(value)
+
+    def _convert_one(self, value):
+        try:
+            value = self.type(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(str(e)) from e
+
+        if self.choices is not None and value not in self.choices:
+            raise ValueError(f'{value} is not a valid choice')
+
+        return value
+
+
+class Schema:
+    """
+    This class represents the arguments of a request.
+
+    __Parameters:__
+
+    fields (Field): The arguments
+
+    location (str): Where the arguments are read from: `json` (default), `args` (query string)
+    or `values` (json body, form or query string)
+    """
+
+    def __init__(self, *fields: Field, location: str = 'json'):
+        self.fields = fields
+        self.location = location
+
+    def partial(self, *fields: Field):
+        """
+        This method returns a copy of the schema where no argument is required, extended with the given fields.
+
+        It is used for updates, where only the arguments to be changed are passed.
+        """
+
+        return Schema(*[field.optional() for field in self.fields], *fields, location=self.location)
+
+    def validate(self, source):
+        """
+        This method validates and converts the arguments found in the source.
+
+        __Parameters:__
+
+        source (dict): The arguments, a `MultiDict` is read with `getlist` for the fields with `many`
+
+        __Returns:__
+
+        A dict with all arguments of the schema, the ones not passed hold their default
+
+        The required arguments passed as `null` are missing.
+
+        __Raises:__
+
+        ValidationError with the error of the first invalid argument
+        """
+
+        if not isinstance(source, dict):
+            source = {}
+
+        args = {}
+
+        for field in self.fields:
+            # A required argument passed as null is missing
+            if field.name not in source or (field.required and source[field.name] is None):
+                if field.required:
+                    raise ValidationError({field.name: _MISSING_MESSAGES[self.location]})
+
+                args[field.name] = field.default
+                continue
+
+            if field.many and hasattr(source, 'getlist'):
+                value = source.getlist(field.name)
+            else:
+                value = source[field.name]
+
+            try:
+                args[field.name] = field.convert(value)
+            except ValueError as e:
+                raise ValidationError({field.name: str(e)}) from e
+
+        return args
+
+    def parse(self):
+        """
+        This method validates and converts the arguments of the current request.
+
+        __Returns:__
+
+        A dict with all arguments of the schema, see `validate`
+
+        The request is aborted with `400 Bad Request` if the arguments are not valid.
+        """
+
+        try:
+            return self.validate(self._source())
+        except ValidationError as e:
+            abort(400, message=e.errors)
+
+    def _source(self):
+        if self.location == 'args':
+            return request.args
+
+        source = request.get_json(silent=True)
+
+        if self.location == 'values' and not isinstance(source, dict):
+            return request.values
+
+        return source
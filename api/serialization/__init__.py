@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+""" Serialization module where the JSON encoding of the API responses occurs.
+
+The documents read from MongoDb are returned by the resources as they are, the values which are not
+JSON types are converted here for every response:
+
+- ObjectId to its hex string
+- Bytes to an utf-8 string
+- Datetime to an [ISO 8601](https://en.wikipedia.org/wiki/ISO_8601) string in UTC
+
+The encoder is selected with the `JSON_PROVIDER` config: `orjson` (default) uses 
+[orjson](https://github.com/ijl/orjson), `json` uses the standard library. If orjson is not installed
+the standard library is used.
+"""
+
+from datetime import date, datetime, timezone
+
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+
+def to_json_default(value):
+    """
+    This function converts the values that are not JSON types.
+
+    __Raises:__
+
+    TypeError if the value can not be converted
+    """
+
+    if isinstance(value, ObjectId):
+        return str(value)
+
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+
+        return value.isoformat()
+
+    if isinstance(value, date):
+        return value.isoformat()
+
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    This class represents the JSON provider using the standard library.
+    """
+
+    default = staticmethod(to_json_default)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    This class represents the JSON provider using orjson.
+
+    orjson serializes datetimes natively and writes bytes directly, 
+    so the responses are neither built as `str` nor encoded again.
+    """
+
+    def __init__(self, app):
+        import orjson
+
+        super().__init__(app)
+
+        self._orjson = orjson
+
+    def _options(self):
+        options = self._orjson.OPT_NAIVE_UTC | self._orjson.OPT_NON_STR_KEYS
+
+        if self.sort_keys:
+            options |= self._orjson.OPT_SORT_KEYS
+
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return self._orjson.dumps(obj, default=to_json_default, option=self._options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        options = self._options()
+
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options |= self._orjson.OPT_INDENT_2
+
+        return self._app.response_class(self._orjson.dumps(obj, default=to_json_default, option=options) + b'\n',
+                                        mimetype=self.mimetype)
+
+
+def init_serialization(app):
+    """This function sets the JSON provider of the app according to the `JSON_PROVIDER` config.
+
+    __Parameters:__
+
+    app (app): The app instance
+    """
+
+    if app.config['JSON_PROVIDER'] == 'orjson':
+        try:
+            app.json = OrjsonProvider(app)
+            return
+        except ImportError:
+            app.logger.warning('orjson is not installed, the standard library is used to encode JSON')
+
+    app.json = JSONProvider(app)
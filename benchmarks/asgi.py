@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+""" Benchmark of the throughput of concurrent requests served by the WSGI and the ASGI app.
+
+The same event reads are sent with the same concurrency to:
+
+- `wsgi`: the Flask app of `api.create_app`, called from a pool of threads
+- `asgi`: the ASGI app of `api.asgi.create_asgi_app`, called from concurrent tasks of one event loop
+
+The requests are passed to the apps directly, without an HTTP server, and the response cache
+is disabled so every request reads from MongoDb. Run it against the local MongoDb and Redis instances with:
+
+```bash
+$ python -m benchmarks.asgi --requests 5000 --concurrency 64
+```
+
+With `--env testing` both apps run against mongomock, which blocks the event loop, so the numbers only
+show the overhead of the ASGI app.
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.test import EnvironBuilder
+
+from api.asgi.testing import build_scope
+from api.resources.constants import Routes
+from benchmarks.utils import create_benchmark_app, percentile, seed_events, seed_users
+
+
+def run_wsgi(app, urls, concurrency: int):
+    def request(url):
+        start = time.perf_counter()
+        statuses = []
+
+        environ = EnvironBuilder(path=url).get_environ()
+        body = b''.join(app(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+
+        return statuses[0], body, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(request, urls))
+
+
+async def run_asgi(asgi_app, urls, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(url):
+        async with semaphore:
+            start = time.perf_counter()
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                messages.append(message)
+
+            await asgi_app(build_scope(EnvironBuilder(path=url).get_environ()), receive, send)
+
+            body = b''.join(message.get('body', b'') for message in messages[1:])
+
+            return str(messages[0]['status']), body, time.perf_counter() - start
+
+    return await asyncio.gather(*(request(url) for url in urls))
+
+
+def report(name: str, results, elapsed: float):
+    latencies = [latency * 1000 for _, _, latency in results]
+    errors = sum(1 for status, _, _ in results if not status.startswith('200'))
+
+    print(f'{name:<6}{len(results) / elapsed:10.0f} req/s   p50 {percentile(latencies, 50):8.2f}ms   '
+          f'p99 {percentile(latencies, 99):8.2f}ms   errors {errors}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--env', default='development', choices=('development', 'testing'))
+    parser.add_argument('--events', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.env, asgi=True)
+    app.config['RESPONSE_CACHE_EVENT_TTL'] = 0
+
+    users, _ = seed_users(app, 1)
+    events = seed_events(app, str(users[0]['_id']), args.events)
+
+    urls = [f'{Routes.EVENTS_V1}/{str(events[i % len(events)]["_id"])}' for i in range(args.requests)]
+
+    print(f'{args.requests} event reads with a concurrency of {args.concurrency}:')
+
+    start = time.perf_counter()
+    results = run_wsgi(app, urls, args.concurrency)
+    report('wsgi', results, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    results = asyncio.run(run_asgi(app.asgi_app, urls, args.concurrency))
+    report('asgi', results, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
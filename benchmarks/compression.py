@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+""" Benchmark of the CPU cost and the bytes saved by the compression of the list responses.
+
+Reads pages of `GET /api/v1/events` and `GET /api/v1/users` of typical sizes and compresses their body
+with the encoders of `api.compression.response`, at several levels, reporting per page:
+
+- the compressed size and the ratio to the uncompressed size
+- the CPU time of the compression (best of `--repeat`)
+- the CPU time per KB saved, to choose `COMPRESSION_GZIP_LEVEL` and `COMPRESSION_BROTLI_QUALITY`
+
+`br` is only measured if brotli is installed. Run it with:
+
+```bash
+$ python -m benchmarks.compression --page-sizes 20 50 100
+```
+"""
+
+import argparse
+import timeit
+
+from api.compression.response import BrotliEncoder, GzipEncoder, brotli
+from api.resources.constants import Routes
+from benchmarks.utils import create_benchmark_app, seed_events, seed_users
+
+
+def encoders():
+    levels = [('gzip', GzipEncoder, level) for level in (1, 6, 9)]
+
+    if brotli is not None:
+        levels += [('br', BrotliEncoder, quality) for quality in (1, 4, 6, 11)]
+
+    return levels
+
+
+def compress(encoder_class, level: int, body: bytes):
+    encoder = encoder_class(level)
+
+    return encoder.compress(body) + encoder.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--env', default='testing', choices=('development', 'testing'))
+    parser.add_argument('--page-sizes', type=int, nargs='+', default=[20, 50, 100])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.env)
+    app.config['MAX_PAGE_SIZE'] = max(args.page_sizes)
+
+    users, _ = seed_users(app, max(args.page_sizes))
+    seed_events(app, str(users[0]['_id']), max(args.page_sizes))
+
+    print(f'{"page":<18}{"encoding":<10}{"bytes":>10}{"ratio":>8}{"cpu ms":>10}{"us/KB saved":>13}')
+
+    with app.test_client() as client:
+        for route in (Routes.EVENTS_V1, Routes.USERS_V1):
+            for page_size in args.page_sizes:
+                body = client.get(f'{route}?limit={page_size}').data
+                name = f'{route.rsplit("/", 1)[-1]} x{page_size}'
+
+                print(f'{name:<18}{"identity":<10}{len(body):>10}{1:>8.2f}{0:>10.3f}{"":>13}')
+
+                for encoding, encoder_class, level in encoders():
+                    size = len(compress(encoder_class, level, body))
+                    seconds = min(timeit.repeat(lambda: compress(encoder_class, level, body), number=1,
+                                                repeat=args.repeat))
+                    saved_kb = (len(body) - size) / 1024
+
+                    print(f'{"":<18}{f"{encoding}-{level}":<10}{size:>10}{size / len(body):>8.2f}'
+                          f'{seconds * 1000:>10.3f}{seconds * 1e6 / saved_kb:>13.2f}')
+
+
+if __name__ == '__main__':
+    main()
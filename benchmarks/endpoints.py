@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+""" Benchmark suite measuring the throughput and latency of every route of the API.
+
+Each route registered in `api.resources.init_resources` has a scenario sending realistic requests
+against seeded users and events through the Flask test client. For each scenario the suite reports
+the requests per second and the p50, p95 and p99 latencies.
+
+The results can be saved as a JSON baseline and compared with a baseline saved before. The suite fails when
+a route is slower than the baseline by more than the threshold, either in req/s or in p95 latency,
+when a request answers with an unexpected status, or when a route has no scenario.
+
+Run it against mongomock, or against the local MongoDb and Redis instances with `--env development`:
+
+```bash
+$ python -m benchmarks.endpoints --save benchmarks/baselines/testing.json
+$ python -m benchmarks.endpoints --baseline benchmarks/baselines/testing.json --threshold 0.2
+```
+
+Baselines are only comparable when taken on the same machine with the same arguments.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from api.resources.constants import HttpStatusCode, Routes
+from benchmarks.utils import create_benchmark_app, percentile, seed_events, seed_sessions, seed_users
+
+Scenario = namedtuple('Scenario', ['endpoint', 'method', 'request', 'statuses'])
+"""A route to benchmark: `request(i)` returns the path and the arguments of the test client for the i-th request"""
+
+
+def create_scenarios(users, tokens, events, logout_tokens, refresh_tokens):
+    """
+    This function creates the scenarios of all routes for the seeded users and events.
+
+    The scenarios changing data use a different user or event per request where the route requires it,
+    e.g. a user reserves a seat only once and logs out only once.
+    """
+
+    start = datetime.utcnow() + timedelta(days=30)
+
+    def auth(i):
+        return {'Access-Token': tokens[i % len(tokens)]}
+
+    def user_id(i):
+        return str(users[i % len(users)]['_id'])
+
+    def event_id(i):
+        return str(events[i % len(events)]['_id'])
+
+    def new_event(i):
+        return {
+            'name': f'benchmark event {i}',
+            'start_datetime': (start + timedelta(hours=i)).isoformat(),
+            'end_datetime': (start + timedelta(hours=i + 4)).isoformat(),
+            'max_guests_allowed': 10,
+            'cuisine': ['Italian'],
+            'price_per_person': 25.0,
+            'description': 'Benchmark event'
+        }
+
+    def ids(i):
+        return [event_id(i + offset) for offset in range(20)]
+
+    ok = (HttpStatusCode.HTTP_200_OK,)
+    created = (HttpStatusCode.HTTP_201_CREATED,)
+    no_content = (HttpStatusCode.HTTP_204_NO_CONTENT,)
+
+    return [
+        Scenario('eventlist', 'GET', lambda i: (Routes.EVENTS_V1, {}), ok),
+        Scenario('eventlist', 'POST', lambda i: (Routes.EVENTS_V1, {'headers': auth(i), 'json': new_event(i)}),
+                 created),
+        Scenario('eventexport', 'GET', lambda i: (Routes.EVENTS_EXPORT_V1, {'headers': auth(i)}), ok),
+        Scenario('eventsearch', 'GET', lambda i: (Routes.EVENTS_SEARCH_V1, {
+            'query_string': {'cuisine': 'Japanese', 'price_max': 30, 'sort': 'price_per_person'}}), ok),
+        Scenario('eventbulk', 'POST', lambda i: (Routes.EVENTS_BULK_V1, {
+            'headers': auth(i), 'json': [new_event(i * 100 + j) for j in range(100)]}),
+                 (HttpStatusCode.HTTP_207_MULTI_STATUS,)),
+        Scenario('eventlookup', 'POST', lambda i: (Routes.EVENTS_LOOKUP_V1, {'json': {'ids': ids(i)}}), ok),
+        Scenario('event', 'GET', lambda i: (f'{Routes.EVENTS_V1}/{event_id(i)}', {}), ok),
+        Scenario('event', 'PUT', lambda i: (f'{Routes.EVENTS_V1}/{event_id(i)}', {
+            'headers': auth(i), 'json': {'description': f'Benchmark event {i}'}}), no_content),
+        Scenario('eventreservations', 'POST', lambda i: (f'{Routes.EVENTS_V1}/{event_id(0)}/reservations', {
+            'headers': auth(i)}), (HttpStatusCode.HTTP_201_CREATED, HttpStatusCode.HTTP_409_CONFLICT)),
+        Scenario('userlist', 'GET', lambda i: (Routes.USERS_V1, {}), ok),
+        Scenario('userlist', 'POST', lambda i: (Routes.USERS_V1, {'json': {
+            'email': f'benchmark-{time.time_ns()}-{i}@mangia.club', 'first_name': 'benchmark',
+            'last_name': f'user {i}', 'password': 'foo', 'phone': '+4915100000000'}}), created),
+        Scenario('userexport', 'GET', lambda i: (Routes.USERS_EXPORT_V1, {'headers': auth(i)}), ok),
+        Scenario('userlookup', 'POST', lambda i: (Routes.USERS_LOOKUP_V1, {
+            'json': {'ids': [user_id(i + offset) for offset in range(20)]}}), ok),
+        Scenario('user', 'GET', lambda i: (f'{Routes.USERS_V1}/{user_id(i)}', {}), ok),
+        Scenario('user', 'PUT', lambda i: (f'{Routes.USERS_V1}/{user_id(i)}', {
+            'headers': auth(i), 'json': {'first_name': f'benchmark {i}'}}), no_content),
+        Scenario('login', 'POST', lambda i: (Routes.LOGIN_V1, {
+            'json': {'email': users[i % len(users)]['email'], 'password': 'foo'}}), created),
+        Scenario('logout', 'DELETE', lambda i: (Routes.LOGOUT_V1, {
+            'headers': {'Access-Token': logout_tokens[i % len(logout_tokens)]}}), no_content),
+        Scenario('refresh', 'POST', lambda i: (Routes.REFRESH_V1, {
+            'json': {'refresh_token': refresh_tokens[i % len(refresh_tokens)]}}), created),
+        Scenario('stats', 'GET', lambda i: (Routes.STATS_V1, {'headers': auth(i)}), ok),
+        Scenario('poolstats', 'GET', lambda i: (Routes.STATS_POOLS_V1, {'headers': auth(i)}), ok),
+        Scenario('slowquerystats', 'GET', lambda i: (Routes.STATS_SLOW_QUERIES_V1, {'headers': auth(i)}), ok),
+        Scenario('metrics', 'GET', lambda i: (Routes.METRICS, {'headers': auth(i)}), ok)
+    ]
+
+
+def uncovered_routes(app, scenarios):
+    """
+    This function returns the routes of the app, as `METHOD rule`, which have no scenario.
+    """
+
+    covered = {(scenario.endpoint, scenario.method) for scenario in scenarios}
+    uncovered = []
+
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == 'static':
+            continue
+
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            if (rule.endpoint, method) not in covered:
+                uncovered.append(f'{method} {rule.rule}')
+
+    return uncovered
+
+
+def run_scenario(app, scenario: Scenario, requests: int, concurrency: int):
+    """
+    This function sends the requests of a scenario and returns its results.
+
+    __Returns:__
+
+    A dict with `rps`, the `p50`, `p95` and `p99` latencies in milliseconds and the number of `errors`
+    """
+
+    client = app.test_client()
+
+    def send(i):
+        path, kwargs = scenario.request(i)
+
+        start = time.perf_counter()
+        response = client.open(path, method=scenario.method, **kwargs)
+        response.get_data()
+        latency = time.perf_counter() - start
+
+        return response.status_code in scenario.statuses, latency
+
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, range(requests)))
+
+    elapsed = time.perf_counter() - start
+    latencies = [latency * 1000 for _, latency in results]
+
+    return {
+        'rps': round(requests / elapsed, 2),
+        'p50': round(percentile(latencies, 50), 3),
+        'p95': round(percentile(latencies, 95), 3),
+        'p99': round(percentile(latencies, 99), 3),
+        'errors': sum(1 for expected, _ in results if not expected)
+    }
+
+
+def regressions(results: dict, baseline: dict, threshold: float):
+    """
+    This function compares the results with the baseline.
+
+    __Returns:__
+
+    The list of regressions, as `(name, metric, baseline value, value)`
+    """
+
+    found = []
+
+    for name, result in results.items():
+        previous = baseline.get(name)
+
+        if previous is None:
+            continue
+
+        if result['rps'] < previous['rps'] * (1 - threshold):
+            found.append((name, 'rps', previous['rps'], result['rps']))
+
+        if result['p95'] > previous['p95'] * (1 + threshold):
+            found.append((name, 'p95', previous['p95'], result['p95']))
+
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--env', default='testing', choices=('development', 'testing'))
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--routes', nargs='*', help='Only run the routes containing one of these texts')
+    parser.add_argument('--save', help='Path of the JSON baseline to write the results to')
+    parser.add_argument('--baseline', help='Path of the JSON baseline to compare the results with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed regression, e.g. 0.2 for 20%% less req/s or 20%% more p95 latency')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.env)
+
+    users, tokens = seed_users(app, args.users)
+    _, logout_tokens = seed_users(app, args.requests)
+    events = seed_events(app, str(users[0]['_id']), args.events, max_guests_allowed=args.requests)
+
+    refresh_tokens = seed_sessions(app, users)
+
+    scenarios = create_scenarios(users, tokens, events, logout_tokens, refresh_tokens)
+    failed = False
+
+    uncovered = uncovered_routes(app, scenarios)
+
+    if uncovered:
+        print(f'Routes without scenario: {", ".join(uncovered)}')
+        failed = True
+
+    baseline = {}
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    print(f'{"route":<50}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"errors":>8}{"vs base":>10}')
+
+    results = {}
+
+    rules = {rule.endpoint: rule.rule for rule in app.url_map.iter_rules()}
+
+    for scenario in scenarios:
+        name = f'{scenario.method} {rules[scenario.endpoint]}'
+
+        if args.routes and not any(route in name for route in args.routes):
+            continue
+
+        result = run_scenario(app, scenario, args.requests, args.concurrency)
+        results[name] = result
+
+        change = ''
+
+        if name in baseline:
+            change = f'{(result["rps"] / baseline[name]["rps"] - 1) * 100:+.1f}%'
+
+        print(f'{name:<50}{result["rps"]:>10.0f}{result["p50"]:>10.2f}{result["p95"]:>10.2f}'
+              f'{result["p99"]:>10.2f}{result["errors"]:>8}{change:>10}')
+
+        failed = failed or result['errors'] > 0
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+
+        with open(args.save, 'w') as f:
+            json.dump({'env': args.env, 'requests': args.requests, 'concurrency': args.concurrency,
+                       'created_datetime': datetime.utcnow().isoformat(), 'results': results}, f, indent=2)
+
+        print(f'Baseline saved to {args.save}')
+
+    found = regressions(results, baseline, args.threshold)
+
+    for name, metric, previous, value in found:
+        print(f'REGRESSION {name}: {metric} {previous} -> {value} (threshold {args.threshold:.0%})')
+
+    if failed or found:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+""" Benchmark of the overhead of the request metrics.
+
+Reports the time `api.metrics.TimingMiddleware`, the only difference `METRICS_ENABLED` makes to the app,
+adds to an event read, and the overhead relative to the latency of the read, which must stay
+under `--max-overhead` (2%).
+
+The work of the middleware does not depend on the app it wraps, so it is timed around an app replaying
+the response, the request and the spans of a real read, many times over: a few microseconds can not be told
+apart reliably from the noise between two runs of the full read, which is far larger on a shared or virtual
+machine. The latency of the read is the median of runs without the middleware. Both are measured
+in CPU time of the process, which does not include the time other processes were running.
+
+The app runs with the `SERVER_TIMING_ENABLED` of the config, i.e. without the `Server-Timing` header
+but with `--server-timing`. With `--env testing` (the default) the reads hit mongomock in memory,
+with `--env development` the local MongoDb and Redis instances.
+
+Run it with:
+
+```bash
+$ python -m benchmarks.metrics --requests 2000
+```
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import timeit
+from unittest import mock
+
+from werkzeug.test import EnvironBuilder
+
+from api.metrics import TimingMiddleware
+from api.metrics.spans import record
+from api.resources.constants import Routes
+from benchmarks.utils import create_benchmark_app, seed_events, seed_users
+from config import DevelopmentConfig, TestingConfig
+
+
+def create_app(env: str, server_timing_enabled: bool):
+    config = DevelopmentConfig if env == 'development' else TestingConfig
+
+    with mock.patch.object(config, 'METRICS_ENABLED', True), \
+            mock.patch.object(config, 'SERVER_TIMING_ENABLED', server_timing_enabled):
+        return create_benchmark_app(env)
+
+
+def capture(app, environ: dict):
+    """
+    This function sends one request through the app and its middleware.
+
+    __Returns:__
+
+    A WSGI app replaying the response, the request and the spans of the request
+    """
+
+    response = {}
+    environ = dict(environ)
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = status
+        response['headers'] = [(name, value) for name, value in headers if name != 'Server-Timing']
+
+    with mock.patch.object(app.wsgi_app.metrics, 'observe') as observe:
+        body = b''.join(app(environ, start_response))
+
+    spans = observe.call_args[0][4]
+    request = environ['werkzeug.request']
+
+    def replay(environ, start_response):
+        environ['werkzeug.request'] = request
+
+        for name, seconds in spans.items():
+            record(name, seconds)
+
+        start_response(response['status'], list(response['headers']))
+
+        return [body]
+
+    return replay
+
+
+def cpu_time(f, number: int):
+    return timeit.timeit(f, number=number, timer=time.process_time) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--env', default='testing', choices=('development', 'testing'))
+    parser.add_argument('--requests', type=int, default=2000, help='Event reads per run')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--max-overhead', type=float, default=0.02)
+    parser.add_argument('--server-timing', action='store_true', help='Add the Server-Timing header')
+    args = parser.parse_args()
+
+    server_timing_enabled = args.server_timing or (args.env == 'development' and
+                                                   DevelopmentConfig.SERVER_TIMING_ENABLED)
+
+    app = create_app(args.env, server_timing_enabled)
+    app.config['RESPONSE_CACHE_EVENT_TTL'] = 0
+
+    users, _ = seed_users(app, 1)
+    event = seed_events(app, str(users[0]['_id']), 1)[0]
+
+    environ = EnvironBuilder(path=f'{Routes.EVENTS_V1}/{str(event["_id"])}').get_environ()
+
+    def request():
+        b''.join(app(dict(environ), lambda status, headers, exc_info=None: None))
+
+    # Warm up the caches of the app (e.g. the url map) before timing it
+    timeit.timeit(request, number=100)
+
+    replay = capture(app, environ)
+    middleware = TimingMiddleware(replay, app.wsgi_app.metrics, server_timing_enabled)
+    app.wsgi_app = app.wsgi_app.wsgi_app
+
+    def replayed(wsgi_app):
+        return lambda: b''.join(wsgi_app(dict(environ), lambda status, headers, exc_info=None: None))
+
+    # The replays are cheap, so they are timed with many more calls to average out the noise
+    number = args.requests * 50
+    costs = []
+    latencies = []
+
+    for _ in range(args.repeat):
+        costs.append(cpu_time(replayed(middleware), number) - cpu_time(replayed(replay), number))
+        latencies.append(cpu_time(request, args.requests))
+
+    cost = min(costs)
+    latency = statistics.median(latencies)
+    overhead = cost / latency
+
+    print(f'{args.requests} event reads, {args.repeat} runs, '
+          f'Server-Timing {"on" if server_timing_enabled else "off"}:')
+    print(f'latency   {latency * 1e6:10.1f}us per request (median, without metrics)')
+    print(f'metrics   {cost * 1e6:10.1f}us per request')
+    print(f'overhead  {overhead:+10.2%}')
+
+    if overhead > args.max_overhead:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+""" Benchmark of the latency added by the rate limiter of the login and the registration.
+
+Calls a method decorated with `api.resources.ratelimit.rate_limited`, with the limits per IP and
+per email of the login, and a method without decorator, in the request context of a login, and reports
+the p50, p95 and p99 latencies added by the limiter, which must stay under 1 ms.
+
+The limits are raised so every request is allowed and logged in its windows, the most expensive path
+of the Lua script. Run it against the local Redis instance:
+
+```bash
+$ python -m benchmarks.ratelimit --requests 5000
+```
+"""
+
+import argparse
+import sys
+import time
+
+from api.resources.constants import Routes
+from api.resources.ratelimit import RateLimit, client_ip, rate_limited, request_email
+from benchmarks.utils import create_benchmark_app, percentile
+
+
+def login():
+    return 'ok'
+
+
+limited_login = rate_limited('benchmark-login', RateLimit('ip', client_ip, 'RATE_LIMIT_LOGIN_IP'),
+                             RateLimit('email', request_email, 'RATE_LIMIT_LOGIN_EMAIL'))(login)
+
+
+def measure(app, f, requests: int):
+    latencies = []
+
+    for i in range(requests):
+        with app.test_request_context(Routes.LOGIN_V1, method='POST',
+                                      json={'email': f'benchmark-{i % 100}@mangia.club', 'password': 'foo'}):
+            start = time.perf_counter()
+            f()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--env', default='development', choices=('development', 'testing'))
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--max-ms', type=float, default=1.0, help='Allowed p99 latency added by the limiter')
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.env)
+    app.config['RATE_LIMIT_ENABLED'] = True
+    app.config['RATE_LIMIT_LOGIN_IP'] = (10 ** 9, 60)
+    app.config['RATE_LIMIT_LOGIN_EMAIL'] = (10 ** 9, 60)
+
+    if args.env == 'testing':
+        app.redis.eval.return_value = 0
+
+    baseline = measure(app, login, args.requests)
+    limited = measure(app, limited_login, args.requests)
+
+    print(f'{args.requests} logins, latency added by the rate limiter:')
+    print(f'{"":<10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+
+    added = {}
+
+    for name, latencies in (('without', baseline), ('with', limited)):
+        print(f'{name:<10}' + ''.join(f'{percentile(latencies, p):>10.3f}' for p in (50, 95, 99)))
+
+    for p in (50, 95, 99):
+        added[p] = percentile(limited, p) - percentile(baseline, p)
+
+    print(f'{"added":<10}' + ''.join(f'{added[p]:>10.3f}' for p in (50, 95, 99)))
+
+    if added[99] > args.max_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+""" Benchmark of the parsing of the request arguments.
+
+Compares the cost of parsing the arguments of an event update with:
+
+- `reqparse`: copying a `reqparse.RequestParser` on every request, as `Event.__init__` used to do
+- `schema`: the `event_update_schema` built once when `api.resources.events` is imported
+
+Run it with:
+
+```bash
+$ python -m benchmarks.request_parsing --requests 10000
+```
+"""
+
+import argparse
+import timeit
+
+from flask_restful import reqparse
+
+from api.resources.events import event_update_schema
+from benchmarks.utils import create_benchmark_app
+
+PAYLOAD = {
+    'name': 'benchmark event',
+    'start_datetime': '2030-01-05T18:30:00Z',
+    'end_datetime': '2030-01-05T23:30:00Z',
+    'max_guests_allowed': 10,
+    'cuisine': ['Japanese', 'Brazilian'],
+    'price_per_person': 16.0,
+    'description': 'Benchmark event',
+    'guests': ['5f0c5a3c8e1b2a3d4c5b6a79'],
+    'rating': 5
+}
+
+
+def create_base_parser():
+    parser = reqparse.RequestParser()
+    parser.add_argument('name', required=True, location='json')
+    parser.add_argument('start_datetime', required=True, location='json')
+    parser.add_argument('end_datetime', required=True, location='json')
+    parser.add_argument('max_guests_allowed', type=int, required=True, location='json')
+    parser.add_argument('cuisine', action='append', required=True, location='json')
+    parser.add_argument('price_per_person', type=float, required=True, location='json')
+    parser.add_argument('description', required=True, location='json')
+
+    return parser
+
+
+def reqparse_parse(base_parser):
+    parser = base_parser.copy()
+
+    for arg in parser.args:
+        arg.required = False
+
+    parser.add_argument('guests', action='append', location='json')
+    parser.add_argument('rating', location='json')
+
+    return parser.parse_args()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_benchmark_app('testing')
+    base_parser = create_base_parser()
+
+    benchmarks = {
+        'reqparse': lambda: reqparse_parse(base_parser),
+        'schema': event_update_schema.parse
+    }
+
+    print(f'Parsing {args.requests} event updates, best of {args.repeat}:')
+
+    with app.test_request_context(method='PUT', json=PAYLOAD):
+        for name, benchmark in benchmarks.items():
+            best = min(timeit.repeat(benchmark, number=args.requests, repeat=args.repeat))
+
+            print(f'{name:<10}{best / args.requests * 1e6:10.2f}us per request')
+
+
+if __name__ == '__main__':
+    main()
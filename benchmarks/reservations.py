@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+""" Load test of the reservation endpoint under concurrent contention.
+
+Many users try to reserve a seat of the same event at the same time. The test fails
+if the event ends up with more guests than `max_guests_allowed` or if the number of 
+successful reservations does not match the capacity.
+
+Run it against the local MongoDb and Redis instances with:
+
+```bash
+$ python -m benchmarks.reservations --users 500 --capacity 50 --concurrency 64
+```
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from api.resources.constants import Routes
+from benchmarks.utils import create_benchmark_app, percentile, seed_events, seed_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--env', default='development', choices=('development', 'testing'))
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--capacity', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=64)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.env)
+
+    users, tokens = seed_users(app, args.users)
+    event = seed_events(app, str(users[0]['_id']), 1, max_guests_allowed=args.capacity)[0]
+
+    url = f'{Routes.EVENTS_V1}/{str(event["_id"])}/reservations'
+    client = app.test_client()
+
+    def reserve(token):
+        start = time.perf_counter()
+        response = client.post(url, headers={'Access-Token': token})
+
+        return response.status_code, response.data, time.perf_counter() - start
+
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(reserve, tokens))
+
+    elapsed = time.perf_counter() - start
+
+    statuses = Counter((status, data.decode('utf-8')) for status, data, _ in results)
+    latencies = [latency * 1000 for _, _, latency in results]
+    guests = app.mongo.db.events.find_one({'_id': event['_id']}).get('guests', [])
+
+    print(f'{len(results)} reservations in {elapsed:.2f}s ({len(results) / elapsed:.0f} req/s)')
+    print(f'p50 {percentile(latencies, 50):.2f}ms, p95 {percentile(latencies, 95):.2f}ms, '
+          f'p99 {percentile(latencies, 99):.2f}ms')
+
+    for (status, data), count in sorted(statuses.items()):
+        print(f'{status} {data}: {count}')
+
+    reserved = statuses[(201, '[HTTP_201_CREATED]')]
+    expected = min(args.capacity, args.users)
+
+    if len(guests) > args.capacity or len(set(guests)) != len(guests) or reserved != expected:
+        print(f'FAILED: {len(guests)} guests and {reserved} reservations for a capacity of {args.capacity}')
+        sys.exit(1)
+
+    print(f'OK: {len(guests)} guests for a capacity of {args.capacity}')
+
+
+if __name__ == '__main__':
+    main()
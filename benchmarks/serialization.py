@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+""" Benchmark of the JSON serialization of a list response.
+
+Compares the cost of encoding a list of documents with:
+
+- `legacy`: converting each document by hand and encoding it with the default Flask provider
+- `json`: the standard library provider of `api.serialization`
+- `orjson`: the orjson provider of `api.serialization`
+
+Run it with:
+
+```bash
+$ python -m benchmarks.serialization --documents 10000
+```
+"""
+
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+import bcrypt
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+from api.serialization import JSONProvider, OrjsonProvider
+from benchmarks.utils import create_benchmark_app
+
+
+def create_documents(count: int):
+    now = datetime.utcnow()
+    hashed_password = bcrypt.hashpw(b'foo', bcrypt.gensalt(4))
+
+    return [{
+        '_id': ObjectId(),
+        'host_id': str(ObjectId()),
+        'name': f'benchmark event {i}',
+        'start_datetime': now + timedelta(days=i % 90, hours=18),
+        'end_datetime': now + timedelta(days=i % 90, hours=23),
+        'max_guests_allowed': 10,
+        'cuisine': ['Japanese', 'Brazilian'],
+        'price_per_person': float(10 + i % 40),
+        'description': 'Benchmark event ' * 10,
+        'hashed_password': hashed_password,
+        'password_salt': hashed_password[:29],
+        'created_datetime': now
+    } for i in range(count)]
+
+
+def legacy_dumps(provider, documents):
+    response = []
+
+    for document in documents:
+        document = dict(document)
+        document['_id'] = str(document['_id'])
+        document['hashed_password'] = document['hashed_password'].decode('utf-8')
+        document['password_salt'] = document['password_salt'].decode('utf-8')
+        response.append(document)
+
+    return provider.dumps({'data': response})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_benchmark_app('testing')
+    documents = create_documents(args.documents)
+
+    benchmarks = {
+        'legacy': lambda provider=DefaultJSONProvider(app): legacy_dumps(provider, documents),
+        'json': lambda provider=JSONProvider(app): provider.dumps({'data': documents}),
+        'orjson': lambda provider=OrjsonProvider(app): provider.dumps({'data': documents})
+    }
+
+    print(f'Encoding {args.documents} documents, best of {args.repeat}:')
+
+    for name, benchmark in benchmarks.items():
+        best = min(timeit.repeat(benchmark, number=1, repeat=args.repeat))
+
+        print(f'{name:<8}{best * 1000:10.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+""" Utils module with the helpers shared by the benchmarks.
+"""
+
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import bcrypt
+import jwt
+
+
+def create_benchmark_app(env: str, asgi: bool = False):
+    """
+    This function creates the app for the given environment.
+
+    With `testing` the app runs against mongomock and a mocked Redis,
+    with `development` against the local MongoDb and Redis instances.
+
+    With `asgi` the app is created with `api.asgi.create_asgi_app`, the ASGI app is available as `app.asgi_app`.
+    """
+
+    os.environ['FLASK_ENV'] = env
+
+    if asgi:
+        from api.asgi import create_asgi_app
+
+        app = create_asgi_app().app
+    else:
+        from api import create_app
+
+        app = create_app()
+
+    # The benchmarks send many logins and registrations from the same IP
+    app.config['RATE_LIMIT_ENABLED'] = False
+
+    return app
+
+
+def seed_users(app, count: int, password: str = 'foo'):
+    """
+    This function inserts users with a valid session and returns them along with their access tokens.
+    """
+
+    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(4))
+    now = datetime.utcnow()
+
+    users = [{
+        'email': f'benchmark-{now.timestamp()}-{i}@mangia.club',
+        'first_name': 'benchmark',
+        'last_name': f'user {i}',
+        'hashed_password': hashed_password,
+        'password_salt': hashed_password[:29],
+        'phone': '+4915100000000',
+        'published:': True,
+        'created_datetime': now
+    } for i in range(count)]
+
+    app.mongo.db.users.insert_many(users)
+
+    tokens = [create_token(user, app.config['SECRET_KEY']) for user in users]
+
+    return users, tokens
+
+
+def seed_sessions(app, users):
+    """
+    This function opens a session for every user and returns their refresh tokens.
+    """
+
+    refresh_tokens = []
+
+    for user in users:
+        sid = uuid.uuid4().hex
+        token = create_token(user, app.config['SECRET_KEY'], timedelta(days=1), sid=sid, token_type='refresh')
+
+        app.redis.setex(f'auth|{str(user["_id"])}|{sid}', 86400, token)
+
+        refresh_tokens.append(token)
+
+    return refresh_tokens
+
+
+def seed_events(app, host_id: str, count: int, max_guests_allowed: int = 10):
+    """
+    This function inserts events hosted by the given user and returns them.
+    """
+
+    now = datetime.utcnow()
+    cuisines = ['Japanese', 'Brazilian', 'Italian', 'Mexican', 'Indian']
+
+    events = [{
+        'host_id': host_id,
+        'name': f'benchmark event {i}',
+        'start_datetime': now + timedelta(days=i % 90, hours=18),
+        'end_datetime': now + timedelta(days=i % 90, hours=23),
+        'max_guests_allowed': max_guests_allowed,
+        'cuisine': [cuisines[i % len(cuisines)]],
+        'price_per_person': float(10 + i % 40),
+        'description': 'Benchmark event ' * 10,
+        'published:': True,
+        'created_by_user': host_id,
+        'created_datetime': now
+    } for i in range(count)]
+
+    app.mongo.db.events.insert_many(events)
+
+    return events
+
+
+def create_token(user, secret: str, expires_in: timedelta = timedelta(hours=1), sid: str = None,
+                 token_type: str = 'access'):
+    """
+    This function creates a token of a session of the user, see `api.resources.tokens`.
+    """
+
+    payload = {
+        'exp': datetime.utcnow() + expires_in,
+        'iat': datetime.utcnow(),
+        'sub': f'auth|{str(user["_id"])}',
+        'email': user['email'],
+        'phone:': user['phone'],
+        'sid': sid or uuid.uuid4().hex,
+        'jti': uuid.uuid4().hex,
+        'type': token_type
+    }
+
+    token = jwt.encode(payload, secret, algorithm='HS256')
+
+    return token.decode('utf-8') if isinstance(token, bytes) else token
+
+
+def percentile(values, percent: float):
+    """
+    This function returns the percentile of a list of values using the nearest rank method.
+    """
+
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+    rank = max(int(round(percent / 100 * len(values))) - 1, 0)
+
+    return values[min(rank, len(values) - 1)]
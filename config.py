@@ -6,6 +6,56 @@ class Config(object):
     MONGO_DB_PORT = '27017'
     REDIS_HOST = ''
     REDIS_PORT = ''
+    MONGO_MAX_POOL_SIZE = 100
+    MONGO_MIN_POOL_SIZE = 0
+    MONGO_MAX_IDLE_TIME_MS = 60000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = 2000
+    MONGO_CONNECT_TIMEOUT_MS = 5000
+    MONGO_SOCKET_TIMEOUT_MS = 10000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = 5000
+    MONGO_SLOW_QUERY_MS = 100
+    REDIS_MAX_CONNECTIONS = 100
+    REDIS_SOCKET_TIMEOUT = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT = 2.0
+    REDIS_HEALTH_CHECK_INTERVAL = 30
+    JSON_PROVIDER = 'orjson'
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+    MAX_LOOKUP_IDS = 100
+    EXPORT_BATCH_SIZE = 1000
+    BULK_MAX_EVENTS = 10000
+    BULK_INSERT_CHUNK_SIZE = 1000
+    ACCESS_TOKEN_TTL = 900
+    REFRESH_TOKEN_TTL = 5184000
+    TOKEN_DENYLIST_CAPACITY = 100000
+    TOKEN_DENYLIST_ERROR_RATE = 0.001
+    TOKEN_DENYLIST_REBUILD_INTERVAL = 3600
+    SESSION_CACHE_MAX_SIZE = 10000
+    SESSION_CACHE_TTL = 30
+    BCRYPT_ROUNDS = 12
+    PASSWORD_HASHER_WORKERS = 2
+    PASSWORD_HASHER_MAX_PENDING = 16
+    RESPONSE_CACHE_EVENT_TTL = 60
+    RESPONSE_CACHE_EVENT_LIST_TTL = 10
+    RESPONSE_CACHE_USER_TTL = 60
+    ASGI_WORKER_THREADS = 16
+    VIEW_COUNT_FLUSH_INTERVAL = 10
+    VIEW_COUNT_BATCH_SIZE = 1000
+    RATE_LIMIT_ENABLED = True
+    RATE_LIMIT_LOGIN_IP = (20, 60)
+    RATE_LIMIT_LOGIN_EMAIL = (5, 60)
+    RATE_LIMIT_REGISTRATION_IP = (10, 3600)
+    RATE_LIMIT_REGISTRATION_EMAIL = (3, 3600)
+    PROXY_FIX_X_FOR = 0
+    COMPRESSION_ENABLED = True
+    COMPRESSION_MIN_SIZE = 1024
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 4
+    COMPRESSION_MIMETYPES = ('application/json', 'application/x-ndjson')
+    METRICS_ENABLED = True
+    METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    SERVER_TIMING_ENABLED = False
+    BACKGROUND_THREADS_ENABLED = True
 
 
 class ProductionConfig(Config):
@@ -19,6 +69,8 @@ class DevelopmentConfig(Config):
     MONGO_DB_HOST = 'localhost'
     REDIS_HOST = 'localhost'
     REDIS_PORT = '6379'
+    BCRYPT_ROUNDS = 10
+    SERVER_TIMING_ENABLED = True
 
 
 class TestingConfig(Config):
@@ -28,3 +80,10 @@ class TestingConfig(Config):
     MONGO_DB_HOST = ''
     REDIS_HOST = ''
     REDIS_PORT = ''
+    BCRYPT_ROUNDS = 4
+    PASSWORD_HASHER_WORKERS = 0
+    RESPONSE_CACHE_EVENT_TTL = 0
+    RESPONSE_CACHE_EVENT_LIST_TTL = 0
+    RESPONSE_CACHE_USER_TTL = 0
+    RATE_LIMIT_ENABLED = False
+    BACKGROUND_THREADS_ENABLED = False
@@ -0,0 +1,194 @@
+import unittest
+import asyncio
+import os
+import time
+
+from unittest import mock
+
+from api.asgi import create_asgi_app
+from api.asgi.app import build_environ
+from api.cache.denylist import TOKEN_DENYLIST_KEY
+from api.resources.constants import HttpStatusCode, Routes
+from config import TestingConfig
+from tests.utils import CustomAssertions, create_event, create_token, create_user
+
+os.environ['FLASK_ENV'] = 'testing'
+
+
+def call(asgi_app, scope, body=b''):
+    """
+    This function sends one message with the body to the ASGI app and returns the messages sent back.
+    """
+
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+
+    return messages
+
+
+class TestAsgiMethods(unittest.TestCase, CustomAssertions):
+    def setUp(self):
+        self.asgi_app = create_asgi_app()
+        self.app = self.asgi_app.app
+
+        self.user = create_user(self.app)
+        self.event = create_event(self.app, str(self.user['_id']))
+
+    def tearDown(self):
+        pass
+
+    def test_build_environ(self):
+        # Arrange
+        scope = {
+            'type': 'http',
+            'http_version': '1.1',
+            'method': 'POST',
+            'path': '/api/v1/events',
+            'query_string': b'limit=1',
+            'headers': [(b'content-type', b'application/json'), (b'access-token', b'foo'),
+                        (b'content-length', b'99')],
+            'server': ('mangia.club', 443),
+            'scheme': 'https'
+        }
+
+        # Act
+        environ = build_environ(scope, b'{}')
+
+        # Assert
+        self.assertEqual(environ['PATH_INFO'], '/api/v1/events')
+        self.assertEqual(environ['QUERY_STRING'], 'limit=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'application/json')
+        self.assertEqual(environ['CONTENT_LENGTH'], '2')
+        self.assertEqual(environ['HTTP_ACCESS_TOKEN'], 'foo')
+        self.assertEqual(environ['wsgi.url_scheme'], 'https')
+        self.assertEqual(environ['wsgi.input'].read(), b'{}')
+
+    def test_get_event_is_served_by_async_view(self):
+        with self.app.test_client() as client:
+            # Arrange
+            url = f'{Routes.EVENTS_V1}/{str(self.event["_id"])}'
+
+            # Act
+            with mock.patch.object(self.app, 'mongo') as mongo:
+                response = client.get(url)
+
+            # Assert
+            mongo.db.events.find_one.assert_not_called()
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual(response.json['data']['name'], self.event['name'])
+
+    def test_login_is_served_by_async_view(self):
+        with self.app.test_client() as client:
+            # Act
+            with mock.patch.object(self.app, 'mongo') as mongo:
+                response = client.post(Routes.LOGIN_V1, json={'email': 'foo@foo.com', 'password': 'foo'})
+
+            # Assert
+            mongo.db.users.find_one.assert_not_called()
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_201_CREATED)
+            self.app.async_redis.setex.assert_awaited_once()
+
+    def test_search_events_is_served_by_async_view(self):
+        with self.app.test_client() as client:
+            # Act
+            with mock.patch.object(self.app, 'mongo') as mongo:
+                response = client.get(f'{Routes.EVENTS_SEARCH_V1}?cuisine=Japanese')
+
+            # Assert
+            mongo.db.events.find.assert_not_called()
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual([event['name'] for event in response.json['data']], [self.event['name']])
+
+    def test_forwarded_for_handled_the_same_by_async_views_and_worker_threads(self):
+        # Arrange
+        with mock.patch.object(TestingConfig, 'PROXY_FIX_X_FOR', 1):
+            app = create_asgi_app().app
+
+        app.config['RATE_LIMIT_ENABLED'] = True
+        app.redis.eval.return_value = 0
+
+        headers = {'X-Forwarded-For': '203.0.113.7, 10.0.0.1'}
+
+        with app.test_client() as client:
+            # Act
+            client.post(Routes.LOGIN_V1, json={'email': 'foo@foo.com', 'password': 'foo'}, headers=headers)
+            client.post(Routes.USERS_V1, json={'email': 'foo@foo.com'}, headers=headers)
+
+        # Assert
+        ip_keys = [call[0][2] for call in app.redis.eval.call_args_list]
+
+        self.assertEqual(ip_keys, ['rate-limit|login|ip|10.0.0.1', 'rate-limit|registration|ip|10.0.0.1'])
+
+    def test_async_token_required_session_revoked(self):
+        with self.app.test_client() as client:
+            # Arrange
+            token = create_token(self.user, 60, self.app.config['SECRET_KEY'], sid='foo')
+
+            self.app.token_denylist.add('foo')
+            self.app.redis.zmscore.return_value = [time.time() + 60]
+
+            # Act
+            response = client.get(Routes.STATS_V1, headers={'Access-Token': token})
+
+            # Assert
+            self.assert_response(response, b'[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+            self.app.async_redis.zmscore.assert_awaited_once_with(TOKEN_DENYLIST_KEY, ['foo'])
+            self.app.async_redis.get.assert_not_called()
+
+    def test_streamed_response_is_sent_in_chunks(self):
+        # Arrange
+        self.app.config['EXPORT_BATCH_SIZE'] = 1
+        create_event(self.app, str(self.user['_id']))
+
+        token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+        self.app.redis.get.return_value = token
+
+        scope = {
+            'type': 'http',
+            'http_version': '1.1',
+            'method': 'GET',
+            'path': Routes.EVENTS_EXPORT_V1,
+            'query_string': b'',
+            'headers': [(b'access-token', token.encode('utf-8'))]
+        }
+
+        # Act
+        messages = call(self.asgi_app, scope)
+
+        # Assert
+        bodies = [message for message in messages[1:] if message.get('body')]
+
+        self.assertEqual(messages[0]['status'], HttpStatusCode.HTTP_200_OK)
+        self.assertEqual(len(bodies), 2)
+        self.assertFalse(messages[-1].get('more_body', False))
+
+    def test_lifespan_shutdown_closes_clients(self):
+        # Arrange
+        self.app.async_mongo = mock.Mock()
+        received = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+        messages = []
+
+        async def receive():
+            return next(received)
+
+        async def send(message):
+            messages.append(message)
+
+        # Act
+        asyncio.run(self.asgi_app({'type': 'lifespan'}, receive, send))
+
+        # Assert
+        self.assertEqual([message['type'] for message in messages],
+                         ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+        self.app.async_mongo.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,18 @@
 import unittest
 import os
+import time
 import jwt
 
 from unittest import mock
-from flask.json import jsonify
-from datetime import datetime
-from datetime import timedelta
+from redis import RedisError
 
-from api import create_app
+from api.cache.denylist import TOKEN_DENYLIST_CHANNEL
+from api.cache.session import SESSION_INVALIDATION_CHANNEL
+from api.passwords.hasher import PasswordHasher
 from api.resources.constants import HttpStatusCode, Routes
+from api.resources.ratelimit import SLIDING_WINDOW_SCRIPT
 
-from tests.utils import CustomAssertions, create_token, create_user
+from tests.utils import create_app, CustomAssertions, create_token, create_user
 
 os.environ['FLASK_ENV'] = 'testing'
 
@@ -58,35 +60,140 @@ class TestLoginMethods(unittest.TestCase, CustomAssertions):
             # Assert
             self.assert_response(response, b'[HTTP_401_UNAUTHORIZED]', HttpStatusCode.HTTP_401_UNAUTHORIZED)
 
-    @mock.patch('api.resources.auth.datetime')
-    def test_post_login_successful(self, datetime_mock):
+    def test_post_login_rehashes_password(self):
+        with self.app.test_client() as client:
+            # Act
+            client.post(Routes.LOGIN_V1, json={'email': 'foo@foo.com', 'password': 'foo'})
+
+            # Assert
+            user = self.app.mongo.db.users.find_one({'email': 'foo@foo.com'})
+
+            self.assertFalse(self.app.password_hasher.needs_rehash(user['hashed_password']))
+            self.assertTrue(self.app.password_hasher.check('foo', user['hashed_password']))
+
+    def test_post_login_rehashes_legacy_password(self):
         with self.app.test_client() as client:
             # Arrange
+            self.app.mongo.db.users.update_one({'email': 'foo@foo.com'},
+                                               {'$set': {'hashed_password': b'5f4dcc3b5aa765d61d8327deb882cf99'}})
+
+            # Act
+            with mock.patch('api.passwords.hasher.check_password', return_value=True):
+                response = client.post(Routes.LOGIN_V1, json={'email': 'foo@foo.com', 'password': 'foo'})
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_201_CREATED)
+
             user = self.app.mongo.db.users.find_one({'email': 'foo@foo.com'})
 
-            datetime_mock.utcnow = mock.Mock(return_value=datetime(1901, 12, 21))
+            self.assertTrue(self.app.password_hasher.check('foo', user['hashed_password']))
 
-            expires_in = timedelta(days=60)
+    def test_post_login_password_hasher_busy(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.password_hasher = PasswordHasher(rounds=4, workers=0, max_pending=1)
+            self.app.password_hasher._pending.acquire()
 
-            expected_payload = {
-                'exp': datetime_mock.utcnow.return_value + expires_in,
-                'iat': datetime_mock.utcnow.return_value,
-                'sub': f'auth|{str(user["_id"])}',
-                'email': user['email'],
-                'phone:': user['phone']
-            }
+            # Act
+            response = client.post(Routes.LOGIN_V1, json={'email': 'foo@foo.com', 'password': 'foo'})
 
-            # TODO: Consider using create_token from utils. This is an edge case because of the mocked datetime
-            expected_token = jwt.encode(expected_payload, self.app.config['SECRET_KEY'], algorithm='HS256').decode(
-                'utf-8')
+            # Assert
+            self.assert_response(response, b'[HTTP_503_SERVICE_UNAVAILABLE]',
+                                 HttpStatusCode.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_post_login_successful(self):
+        with self.app.test_client() as client:
+            # Arrange
+            user = self.app.mongo.db.users.find_one({'email': 'foo@foo.com'})
 
             # Act
             response = client.post(Routes.LOGIN_V1, json={'email': 'foo@foo.com ', 'password': '  foo  '})
 
             # Assert
-            self.app.redis.setex.assert_called_with(expected_payload['sub'], int(expires_in.total_seconds()),
-                                                    expected_token)
-            self.assert_response(response, jsonify({'token': expected_token}).data, HttpStatusCode.HTTP_201_CREATED)
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_201_CREATED)
+            self.assertEqual(response.json['expires_in'], self.app.config['ACCESS_TOKEN_TTL'])
+
+            access = jwt.decode(response.json['token'], self.app.config['SECRET_KEY'], algorithms=['HS256'])
+            refresh = jwt.decode(response.json['refresh_token'], self.app.config['SECRET_KEY'], algorithms=['HS256'])
+
+            self.assertEqual(access['sub'], f'auth|{str(user["_id"])}')
+            self.assertEqual(access['email'], user['email'])
+            self.assertEqual(access['type'], 'access')
+            self.assertEqual(access['exp'] - access['iat'], self.app.config['ACCESS_TOKEN_TTL'])
+            self.assertEqual(refresh['type'], 'refresh')
+            self.assertEqual(refresh['exp'] - refresh['iat'], self.app.config['REFRESH_TOKEN_TTL'])
+            self.assertEqual(access['sid'], refresh['sid'])
+            self.assertNotEqual(access['jti'], refresh['jti'])
+
+            self.app.redis.setex.assert_called_with(f'auth|{str(user["_id"])}|{access["sid"]}',
+                                                    self.app.config['REFRESH_TOKEN_TTL'],
+                                                    response.json['refresh_token'])
+
+
+class TestRateLimitMethods(unittest.TestCase, CustomAssertions):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['RATE_LIMIT_ENABLED'] = True
+
+        create_user(self.app)
+
+    def tearDown(self):
+        pass
+
+    def test_post_login_rate_limited(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.redis.eval.return_value = 1500
+            self.app.password_hasher = mock.Mock()
+
+            # Act
+            response = client.post(Routes.LOGIN_V1, json={'email': 'foo@foo.com', 'password': 'foo'})
+
+            # Assert
+            self.assert_response(response, b'[HTTP_429_TOO_MANY_REQUESTS]', HttpStatusCode.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(response.headers['Retry-After'], '2')
+            self.app.password_hasher.check.assert_not_called()
+
+    def test_post_login_rate_limited_per_ip_and_email(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.redis.eval.return_value = 0
+
+            # Act
+            response = client.post(Routes.LOGIN_V1, json={'email': ' Foo@Foo.com', 'password': 'not_foo'})
+
+            # Assert
+            self.assert_response(response, b'[HTTP_404_NOT_FOUND]', HttpStatusCode.HTTP_404_NOT_FOUND)
+
+            script, key_count, ip_key, email_key, _, _, *windows = self.app.redis.eval.call_args[0]
+
+            self.assertEqual(script, SLIDING_WINDOW_SCRIPT)
+            self.assertEqual(key_count, 2)
+            self.assertEqual(ip_key, 'rate-limit|login|ip|127.0.0.1')
+            self.assertEqual(email_key, 'rate-limit|login|email|foo@foo.com')
+            self.assertEqual(windows, [20, 60000, 5, 60000])
+
+    def test_post_login_without_email_rate_limited_per_ip(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.redis.eval.return_value = 0
+
+            # Act
+            client.post(Routes.LOGIN_V1, json={'password': 'foo'})
+
+            # Assert
+            self.assertEqual(self.app.redis.eval.call_args[0][1:3], (1, 'rate-limit|login|ip|127.0.0.1'))
+
+    def test_post_login_not_limited_without_redis(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.redis.eval.side_effect = RedisError('Connection refused')
+
+            # Act
+            response = client.post(Routes.LOGIN_V1, json={'email': 'foo@foo.com', 'password': 'not_foo'})
+
+            # Assert
+            self.assert_response(response, b'[HTTP_401_UNAUTHORIZED]', HttpStatusCode.HTTP_401_UNAUTHORIZED)
 
 
 class TestLogoutMethods(unittest.TestCase, CustomAssertions):
@@ -113,15 +220,204 @@ class TestLogoutMethods(unittest.TestCase, CustomAssertions):
 
             user_id = str(user["_id"])
 
-            token = create_token(user, 60, self.app.config['SECRET_KEY'])
+            token = create_token(user, 60, self.app.config['SECRET_KEY'], sid='foo')
             
             # Act
             response = client.delete(Routes.LOGOUT_V1, headers={ 'Access-Token': token })
 
             # Assert
-            self.app.redis.delete.assert_called_with(f'auth|{user_id}')
+            self.app.redis.delete.assert_called_with(f'auth|{user_id}|foo')
+            claims = jwt.decode(token, self.app.config['SECRET_KEY'], algorithms=['HS256'])
+            revoked = self.app.redis.pipeline.return_value.zadd.call_args[0][1]
+
+            self.assertEqual(revoked[claims['jti']], claims['exp'])
+            self.assertLessEqual(revoked['foo'], time.time() + self.app.config['ACCESS_TOKEN_TTL'])
+            self.assertEqual(self.app.redis.pipeline.return_value.publish.call_args[0][0], TOKEN_DENYLIST_CHANNEL)
+            self.assertTrue(self.app.token_denylist.might_contain(claims['jti']))
+            self.assertTrue(self.app.token_denylist.might_contain('foo'))
+            self.app.redis.publish.assert_called_with(SESSION_INVALIDATION_CHANNEL, f'auth|{user_id}')
             self.assert_response(response, b'', HttpStatusCode.HTTP_204_NO_CONTENT)
 
+    def test_delete_logout_token_is_rejected_afterwards(self):
+        with self.app.test_client() as client:
+            # Arrange
+            user = self.app.mongo.db.users.find_one({'email': 'foo@foo.com'})
+            token = create_token(user, 60, self.app.config['SECRET_KEY'])
+
+            client.delete(Routes.LOGOUT_V1, headers={'Access-Token': token})
+
+            self.app.redis.zmscore.return_value = [time.time() + 60, time.time() + 60]
+
+            # Act
+            response = client.delete(Routes.LOGOUT_V1, headers={'Access-Token': token})
+
+            # Assert
+            self.assert_response(response, b'[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    def test_delete_logout_token_expired(self):
+        with self.app.test_client() as client:
+            # Arrange
+            user = self.app.mongo.db.users.find_one({'email': 'foo@foo.com'})
+            token = create_token(user, -1, self.app.config['SECRET_KEY'])
+
+            # Act
+            response = client.delete(Routes.LOGOUT_V1, headers={'Access-Token': token})
+
+            # Assert
+            self.assert_response(response, b'[TOKEN_EXPIRED]', HttpStatusCode.HTTP_401_UNAUTHORIZED)
+            self.app.redis.delete.assert_not_called()
+
+    def test_delete_logout_token_malformed(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.delete(Routes.LOGOUT_V1, headers={'Access-Token': 'foo'})
+
+            # Assert
+            self.assert_response(response, b'[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+
+class TestRefreshMethods(unittest.TestCase, CustomAssertions):
+    def setUp(self):
+        self.app = create_app()
+
+        self.user = create_user(self.app)
+        self.refresh_token = create_token(self.user, 60, self.app.config['SECRET_KEY'], sid='foo',
+                                          token_type='refresh')
+
+    def tearDown(self):
+        pass
+
+    def test_post_refresh_successful(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.redis.get.return_value = self.refresh_token
+
+            # Act
+            response = client.post(Routes.REFRESH_V1, json={'refresh_token': self.refresh_token})
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_201_CREATED)
+            self.app.redis.get.assert_called_with(f'auth|{str(self.user["_id"])}|foo')
+
+            access = jwt.decode(response.json['token'], self.app.config['SECRET_KEY'], algorithms=['HS256'])
+
+            self.assertEqual(access['type'], 'access')
+            self.assertEqual(access['sid'], 'foo')
+
+    def test_post_refresh_session_is_cached(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.redis.get.return_value = self.refresh_token
+            client.post(Routes.REFRESH_V1, json={'refresh_token': self.refresh_token})
+            self.app.redis.get.reset_mock()
+
+            # Act
+            with mock.patch.object(self.app, 'mongo') as mongo:
+                response = client.post(Routes.REFRESH_V1, json={'refresh_token': self.refresh_token})
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_201_CREATED)
+            self.app.redis.get.assert_not_called()
+            mongo.db.users.find_one.assert_not_called()
+            self.assertEqual(self.app.session_cache.stats()['saved_mongo_calls'], 1)
+
+    def test_post_refresh_session_ended(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.redis.get.return_value = None
+
+            # Act
+            response = client.post(Routes.REFRESH_V1, json={'refresh_token': self.refresh_token})
+
+            # Assert
+            self.assert_response(response, b'[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    def test_post_refresh_session_revoked(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.token_denylist.add('foo')
+            self.app.redis.zmscore.return_value = [time.time() + 60]
+
+            # Act
+            response = client.post(Routes.REFRESH_V1, json={'refresh_token': self.refresh_token})
+
+            # Assert
+            self.assert_response(response, b'[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+            self.app.redis.get.assert_not_called()
+
+    def test_post_refresh_token_expired(self):
+        with self.app.test_client() as client:
+            # Arrange
+            refresh_token = create_token(self.user, -1, self.app.config['SECRET_KEY'], sid='foo',
+                                         token_type='refresh')
+            self.app.redis.get.return_value = refresh_token
+
+            # Act
+            response = client.post(Routes.REFRESH_V1, json={'refresh_token': refresh_token})
+
+            # Assert
+            self.assert_response(response, b'[TOKEN_EXPIRED]', HttpStatusCode.HTTP_401_UNAUTHORIZED)
+
+    def test_post_refresh_with_access_token(self):
+        with self.app.test_client() as client:
+            # Arrange
+            token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+
+            # Act
+            response = client.post(Routes.REFRESH_V1, json={'refresh_token': token})
+
+            # Assert
+            self.assert_response(response, b'[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+
+class TestTokenRequiredMethods(unittest.TestCase, CustomAssertions):
+    def setUp(self):
+        self.app = create_app()
+
+        self.user = create_user(self.app)
+
+    def tearDown(self):
+        pass
+
+    def test_token_required_without_round_trip(self):
+        with self.app.test_client() as client:
+            # Arrange
+            token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+
+            # Act
+            response = client.get(Routes.STATS_V1, headers={'Access-Token': token})
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual(response.json['data']['token_denylist']['lookups'], 2)
+            self.app.redis.get.assert_not_called()
+            self.app.redis.zmscore.assert_not_called()
+
+    def test_token_required_session_revoked(self):
+        with self.app.test_client() as client:
+            # Arrange
+            token = create_token(self.user, 60, self.app.config['SECRET_KEY'], sid='foo')
+
+            self.app.token_denylist.add('foo')
+            self.app.redis.zmscore.return_value = [time.time() + 60]
+
+            # Act
+            response = client.get(Routes.STATS_V1, headers={'Access-Token': token})
+
+            # Assert
+            self.assert_response(response, b'[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    def test_token_required_refresh_token_rejected(self):
+        with self.app.test_client() as client:
+            # Arrange
+            token = create_token(self.user, 60, self.app.config['SECRET_KEY'], token_type='refresh')
+
+            # Act
+            response = client.get(Routes.STATS_V1, headers={'Access-Token': token})
+
+            # Assert
+            self.assert_response(response, b'[INVALID_TOKEN]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
 
 if __name__ == '__main__':
     unittest.main()
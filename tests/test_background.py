@@ -0,0 +1,60 @@
+import unittest
+import os
+import threading
+
+from api.background import start_background_thread
+from tests.utils import create_app
+
+os.environ['FLASK_ENV'] = 'testing'
+
+
+def thread_names():
+    return [thread.name for thread in threading.enumerate()]
+
+
+class TestBackgroundThreadMethods(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.stop = threading.Event()
+
+    def tearDown(self):
+        self.stop.set()
+
+    def test_background_thread_disabled(self):
+        # Act
+        start_background_thread(self.app, self.stop.wait, 'foo-disabled')
+
+        # Assert
+        self.assertNotIn('foo-disabled', thread_names())
+        self.assertEqual(self.app.background_threads, [])
+
+    def test_background_thread_started(self):
+        # Arrange
+        self.app.config['BACKGROUND_THREADS_ENABLED'] = True
+
+        # Act
+        start_background_thread(self.app, self.stop.wait, 'foo-started')
+
+        # Assert
+        self.assertIn('foo-started', thread_names())
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires os.fork')
+    def test_background_thread_started_again_after_fork(self):
+        # Arrange
+        self.app.config['BACKGROUND_THREADS_ENABLED'] = True
+        start_background_thread(self.app, self.stop.wait, 'foo-forked')
+
+        # Act
+        pid = os.fork()
+
+        if pid == 0:
+            os._exit(0 if 'foo-forked' in thread_names() else 1)
+
+        _, status = os.waitpid(pid, 0)
+
+        # Assert
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
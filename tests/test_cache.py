@@ -0,0 +1,251 @@
+import asyncio
+import unittest
+import os
+import time
+
+from unittest import mock
+
+from api.cache.response import INVALIDATE_SCRIPT
+from api.cache.denylist import TOKEN_DENYLIST_KEY, BloomFilter, async_is_revoked, is_revoked, load_token_denylist
+from api.cache.session import SessionCache
+from api.resources.constants import HttpStatusCode, Routes
+from tests.utils import create_app, CustomAssertions, create_event, create_token, create_user
+
+os.environ['FLASK_ENV'] = 'testing'
+
+
+class TestTokenDenylistMethods(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+
+    def tearDown(self):
+        pass
+
+    def test_bloom_filter_contains_added_values(self):
+        # Arrange
+        bloom_filter = BloomFilter(1000, 0.01)
+
+        # Act
+        for i in range(1000):
+            bloom_filter.add(str(i))
+
+        # Assert
+        self.assertTrue(all(bloom_filter.might_contain(str(i)) for i in range(1000)))
+        self.assertLess(sum(bloom_filter.might_contain(f'foo{i}') for i in range(10000)), 300)
+
+    def test_token_not_revoked_without_round_trip(self):
+        # Act
+        revoked = is_revoked(self.app, 'foo', 'bar')
+
+        # Assert
+        self.assertFalse(revoked)
+        self.app.redis.zmscore.assert_not_called()
+        self.assertEqual(self.app.token_denylist.stats()['lookups'], 2)
+
+    def test_token_revoked_is_confirmed_in_redis(self):
+        # Arrange
+        self.app.token_denylist.add('foo')
+        self.app.redis.zmscore.return_value = [time.time() + 60]
+
+        # Act
+        revoked = is_revoked(self.app, 'foo', 'bar')
+
+        # Assert
+        self.assertTrue(revoked)
+        self.app.redis.zmscore.assert_called_once_with(TOKEN_DENYLIST_KEY, ['foo'])
+        self.assertEqual(self.app.token_denylist.stats()['hits'], 1)
+
+    def test_token_revoked_is_confirmed_in_async_redis(self):
+        # Arrange
+        self.app.token_denylist.add('foo')
+        self.app.async_redis = mock.AsyncMock()
+        self.app.async_redis.zmscore.return_value = [time.time() + 60]
+
+        # Act
+        revoked = asyncio.run(async_is_revoked(self.app, 'foo', 'bar'))
+
+        # Assert
+        self.assertTrue(revoked)
+        self.app.async_redis.zmscore.assert_awaited_once_with(TOKEN_DENYLIST_KEY, ['foo'])
+        self.app.redis.zmscore.assert_not_called()
+
+    def test_token_not_revoked_once_expired(self):
+        # Arrange
+        self.app.token_denylist.add('foo')
+        self.app.redis.zmscore.return_value = [time.time() - 1]
+
+        # Act
+        revoked = is_revoked(self.app, 'foo')
+
+        # Assert
+        self.assertFalse(revoked)
+        self.assertEqual(self.app.token_denylist.stats()['checks'], 1)
+
+    def test_load_token_denylist(self):
+        # Arrange
+        self.app.token_denylist.add('foo')
+        self.app.redis.zrangebyscore.return_value = [b'1', b'2']
+
+        # Act
+        load_token_denylist(self.app)
+
+        # Assert
+        self.assertTrue(self.app.token_denylist.might_contain('1'))
+        self.assertTrue(self.app.token_denylist.might_contain('2'))
+        self.assertFalse(self.app.token_denylist.might_contain('foo'))
+        self.assertEqual(self.app.token_denylist.stats()['loads'], 1)
+        self.assertEqual(self.app.redis.zrangebyscore.call_args[0][0], TOKEN_DENYLIST_KEY)
+
+
+class TestSessionCacheMethods(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.cache = SessionCache(max_size=2, ttl=30, clock=lambda: self.now)
+
+    def tearDown(self):
+        pass
+
+    def test_session_cache_hit(self):
+        # Arrange
+        self.cache.set('auth|1', 'foo', {'_id': '1'})
+
+        # Act
+        user = self.cache.get('auth|1', 'foo')
+
+        # Assert
+        self.assertEqual(user, {'_id': '1'})
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_session_cache_miss_for_other_session(self):
+        # Arrange
+        self.cache.set('auth|1', 'foo', {'_id': '1'})
+
+        # Act
+        user = self.cache.get('auth|1', 'bar')
+
+        # Assert
+        self.assertIsNone(user)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_session_cache_expires(self):
+        # Arrange
+        self.cache.set('auth|1', 'foo', {'_id': '1'})
+        self.now = 30.0
+
+        # Act / Assert
+        self.assertIsNone(self.cache.get('auth|1', 'foo'))
+
+    def test_session_cache_evicts_least_recently_used(self):
+        # Arrange
+        self.cache.set('auth|1', 'foo', {'_id': '1'})
+        self.cache.set('auth|2', 'foo', {'_id': '2'})
+        self.cache.get('auth|1', 'foo')
+
+        # Act
+        self.cache.set('auth|3', 'foo', {'_id': '3'})
+
+        # Assert
+        self.assertIsNotNone(self.cache.get('auth|1', 'foo'))
+        self.assertIsNone(self.cache.get('auth|2', 'foo'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_session_cache_invalidate(self):
+        # Arrange
+        self.cache.set('auth|1', 'foo', {'_id': '1'})
+        self.cache.set('auth|1', 'bar', {'_id': '1'})
+
+        # Act
+        self.cache.invalidate('auth|1')
+
+        # Assert
+        self.assertIsNone(self.cache.get('auth|1', 'foo'))
+        self.assertIsNone(self.cache.get('auth|1', 'bar'))
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+
+class TestResponseCacheMethods(unittest.TestCase, CustomAssertions):
+    def setUp(self):
+        self.app = create_app()
+
+        self.user = create_user(self.app)
+        self.event = create_event(self.app, str(self.user['_id']))
+
+        self.url = f'{Routes.EVENTS_V1}/{str(self.event["_id"])}'
+
+    def tearDown(self):
+        pass
+
+    def test_get_response_has_etag(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(self.url)
+
+            # Assert
+            self.assertIsNotNone(response.headers.get('ETag'))
+
+    def test_get_response_not_modified(self):
+        with self.app.test_client() as client:
+            # Arrange
+            etag = client.get(self.url).headers['ETag']
+
+            # Act
+            response = client.get(self.url, headers={'If-None-Match': etag})
+
+            # Assert
+            self.assert_response(response, b'', 304)
+
+    def test_get_response_is_cached(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.config['RESPONSE_CACHE_EVENT_TTL'] = 60
+            self.app.redis.hgetall.return_value = {}
+
+            # Act
+            response = client.get(self.url)
+
+            # Assert
+            pipeline = self.app.redis.pipeline.return_value
+
+            pipeline.hset.assert_called_with(f'response-cache|{self.url}?', mapping={
+                'body': response.data,
+                'etag': response.headers['ETag'].strip('"'),
+                'mimetype': 'application/json'
+            })
+            pipeline.expire.assert_any_call(f'response-cache|{self.url}?', 60)
+            pipeline.sadd.assert_called_with(f'response-cache-keys|event|{str(self.event["_id"])}',
+                                             f'response-cache|{self.url}?')
+
+    def test_get_response_from_cache(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.config['RESPONSE_CACHE_EVENT_TTL'] = 60
+            self.app.redis.hgetall.return_value = {b'body': b'{"data": "cached"}', b'etag': b'foo',
+                                                   b'mimetype': b'application/json'}
+
+            self.app.mongo.db.events.delete_many({})
+
+            # Act
+            response = client.get(self.url)
+
+            # Assert
+            self.assert_response(response, b'{"data": "cached"}', HttpStatusCode.HTTP_200_OK)
+            self.assertEqual(response.headers['ETag'], '"foo"')
+
+    def test_put_event_invalidates_responses(self):
+        with self.app.test_client() as client:
+            # Arrange
+            token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+
+            self.app.redis.get.return_value = token
+
+            # Act
+            client.put(self.url, json={'name': 'bar'}, headers={'Access-Token': token})
+
+            # Assert
+            self.app.redis.eval.assert_called_with(INVALIDATE_SCRIPT, 2,
+                                                   f'response-cache-keys|event|{str(self.event["_id"])}',
+                                                   'response-cache-keys|events')
+
+
+if __name__ == '__main__':
+    unittest.main()
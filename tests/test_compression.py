@@ -0,0 +1,124 @@
+import unittest
+import os
+import gzip
+import json
+import zlib
+
+from api.compression.response import brotli
+from api.resources.constants import HttpStatusCode, Routes
+from tests.utils import create_app, create_event, create_token, create_user
+
+os.environ['FLASK_ENV'] = 'testing'
+
+
+class TestCompressionMethods(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+
+        self.user = create_user(self.app)
+
+        for _ in range(20):
+            create_event(self.app, str(self.user['_id']))
+
+    def tearDown(self):
+        pass
+
+    def test_list_is_compressed_with_gzip(self):
+        with self.app.test_client() as client:
+            # Arrange
+            expected = client.get(Routes.EVENTS_V1).data
+
+            # Act
+            response = client.get(Routes.EVENTS_V1, headers={'Accept-Encoding': 'gzip'})
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertIn('Accept-Encoding', response.headers['Vary'])
+            self.assertLess(len(response.data), len(expected))
+            self.assertEqual(gzip.decompress(response.data), expected)
+
+    @unittest.skipIf(brotli is None, 'brotli is not installed')
+    def test_list_is_compressed_with_brotli(self):
+        with self.app.test_client() as client:
+            # Arrange
+            expected = client.get(Routes.EVENTS_V1).data
+
+            # Act
+            response = client.get(Routes.EVENTS_V1, headers={'Accept-Encoding': 'gzip, deflate, br'})
+
+            # Assert
+            self.assertEqual(response.headers['Content-Encoding'], 'br')
+            self.assertEqual(brotli.decompress(response.data), expected)
+
+    def test_response_is_not_compressed_without_accept_encoding(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(Routes.EVENTS_V1)
+
+            # Assert
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertIn('Accept-Encoding', response.headers['Vary'])
+            self.assertEqual(len(response.json['data']), 20)
+
+    def test_small_response_is_not_compressed(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(f'{Routes.EVENTS_V1}?limit=1&fields=name', headers={'Accept-Encoding': 'gzip'})
+
+            # Assert
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertEqual(len(response.json['data']), 1)
+
+    def test_streamed_response_is_compressed(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.config['EXPORT_BATCH_SIZE'] = 5
+            token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+
+            # Act
+            response = client.get(Routes.EVENTS_EXPORT_V1, headers={'Access-Token': token, 'Accept-Encoding': 'gzip'})
+
+            # Assert
+            lines = gzip.decompress(response.data).splitlines()
+
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertNotIn('Content-Length', response.headers)
+            self.assertEqual(len(lines), 20)
+            self.assertEqual(json.loads(lines[0])['name'], 'foo')
+
+    def test_streamed_chunks_are_flushed(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.config['EXPORT_BATCH_SIZE'] = 5
+            token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+
+            # Act
+            response = client.get(Routes.EVENTS_EXPORT_V1, headers={'Access-Token': token, 'Accept-Encoding': 'gzip'},
+                                  buffered=False)
+
+            # Assert
+            decompressor = zlib.decompressobj(31)
+            first_chunk = decompressor.decompress(next(response.response))
+
+            self.assertEqual(len(first_chunk.splitlines()), 5)
+
+            response.close()
+
+    def test_compressed_response_has_weak_etag(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.config['RESPONSE_CACHE_EVENT_LIST_TTL'] = 10
+            self.app.redis.hgetall.return_value = {}
+
+            response = client.get(Routes.EVENTS_V1, headers={'Accept-Encoding': 'gzip'})
+            etag, weak = response.get_etag()
+
+            # Act
+            response = client.get(Routes.EVENTS_V1, headers={'Accept-Encoding': 'gzip',
+                                                             'If-None-Match': f'W/"{etag}"'})
+
+            # Assert
+            self.assertTrue(weak)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
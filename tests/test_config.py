@@ -5,9 +5,11 @@ import os
 import mongomock
 
 from api import create_app
-from config import DevelopmentConfig, ProductionConfig, TestingConfig
+from config import Config, DevelopmentConfig, ProductionConfig, TestingConfig
 
 
+# The apps are only created to check their config, so they do not connect to MongoDb and Redis in background
+@mock.patch.object(Config, 'BACKGROUND_THREADS_ENABLED', False)
 class TestConfigMethods(unittest.TestCase):
     def test_create_app_config_is_production(self):
         # Arrange
@@ -0,0 +1,139 @@
+import unittest
+import os
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from types import SimpleNamespace
+from unittest import mock
+from redis import ResponseError
+
+from api.counters.views import VIEW_COUNTS_KEY, VIEW_COUNTS_SNAPSHOT_PREFIX, VIEW_COUNTS_SNAPSHOTS_KEY, \
+    flush_view_counts
+from tests.utils import create_app, create_event, create_user
+
+os.environ['FLASK_ENV'] = 'testing'
+
+
+# mongomock does not support the write models of recent pymongo versions in bulk_write
+@mock.patch('mongomock.collection.Collection.bulk_write',
+            side_effect=lambda requests, ordered: SimpleNamespace(modified_count=len(requests)))
+class TestViewCounterMethods(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+
+        user = create_user(self.app)
+        self.event_ids = [str(create_event(self.app, str(user['_id']))['_id']) for _ in range(3)]
+
+        self.app.redis.set.return_value = True
+        self.app.redis.smembers.return_value = set()
+        self.app.redis.exists.return_value = 0
+
+    def tearDown(self):
+        pass
+
+    def test_flush_view_counts(self, bulk_write):
+        # Arrange
+        self.app.config['VIEW_COUNT_BATCH_SIZE'] = 2
+        self.app.redis.hgetall.return_value = {
+            self.event_ids[0].encode('utf-8'): b'3',
+            self.event_ids[1].encode('utf-8'): b'1',
+            self.event_ids[2].encode('utf-8'): b'2'
+        }
+
+        # Act
+        updated = flush_view_counts(self.app)
+
+        # Assert
+        snapshot = self.app.redis.rename.call_args[0][1]
+
+        self.assertEqual(updated, 3)
+        self.app.redis.rename.assert_called_once_with(VIEW_COUNTS_KEY, snapshot)
+        self.assertTrue(snapshot.startswith(f'{VIEW_COUNTS_SNAPSHOT_PREFIX}|'))
+        self.app.redis.sadd.assert_called_once_with(VIEW_COUNTS_SNAPSHOTS_KEY, snapshot)
+        self.app.redis.hgetall.assert_called_once_with(snapshot)
+
+        # One unordered bulk write per batch, removed from the snapshot once written
+        self.assertEqual(bulk_write.call_args_list, [
+            mock.call([UpdateOne({'_id': ObjectId(self.event_ids[0])}, {'$inc': {'view_count': 3}}),
+                       UpdateOne({'_id': ObjectId(self.event_ids[1])}, {'$inc': {'view_count': 1}})], ordered=False),
+            mock.call([UpdateOne({'_id': ObjectId(self.event_ids[2])}, {'$inc': {'view_count': 2}})], ordered=False)
+        ])
+        self.assertEqual(self.app.redis.hdel.call_args_list, [
+            mock.call(snapshot, self.event_ids[0], self.event_ids[1]),
+            mock.call(snapshot, self.event_ids[2])
+        ])
+        self.app.redis.pipeline.return_value.delete.assert_called_once_with(snapshot, f'{snapshot}|lease')
+        self.app.redis.pipeline.return_value.srem.assert_called_once_with(VIEW_COUNTS_SNAPSHOTS_KEY, snapshot)
+
+    def test_flush_view_counts_locked_by_other_worker(self, bulk_write):
+        # Arrange
+        self.app.redis.set.return_value = None
+        self.app.redis.hgetall.return_value = {self.event_ids[0].encode('utf-8'): b'3'}
+
+        # Act
+        updated = flush_view_counts(self.app)
+
+        # Assert
+        self.assertIsNone(updated)
+        bulk_write.assert_not_called()
+        self.app.redis.rename.assert_not_called()
+
+    def test_flush_view_counts_without_views(self, bulk_write):
+        # Arrange
+        self.app.redis.rename.side_effect = ResponseError('no such key')
+
+        # Act
+        updated = flush_view_counts(self.app)
+
+        # Assert
+        self.assertEqual(updated, 0)
+        bulk_write.assert_not_called()
+        self.app.redis.hgetall.assert_not_called()
+        self.app.redis.pipeline.return_value.srem.assert_called_once()
+
+    def test_flush_view_counts_recovers_stopped_snapshot(self, bulk_write):
+        # Arrange
+        snapshot = f'{VIEW_COUNTS_SNAPSHOT_PREFIX}|foo'
+
+        self.app.redis.smembers.return_value = {snapshot.encode('utf-8')}
+        self.app.redis.rename.side_effect = ResponseError('no such key')
+        self.app.redis.hgetall.return_value = {self.event_ids[0].encode('utf-8'): b'3'}
+
+        # Act
+        updated = flush_view_counts(self.app)
+
+        # Assert
+        self.assertEqual(updated, 1)
+        self.app.redis.exists.assert_called_once_with(f'{snapshot}|lease')
+        self.app.redis.hgetall.assert_called_once_with(snapshot)
+        bulk_write.assert_called_once_with(
+            [UpdateOne({'_id': ObjectId(self.event_ids[0])}, {'$inc': {'view_count': 3}})], ordered=False)
+
+    def test_flush_view_counts_skips_leased_snapshot(self, bulk_write):
+        # Arrange
+        self.app.redis.smembers.return_value = {f'{VIEW_COUNTS_SNAPSHOT_PREFIX}|foo'.encode('utf-8')}
+        self.app.redis.exists.return_value = 1
+        self.app.redis.rename.side_effect = ResponseError('no such key')
+
+        # Act
+        updated = flush_view_counts(self.app)
+
+        # Assert
+        self.assertEqual(updated, 0)
+        bulk_write.assert_not_called()
+        self.app.redis.hgetall.assert_not_called()
+
+    def test_flush_view_counts_skips_invalid_ids(self, bulk_write):
+        # Arrange
+        self.app.redis.hgetall.return_value = {b'foo': b'1'}
+
+        # Act
+        updated = flush_view_counts(self.app)
+
+        # Assert
+        self.assertEqual(updated, 0)
+        bulk_write.assert_not_called()
+        self.app.redis.hdel.assert_called_once_with(self.app.redis.rename.call_args[0][1], 'foo')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,559 @@
+import unittest
+import os
+import threading
+
+import mongomock
+import redis
+from datetime import datetime
+from bson import ObjectId
+from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
+from types import SimpleNamespace
+from unittest import mock
+
+from api.db import _ensure_app_indexes, check_indexes_ready, db_cli, init_db
+from api.db.changes import apply_changes, compact_changes
+from api.db.clients import ConnectionPoolStats, ProcessLocalClient, _reset_after_fork, mongo_pool_stats, \
+    redis_pool_stats
+from api.db.dates import EVENT_DATE_FIELDS, convert_string_dates
+from api.db.indexes import collection_scan_stages, duplicate_emails, ensure_indexes, INDEXES, OBSOLETE_INDEXES, \
+    unique_email_index_exists
+from api.db.slow_queries import SlowQueryListener, query_shape
+from api.resources.constants import HttpStatusCode, Routes
+from tests.utils import create_app, create_token, create_user
+
+os.environ['FLASK_ENV'] = 'testing'
+
+
+class TestIndexesMethods(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+
+    def tearDown(self):
+        pass
+
+    def test_ensure_indexes_creates_all_indexes(self):
+        # Act
+        ensure_indexes(self.app.mongo.db)
+
+        # Assert
+        for collection, indexes in INDEXES.items():
+            index_names = self.app.mongo.db[collection].index_information().keys()
+
+            for index in indexes:
+                self.assertIn(index.document['name'], index_names)
+
+    def test_ensure_indexes_drops_obsolete_indexes(self):
+        # Arrange
+        self.app.mongo.db.events.create_index([('host_id', 1), ('start_datetime', 1)], name='host_id_start_datetime')
+
+        # Act
+        ensure_indexes(self.app.mongo.db)
+
+        # Assert
+        for collection, index_names in OBSOLETE_INDEXES.items():
+            existing_names = self.app.mongo.db[collection].index_information().keys()
+
+            for index_name in index_names:
+                self.assertNotIn(index_name, existing_names)
+
+    def test_ensure_indexes_with_duplicate_emails(self):
+        # Arrange
+        db = mongomock.MongoClient().db
+        db.users.insert_many([{'email': 'foo@foo.com'}, {'email': 'foo@foo.com'}])
+
+        # Act
+        failures = ensure_indexes(db)
+
+        # Assert
+        self.assertEqual(list(failures), ['users'])
+        self.assertFalse(unique_email_index_exists(db))
+
+        for collection in ('events', 'event_changes', 'user_changes'):
+            index_names = db[collection].index_information().keys()
+
+            for index in INDEXES[collection]:
+                self.assertIn(index.document['name'], index_names)
+
+    def test_ensure_indexes_email_is_unique(self):
+        # Arrange
+        self.app.mongo.db.users.insert_one({'email': 'foo@foo.com'})
+
+        # Act / Assert
+        with self.assertRaises(DuplicateKeyError):
+            self.app.mongo.db.users.insert_one({'email': 'foo@foo.com'})
+
+    def test_duplicate_emails_found(self):
+        # Arrange
+        self.app.mongo.db.users.drop_index('email_unique')
+        user_ids = self.app.mongo.db.users.insert_many([{'email': 'foo@foo.com'}, {'email': 'bar@bar.com'},
+                                                        {'email': 'foo@foo.com'}]).inserted_ids
+
+        # Act
+        duplicates = duplicate_emails(self.app.mongo.db)
+
+        # Assert
+        self.assertEqual(duplicates, [('foo@foo.com', [user_ids[0], user_ids[2]])])
+
+    def test_collection_scan_stages_found(self):
+        # Arrange
+        plan = {'stage': 'SORT', 'inputStage': {'stage': 'COLLSCAN', 'direction': 'forward'}}
+
+        # Act
+        stages = collection_scan_stages(plan)
+
+        # Assert
+        self.assertEqual(stages, [plan['inputStage']])
+
+    def test_collection_scan_stages_not_found(self):
+        # Arrange
+        plan = {'stage': 'OR', 'inputStages': [{'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}},
+                                               {'stage': 'IDHACK'}]}
+
+        # Act
+        stages = collection_scan_stages(plan)
+
+        # Assert
+        self.assertEqual(stages, [])
+
+
+class TestInitDbMethods(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['BACKGROUND_THREADS_ENABLED'] = True
+
+        self.blocked = threading.Event()
+
+    def tearDown(self):
+        self.blocked.set()
+
+    def ensure_indexes_in_child(self, parent_pid):
+        # The indexes are never created in the parent process, so only a thread started after the fork sets the event
+        def ensure_indexes(db):
+            if os.getpid() == parent_pid:
+                self.blocked.wait()
+
+            return {}
+
+        return ensure_indexes
+
+    def test_indexes_not_ready_with_duplicate_emails(self):
+        # Arrange
+        self.app.indexes_ready.clear()
+        self.app.mongo.db.users.drop_index('email_unique')
+        self.app.mongo.db.users.insert_many([{'email': 'foo@foo.com'}, {'email': 'foo@foo.com'}])
+
+        # Act
+        created = _ensure_app_indexes(self.app)
+
+        # Assert
+        self.assertFalse(created)
+        self.assertFalse(self.app.indexes_ready.is_set())
+
+    def test_indexes_created_without_background_threads(self):
+        # Arrange
+        self.app.config['BACKGROUND_THREADS_ENABLED'] = False
+
+        with mock.patch('api.db.ensure_indexes', return_value={}), \
+                mock.patch('api.db.unique_email_index_exists', return_value=True), \
+                mock.patch('api.db.ProcessLocalClient'):
+            # Act
+            init_db(self.app)
+
+        # Assert
+        self.assertTrue(self.app.indexes_ready.is_set())
+        self.assertEqual(self.app.background_threads, [])
+
+    def test_indexes_created_again_by_requests_without_background_threads(self):
+        # Arrange
+        self.app.config['BACKGROUND_THREADS_ENABLED'] = False
+
+        with mock.patch('api.db.ensure_indexes', return_value={}), \
+                mock.patch('api.db.unique_email_index_exists', side_effect=[False, True]), \
+                mock.patch('api.db.ProcessLocalClient'):
+            init_db(self.app)
+
+            not_ready = check_indexes_ready(self.app)
+            self.app.indexes_retry_at = 0
+
+            # Act
+            ready = check_indexes_ready(self.app)
+
+        # Assert
+        self.assertFalse(not_ready)
+        self.assertTrue(ready)
+        self.assertTrue(self.app.indexes_ready.is_set())
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires os.fork')
+    def test_indexes_are_created_again_after_fork(self):
+        # Arrange
+        with mock.patch('api.db.ensure_indexes', side_effect=self.ensure_indexes_in_child(os.getpid())), \
+                mock.patch('api.db.unique_email_index_exists', return_value=True), \
+                mock.patch('api.db.ProcessLocalClient'):
+            init_db(self.app)
+
+            # Act
+            pid = os.fork()
+
+            if pid == 0:
+                os._exit(0 if self.app.indexes_ready.wait(5) else 1)
+
+            _, status = os.waitpid(pid, 0)
+
+        # Assert
+        self.assertFalse(self.app.indexes_ready.is_set())
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
+
+class TestChangesMethods(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+
+        self.db = self.app.mongo.db
+
+    def tearDown(self):
+        pass
+
+    def test_apply_changes_sets_fields_and_appends_history(self):
+        # Arrange
+        event_id = self.db.events.insert_one({'name': 'foo'}).inserted_id
+
+        # Act
+        apply_changes(self.db.events, self.db.event_changes, 'event_id', event_id, {'name': 'bar'}, 'user')
+        apply_changes(self.db.events, self.db.event_changes, 'event_id', event_id, {'name': 'baz'}, 'user')
+
+        # Assert
+        event = self.db.events.find_one({'_id': event_id})
+        changes = list(self.db.event_changes.find({'event_id': event_id}).sort('version'))
+
+        self.assertEqual(event['name'], 'baz')
+        self.assertEqual(event['version'], 2)
+        self.assertEqual([change['fields']['name'] for change in changes], ['bar', 'baz'])
+
+    def test_apply_changes_document_not_found(self):
+        # Act
+        event = apply_changes(self.db.events, self.db.event_changes, 'event_id', ObjectId(), {'name': 'bar'}, 'user')
+
+        # Assert
+        self.assertIsNone(event)
+        self.assertEqual(self.db.event_changes.count_documents({}), 0)
+
+    def test_compact_changes(self):
+        # Arrange
+        event_id = self.db.events.insert_one({
+            'name': 'foo',
+            'changes': [
+                {'fields': {'name': 'bar', 'rating': '4'}, 'updated_by_user': 'user'},
+                {'fields': {'name': 'baz'}, 'updated_by_user': 'user'}
+            ]
+        }).inserted_id
+
+        # Act
+        compacted = compact_changes(self.db.events, self.db.event_changes, 'event_id')
+
+        # Assert
+        event = self.db.events.find_one({'_id': event_id})
+        changes = list(self.db.event_changes.find({'event_id': event_id}).sort('version'))
+
+        self.assertEqual(compacted, (1, []))
+        self.assertNotIn('changes', event)
+        self.assertEqual(event['name'], 'baz')
+        self.assertEqual(event['rating'], '4')
+        self.assertEqual(event['version'], 2)
+        self.assertEqual([change['version'] for change in changes], [1, 2])
+
+
+    def test_compact_changes_records_already_inserted(self):
+        # Arrange
+        ensure_indexes(self.db)
+
+        event_id = self.db.events.insert_one({
+            'name': 'foo',
+            'changes': [
+                {'fields': {'name': 'bar'}, 'updated_by_user': 'user'},
+                {'fields': {'name': 'baz'}, 'updated_by_user': 'user'}
+            ]
+        }).inserted_id
+
+        # An interrupted run inserted the first record without updating the event
+        self.db.event_changes.insert_one({'event_id': event_id, 'version': 1, 'fields': {'name': 'bar'}})
+
+        # Act
+        compacted = compact_changes(self.db.events, self.db.event_changes, 'event_id')
+
+        # Assert
+        changes = list(self.db.event_changes.find({'event_id': event_id}).sort('version'))
+
+        self.assertEqual(compacted, (1, []))
+        self.assertEqual(self.db.events.find_one({'_id': event_id})['name'], 'baz')
+        self.assertEqual([change['version'] for change in changes], [1, 2])
+
+    def test_compact_changes_unique_index_violated(self):
+        # Arrange
+        ensure_indexes(self.db)
+
+        self.db.users.insert_one({'email': 'bar@bar.com'})
+        user_id = self.db.users.insert_one({
+            'email': 'foo@foo.com',
+            'changes': [{'fields': {'email': 'bar@bar.com'}, 'updated_by_user': 'user'}]
+        }).inserted_id
+
+        # Act
+        compacted = compact_changes(self.db.users, self.db.user_changes, 'user_id')
+
+        # Assert
+        user = self.db.users.find_one({'_id': user_id})
+
+        self.assertEqual(compacted, (0, [user_id]))
+        self.assertEqual(user['email'], 'foo@foo.com')
+        self.assertIn('changes', user)
+        self.assertEqual(self.db.user_changes.count_documents({}), 0)
+
+
+class TestDatesMethods(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+
+        self.db = self.app.mongo.db
+
+    def tearDown(self):
+        pass
+
+    def test_convert_string_dates(self):
+        # Arrange
+        event_id = self.db.events.insert_one({'start_datetime': '2030-01-01T19:00:00+01:00',
+                                              'end_datetime': datetime(2030, 1, 1, 22)}).inserted_id
+
+        # Act
+        converted, invalid = convert_string_dates(self.db.events, EVENT_DATE_FIELDS)
+
+        # Assert
+        event = self.db.events.find_one({'_id': event_id})
+
+        self.assertEqual((converted, invalid), (1, []))
+        self.assertEqual(event['start_datetime'], datetime(2030, 1, 1, 18))
+        self.assertEqual(event['end_datetime'], datetime(2030, 1, 1, 22))
+
+    def test_convert_string_dates_invalid(self):
+        # Arrange
+        event_id = self.db.events.insert_one({'start_datetime': '2030-01-01', 'end_datetime': 'foo'}).inserted_id
+
+        # Act
+        converted, invalid = convert_string_dates(self.db.events, EVENT_DATE_FIELDS)
+
+        # Assert
+        self.assertEqual((converted, invalid), (0, [event_id]))
+        self.assertEqual(self.db.events.find_one({'_id': event_id})['start_datetime'], '2030-01-01')
+
+    def test_compact_changes_command_converts_dates(self):
+        # Arrange
+        event_id = self.db.events.insert_one({
+            'start_datetime': datetime(2030, 1, 1, 19),
+            'changes': [{'fields': {'start_datetime': '2030-01-02T19:00:00'}, 'updated_by_user': 'user'}]
+        }).inserted_id
+
+        # Act
+        result = self.app.test_cli_runner().invoke(db_cli, ['compact-changes'])
+
+        # Assert
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(self.db.events.find_one({'_id': event_id})['start_datetime'], datetime(2030, 1, 2, 19))
+
+    def test_compact_changes_command_reports_skipped_users(self):
+        # Arrange
+        ensure_indexes(self.db)
+
+        event_id = self.db.events.insert_one({
+            'start_datetime': datetime(2030, 1, 1, 19),
+            'changes': [{'fields': {'start_datetime': '2030-01-02T19:00:00'}, 'updated_by_user': 'user'}]
+        }).inserted_id
+
+        self.db.users.insert_one({'email': 'bar@bar.com'})
+        user_id = self.db.users.insert_one({
+            'email': 'foo@foo.com',
+            'changes': [{'fields': {'email': 'bar@bar.com'}, 'updated_by_user': 'user'}]
+        }).inserted_id
+
+        # Act
+        result = self.app.test_cli_runner().invoke(db_cli, ['compact-changes'])
+
+        # Assert
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn(str(user_id), result.output)
+        self.assertEqual(self.db.events.find_one({'_id': event_id})['start_datetime'], datetime(2030, 1, 2, 19))
+
+
+class TestClientsMethods(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+
+    def tearDown(self):
+        pass
+
+    def test_process_local_client_is_created_on_first_use(self):
+        # Arrange
+        factory = mock.Mock()
+
+        # Act
+        client = ProcessLocalClient(factory)
+
+        # Assert
+        factory.assert_not_called()
+
+        client.get('foo')
+        client.get('bar')
+
+        factory.assert_called_once()
+        factory.return_value.get.assert_called_with('bar')
+
+    def test_process_local_client_is_created_again_after_fork(self):
+        # Arrange
+        factory = mock.Mock(side_effect=[mock.Mock(), mock.Mock()])
+        client = ProcessLocalClient(factory)
+        parent_client = client.client
+
+        # Act
+        _reset_after_fork()
+
+        # Assert
+        self.assertIsNot(client.client, parent_client)
+        self.assertEqual(factory.call_count, 2)
+
+    def test_connection_pool_stats(self):
+        # Arrange
+        stats = ConnectionPoolStats()
+        event = SimpleNamespace(address=('localhost', 27017), connection_id=1)
+
+        # Act
+        for _ in range(3):
+            stats.connection_created(event)
+
+        stats.connection_closed(event)
+        stats.connection_checked_out(event)
+        stats.connection_checked_out(event)
+        stats.connection_checked_in(event)
+        stats.connection_check_out_failed(event)
+
+        # Assert
+        self.assertEqual(stats.stats(), {'open': 2, 'checked_out': 1, 'idle': 1, 'created': 3, 'closed': 1,
+                                         'check_out_failures': 1})
+
+    def test_mongo_pool_stats(self):
+        # Arrange
+        client = MongoClient(connect=False, maxPoolSize=5, event_listeners=[ConnectionPoolStats()])
+
+        # Act
+        stats = mongo_pool_stats(client)
+
+        # Assert
+        self.assertEqual(stats['max_pool_size'], 5)
+        self.assertEqual(stats['open'], 0)
+        self.assertIsNone(mongo_pool_stats(self.app.mongo))
+
+    def test_redis_pool_stats(self):
+        # Arrange
+        client = redis.Redis(max_connections=5)
+
+        # Act
+        stats = redis_pool_stats(client)
+
+        # Assert
+        self.assertEqual(stats, {'max_connections': 5, 'open': 0, 'checked_out': 0, 'idle': 0})
+        self.assertIsNone(redis_pool_stats(self.app.redis))
+
+    def test_get_pool_stats(self):
+        with self.app.test_client() as client:
+            # Arrange
+            user = create_user(self.app)
+            token = create_token(user, 60, self.app.config['SECRET_KEY'])
+
+            self.app.redis.get.return_value = token
+            self.app.redis.connection_pool = redis.ConnectionPool(max_connections=5)
+
+            # Act
+            response = client.get(Routes.STATS_POOLS_V1, headers={'Access-Token': token})
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertIsNone(response.json['data']['mongo'])
+            self.assertEqual(response.json['data']['redis']['max_connections'], 5)
+
+
+class TestSlowQueriesMethods(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+
+    def tearDown(self):
+        pass
+
+    def run_command(self, listener, command, duration_ms, request_id=1):
+        started = SimpleNamespace(command=command, command_name=next(iter(command)), connection_id=('localhost', 1),
+                                  request_id=request_id)
+        succeeded = SimpleNamespace(command_name=started.command_name, connection_id=('localhost', 1),
+                                    request_id=request_id, duration_micros=int(duration_ms * 1000))
+
+        listener.started(started)
+        listener.succeeded(succeeded)
+
+    def test_query_shape(self):
+        # Act
+        shape = query_shape('find', {'find': 'events', 'filter': {'_id': {'$gt': ObjectId()}, 'cuisine': {
+            '$in': ['Italian', 'Japanese']}}, 'sort': {'_id': 1}, 'limit': 21, 'lsid': {'id': 1}, '$db': 'mangia'})
+
+        # Assert
+        self.assertEqual(shape, 'events.find {"filter": {"_id": {"$gt": "?"}, "cuisine": {"$in": "?"}}, '
+                                '"sort": {"_id": 1}, "limit": "?"}')
+
+    def test_query_shape_bulk_statements_are_kept_once(self):
+        # Act
+        shape = query_shape('update', {'update': 'events', 'updates': [
+            {'q': {'_id': ObjectId()}, 'u': {'$set': {'name': 'foo'}}},
+            {'q': {'_id': ObjectId()}, 'u': {'$set': {'name': 'bar'}}}]})
+
+        # Assert
+        self.assertEqual(shape, 'events.update {"updates": [{"q": {"_id": "?"}, "u": {"$set": {"name": "?"}}}]}')
+
+    def test_slow_query_is_logged_with_route(self):
+        # Arrange
+        listener = SlowQueryListener(100, mock.Mock())
+        command = {'find': 'users', 'filter': {'email': 'foo@bar.com'}}
+
+        # Act
+        with self.app.test_request_context(Routes.USERS_V1):
+            self.app.preprocess_request()
+            self.run_command(listener, command, 150)
+            self.run_command(listener, command, 50, request_id=2)
+
+        self.run_command(listener, command, 250, request_id=3)
+
+        # Assert
+        self.assertEqual(listener.logger.warning.call_count, 2)
+        self.assertIn('Slow query on GET /api/v1/users: users.find {"filter": {"email": "?"}} took 150.0ms',
+                      listener.logger.warning.call_args_list[0][0][0])
+        self.assertNotIn('foo@bar.com', listener.logger.warning.call_args_list[0][0][0])
+        self.assertEqual(listener.stats(), [
+            {'shape': 'users.find {"filter": {"email": "?"}}', 'route': None, 'count': 1, 'total_ms': 250.0,
+             'max_ms': 250.0},
+            {'shape': 'users.find {"filter": {"email": "?"}}', 'route': 'GET /api/v1/users', 'count': 1,
+             'total_ms': 150.0, 'max_ms': 150.0}])
+
+    def test_get_slow_query_stats(self):
+        with self.app.test_client() as client:
+            # Arrange
+            user = create_user(self.app)
+            token = create_token(user, 60, self.app.config['SECRET_KEY'])
+
+            self.app.redis.get.return_value = token
+            self.run_command(self.app.slow_queries, {'find': 'events', 'filter': {}}, 500)
+
+            # Act
+            response = client.get(Routes.STATS_SLOW_QUERIES_V1, headers={'Access-Token': token})
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual(response.json['data'][0]['shape'], 'events.find {"filter": {}}')
+            self.assertEqual(response.json['data'][0]['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
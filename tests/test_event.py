@@ -1,13 +1,16 @@
 import unittest
 import os
+import json
+import base64
+import bson
 
 from flask import jsonify
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from api import create_app
+from api.counters.views import VIEW_COUNTS_KEY
 from api.resources.constants import HttpStatusCode, Routes
-from tests.utils import CustomAssertions, create_event, create_token, create_user
+from tests.utils import create_app, CustomAssertions, create_event, create_token, create_user
 
 os.environ['FLASK_ENV'] = 'testing'
 
@@ -53,6 +56,43 @@ class TestEventMethods(unittest.TestCase, CustomAssertions):
             # Assert
             self.assert_response(response, jsonify({'data': expected_event}).data, HttpStatusCode.HTTP_200_OK)
 
+    def test_get_event_with_fields(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(f'{Routes.EVENTS_V1}/{str(self.event["_id"])}?fields=name,cuisine')
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual(response.json['data'], {'_id': str(self.event['_id']), 'name': 'foo',
+                                                     'cuisine': ['Japanese']})
+
+    def test_get_event_invalid_fields(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(f'{Routes.EVENTS_V1}/{str(self.event["_id"])}?fields=changes')
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json['message'], {'fields': 'changes is not a valid field'})
+
+    def test_get_event_counts_view(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(f'{Routes.EVENTS_V1}/{str(self.event["_id"])}')
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.app.redis.hincrby.assert_called_once_with(VIEW_COUNTS_KEY, str(self.event['_id']), 1)
+
+    def test_get_event_not_found_does_not_count_view(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(f'{Routes.EVENTS_V1}/{str(ObjectId())}')
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_404_NOT_FOUND)
+            self.app.redis.hincrby.assert_not_called()
+
     def test_put_event_without_token(self):
         with self.app.test_client() as client:
             # Arrange
@@ -77,7 +117,7 @@ class TestEventMethods(unittest.TestCase, CustomAssertions):
             response = client.put(f'{Routes.EVENTS_V1}/{event_id}', headers={'Access-Token': token})
 
             # Assert
-            self.assert_response(response, b'[INVALID_TOKEN]', HttpStatusCode.HTTP_500_INTERNAL_SERVER_ERROR)
+            self.assert_response(response, b'[TOKEN_EXPIRED]', HttpStatusCode.HTTP_401_UNAUTHORIZED)
 
     def test_put_event_successful(self):
         with self.app.test_client() as client:
@@ -97,8 +137,109 @@ class TestEventMethods(unittest.TestCase, CustomAssertions):
             self.assert_response(response, b'', HttpStatusCode.HTTP_204_NO_CONTENT)
 
             event = self.app.mongo.db.events.find_one({'_id': self.event['_id']})
-            # TODO: Review this syntax of accessing collection and potentially check phone against event 'collection-view / consolidate-collection'
-            self.assertEqual(event['changes'][0]['fields']['max_guests_allowed'], fields['max_guests_allowed'])
+            change = self.app.mongo.db.event_changes.find_one({'event_id': self.event['_id']})
+
+            self.assertEqual(event['max_guests_allowed'], fields['max_guests_allowed'])
+            self.assertEqual(event['version'], 1)
+            self.assertNotIn('changes', event)
+            self.assertEqual(change['version'], 1)
+            self.assertEqual(change['fields'], fields)
+            self.assertEqual(change['updated_by_user'], str(self.user['_id']))
+
+    def test_put_event_not_found(self):
+        with self.app.test_client() as client:
+            # Arrange
+            token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+
+            self.app.redis.get.return_value = token
+
+            # Act
+            response = client.put(f'{Routes.EVENTS_V1}/{str(ObjectId())}', json={'max_guests_allowed': 8},
+                                  headers={'Access-Token': token})
+
+            # Assert
+            self.assert_response(response, b'[HTTP_404_NOT_FOUND]', HttpStatusCode.HTTP_404_NOT_FOUND)
+
+
+class TestEventReservationsMethods(unittest.TestCase, CustomAssertions):
+    def setUp(self):
+        self.app = create_app()
+
+        self.user = create_user(self.app)
+        self.event = create_event(self.app, str(self.user['_id']))
+
+        self.token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+
+        self.app.redis.get.return_value = self.token
+
+    def tearDown(self):
+        pass
+
+    def reserve(self, client, event_id):
+        return client.post(f'{Routes.EVENTS_V1}/{event_id}/reservations', headers={'Access-Token': self.token})
+
+    def test_post_reservation_without_token(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.post(f'{Routes.EVENTS_V1}/{str(self.event["_id"])}/reservations')
+
+            # Assert
+            self.assert_response(response, b'[HTTP_403_FORBIDDEN]', HttpStatusCode.HTTP_403_FORBIDDEN)
+
+    def test_post_reservation_invalid_id(self):
+        with self.app.test_client() as client:
+            # Act
+            response = self.reserve(client, '-1')
+
+            # Assert
+            self.assert_response(response, b'[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    def test_post_reservation_event_not_found(self):
+        with self.app.test_client() as client:
+            # Act
+            response = self.reserve(client, str(ObjectId()))
+
+            # Assert
+            self.assert_response(response, b'[HTTP_404_NOT_FOUND]', HttpStatusCode.HTTP_404_NOT_FOUND)
+
+    def test_post_reservation_successful(self):
+        with self.app.test_client() as client:
+            # Act
+            response = self.reserve(client, str(self.event['_id']))
+
+            # Assert
+            self.assert_response(response, b'[HTTP_201_CREATED]', HttpStatusCode.HTTP_201_CREATED)
+
+            event = self.app.mongo.db.events.find_one({'_id': self.event['_id']})
+
+            self.assertEqual(event['guests'], [str(self.user['_id'])])
+
+    def test_post_reservation_already_reserved(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.reserve(client, str(self.event['_id']))
+
+            # Act
+            response = self.reserve(client, str(self.event['_id']))
+
+            # Assert
+            self.assert_response(response, b'[ALREADY_RESERVED]', HttpStatusCode.HTTP_409_CONFLICT)
+
+    def test_post_reservation_event_full(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.mongo.db.events.update_one({'_id': self.event['_id']},
+                                                {'$set': {'max_guests_allowed': 2, 'guests': ['foo', 'bar']}})
+
+            # Act
+            response = self.reserve(client, str(self.event['_id']))
+
+            # Assert
+            self.assert_response(response, b'[EVENT_FULL]', HttpStatusCode.HTTP_409_CONFLICT)
+
+            event = self.app.mongo.db.events.find_one({'_id': self.event['_id']})
+
+            self.assertEqual(event['guests'], ['foo', 'bar'])
 
 
 class TestEventListMethods(unittest.TestCase, CustomAssertions):
@@ -126,7 +267,150 @@ class TestEventListMethods(unittest.TestCase, CustomAssertions):
             response = client.get(Routes.EVENTS_V1)
 
             # Assert
-            self.assert_response(response, jsonify({'data': events}).data, HttpStatusCode.HTTP_200_OK)
+            self.assert_response(response, jsonify({'data': events, 'next_cursor': None}).data,
+                                 HttpStatusCode.HTTP_200_OK)
+
+    def test_get_events_paginated(self):
+        with self.app.test_client() as client:
+            # Arrange
+            user_id = str(self.user['_id'])
+
+            expected_ids = [str(create_event(self.app, user_id)['_id']) for _ in range(3)]
+
+            # Act
+            first_page = client.get(f'{Routes.EVENTS_V1}?limit=2')
+            second_page = client.get(f'{Routes.EVENTS_V1}?limit=2&cursor={first_page.json["next_cursor"]}')
+
+            # Assert
+            self.assertEqual([event['_id'] for event in first_page.json['data']], expected_ids[:2])
+            self.assertEqual([event['_id'] for event in second_page.json['data']], expected_ids[2:])
+            self.assertIsNone(second_page.json['next_cursor'])
+
+    def test_get_events_limit_is_capped(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.config['MAX_PAGE_SIZE'] = 1
+
+            user_id = str(self.user['_id'])
+
+            create_event(self.app, user_id)
+            create_event(self.app, user_id)
+
+            # Act
+            response = client.get(f'{Routes.EVENTS_V1}?limit=50')
+
+            # Assert
+            self.assertEqual(len(response.json['data']), 1)
+            self.assertIsNotNone(response.json['next_cursor'])
+
+    def test_get_events_invalid_cursor(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(f'{Routes.EVENTS_V1}?cursor=foo')
+
+            # Assert
+            self.assert_response(response, b'[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    def test_get_events_cursor_without_list(self):
+        with self.app.test_client() as client:
+            # Arrange
+            cursor = base64.urlsafe_b64encode(bson.encode({'k': 5})).decode('ascii')
+
+            # Act
+            response = client.get(f'{Routes.EVENTS_V1}?cursor={cursor}')
+
+            # Assert
+            self.assert_response(response, b'[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    def test_get_events_invalid_limit(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(f'{Routes.EVENTS_V1}?limit=0')
+
+            # Assert
+            self.assert_response(response, b'[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    def test_get_events_by_ids(self):
+        with self.app.test_client() as client:
+            # Arrange
+            user_id = str(self.user['_id'])
+
+            first_id, second_id = [str(create_event(self.app, user_id)['_id']) for _ in range(2)]
+            missing_id = str(ObjectId())
+
+            # Act
+            response = client.get(f'{Routes.EVENTS_V1}?ids={second_id},{missing_id},foo,{first_id}')
+
+            # Assert
+            events = response.json['data']
+
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual([event['_id'] for event in events], [second_id, missing_id, 'foo', first_id])
+            self.assertEqual(events[0]['name'], 'foo')
+            self.assertEqual(events[1]['error'], '[HTTP_404_NOT_FOUND]')
+            self.assertEqual(events[2]['error'], '[HTTP_400_BAD_REQUEST]')
+
+    def test_get_events_with_fields(self):
+        with self.app.test_client() as client:
+            # Arrange
+            event = create_event(self.app, str(self.user['_id']))
+
+            # Act
+            response = client.get(f'{Routes.EVENTS_V1}?fields=name')
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual(response.json['data'], [{'_id': str(event['_id']), 'name': 'foo'}])
+
+    def test_lookup_events_too_many_ids(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.config['MAX_LOOKUP_IDS'] = 1
+
+            # Act
+            response = client.post(Routes.EVENTS_LOOKUP_V1, json={'ids': [str(ObjectId()), str(ObjectId())]})
+
+            # Assert
+            self.assert_response(response, b'[HTTP_413_PAYLOAD_TOO_LARGE]',
+                                 HttpStatusCode.HTTP_413_PAYLOAD_TOO_LARGE)
+
+    def test_lookup_events_null_ids(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.post(Routes.EVENTS_LOOKUP_V1, json={'ids': None})
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_400_BAD_REQUEST)
+            self.assertIsNotNone(response.json['message'].get('ids'))
+
+    def test_export_events_without_token(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(Routes.EVENTS_EXPORT_V1)
+
+            # Assert
+            self.assert_response(response, b'[HTTP_403_FORBIDDEN]', HttpStatusCode.HTTP_403_FORBIDDEN)
+
+    def test_export_events_successful(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.config['EXPORT_BATCH_SIZE'] = 2
+
+            user_id = str(self.user['_id'])
+
+            expected_ids = [str(create_event(self.app, user_id)['_id']) for _ in range(3)]
+
+            token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+
+            # Act
+            response = client.get(Routes.EVENTS_EXPORT_V1, headers={'Access-Token': token})
+
+            # Assert
+            events = [json.loads(line) for line in response.data.splitlines()]
+
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            self.assertEqual([event['_id'] for event in events], expected_ids)
 
     def test_post_event_without_request_args(self):
         with self.app.test_client() as client:
@@ -156,7 +440,7 @@ class TestEventListMethods(unittest.TestCase, CustomAssertions):
                 'price_per_person': 16.0,
                 'description': 'Brazilian food by foo2',
                 'published:': True,
-                'view_count:': 0,
+                'view_count': 0,
                 'created_by_user': user_id,
                 'created_datetime': datetime.utcnow()
             }
@@ -167,6 +451,261 @@ class TestEventListMethods(unittest.TestCase, CustomAssertions):
             # Assert
             self.assert_response(response, b'[HTTP_201_CREATED]', HttpStatusCode.HTTP_201_CREATED)
 
+            created_event = self.app.mongo.db.events.find_one({'name': 'foo2'})
+
+            self.assertLess(abs(created_event['start_datetime'] - event['start_datetime']), timedelta(seconds=1))
+
+    def test_post_event_invalid_datetime(self):
+        with self.app.test_client() as client:
+            # Arrange
+            token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+
+            event = {
+                'name': 'foo2',
+                'start_datetime': 'tomorrow',
+                'end_datetime': '2030-01-05T23:00:00',
+                'max_guests_allowed': 6,
+                'cuisine': ['Brazilian'],
+                'price_per_person': 16.0,
+                'description': 'Brazilian food by foo2'
+            }
+
+            # Act
+            response = client.post(Routes.EVENTS_V1, json=event, headers={'Access-Token': token})
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_400_BAD_REQUEST)
+            self.assertIsNotNone(response.json['message'].get('start_datetime'))
+
+
+class TestEventBulkMethods(unittest.TestCase, CustomAssertions):
+    def setUp(self):
+        self.app = create_app()
+
+        self.user = create_user(self.app)
+
+        self.token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+
+        self.event = {
+            'name': 'foo',
+            'start_datetime': '2030-01-05T18:00:00',
+            'end_datetime': '2030-01-05T23:00:00',
+            'max_guests_allowed': 6,
+            'cuisine': ['Brazilian'],
+            'price_per_person': 16.0,
+            'description': 'Brazilian food by foo'
+        }
+
+    def tearDown(self):
+        pass
+
+    def test_post_events_bulk_without_token(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.post(Routes.EVENTS_BULK_V1, json=[self.event])
+
+            # Assert
+            self.assert_response(response, b'[HTTP_403_FORBIDDEN]', HttpStatusCode.HTTP_403_FORBIDDEN)
+
+    def test_post_events_bulk_not_a_list(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.post(Routes.EVENTS_BULK_V1, json=self.event, headers={'Access-Token': self.token})
+
+            # Assert
+            self.assert_response(response, b'[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    def test_post_events_bulk_too_many_events(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.config['BULK_MAX_EVENTS'] = 1
+
+            # Act
+            response = client.post(Routes.EVENTS_BULK_V1, json=[self.event, self.event],
+                                   headers={'Access-Token': self.token})
+
+            # Assert
+            self.assert_response(response, b'[HTTP_413_PAYLOAD_TOO_LARGE]',
+                                 HttpStatusCode.HTTP_413_PAYLOAD_TOO_LARGE)
+
+    def test_post_events_bulk_successful(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.config['BULK_INSERT_CHUNK_SIZE'] = 2
+
+            invalid_event = dict(self.event, max_guests_allowed='many')
+
+            # Act
+            response = client.post(Routes.EVENTS_BULK_V1, json=[self.event, invalid_event, 'foo', self.event,
+                                                                self.event],
+                                   headers={'Access-Token': self.token})
+
+            # Assert
+            report = response.json['data']
+
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_207_MULTI_STATUS)
+            self.assertEqual([item['status'] for item in report], [201, 400, 400, 201, 201])
+            self.assertIsNotNone(report[1]['message'].get('max_guests_allowed'))
+            self.assertEqual(self.app.mongo.db.events.count_documents({}), 3)
+
+            event = self.app.mongo.db.events.find_one({'_id': ObjectId(report[0]['id'])})
+
+            self.assertEqual(event['host_id'], str(self.user['_id']))
+            self.assertEqual(event['start_datetime'], datetime(2030, 1, 5, 18))
+
+
+class TestEventSearchMethods(unittest.TestCase, CustomAssertions):
+    def setUp(self):
+        self.app = create_app()
+
+        self.user = create_user(self.app)
+
+        self.events = {}
+
+        for name, cuisine, day, price, max_guests_allowed in [('sushi', 'Japanese', 1, 30.0, 4),
+                                                              ('ramen', 'Japanese', 2, 15.0, 8),
+                                                              ('feijoada', 'Brazilian', 3, 20.0, 6),
+                                                              ('pasta', 'Italian', 4, 15.0, 10)]:
+            event = create_event(self.app, str(self.user['_id']))
+
+            self.app.mongo.db.events.update_one({'_id': event['_id']}, {
+                '$set': {
+                    'name': name,
+                    'cuisine': [cuisine],
+                    'start_datetime': datetime(2030, 1, day, 18),
+                    'price_per_person': price,
+                    'max_guests_allowed': max_guests_allowed
+                }
+            })
+
+            self.events[name] = str(event['_id'])
+
+    def tearDown(self):
+        pass
+
+    def search(self, client, query):
+        response = client.get(f'{Routes.EVENTS_SEARCH_V1}?{query}')
+
+        return [event['name'] for event in response.json['data']], response.json['next_cursor']
+
+    def test_search_events_without_filters(self):
+        with self.app.test_client() as client:
+            # Act
+            names, next_cursor = self.search(client, '')
+
+            # Assert
+            self.assertEqual(names, ['sushi', 'ramen', 'feijoada', 'pasta'])
+            self.assertIsNone(next_cursor)
+
+    def test_search_events_by_cuisine(self):
+        with self.app.test_client() as client:
+            # Act
+            names, _ = self.search(client, 'cuisine=Japanese&cuisine=Italian')
+
+            # Assert
+            self.assertEqual(names, ['sushi', 'ramen', 'pasta'])
+
+    def test_search_events_by_start_datetime(self):
+        with self.app.test_client() as client:
+            # Act
+            names, _ = self.search(client, 'start_from=2030-01-02T00:00:00&start_to=2030-01-03T23:59:59Z')
+
+            # Assert
+            self.assertEqual(names, ['ramen', 'feijoada'])
+
+    def test_search_events_by_price_and_guests(self):
+        with self.app.test_client() as client:
+            # Act
+            names, _ = self.search(client, 'price_min=10&price_max=20&guests=7')
+
+            # Assert
+            self.assertEqual(names, ['ramen', 'pasta'])
+
+    def test_search_events_sorted_by_price_paginated(self):
+        with self.app.test_client() as client:
+            # Act
+            first_names, next_cursor = self.search(client, 'sort=-price_per_person&limit=3')
+            second_names, last_cursor = self.search(client, f'sort=-price_per_person&limit=3&cursor={next_cursor}')
+
+            # Assert
+            self.assertEqual(first_names, ['sushi', 'feijoada', 'pasta'])
+            self.assertEqual(second_names, ['ramen'])
+            self.assertIsNone(last_cursor)
+
+    def test_search_events_sorted_by_null_price_paginated(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.mongo.db.events.update_one({'name': 'sushi'}, {'$set': {'price_per_person': None}})
+            self.app.mongo.db.events.update_one({'name': 'feijoada'}, {'$unset': {'price_per_person': ''}})
+
+            pages = {}
+
+            # Act
+            for sort in ('price_per_person', '-price_per_person'):
+                pages[sort] = []
+                names, next_cursor = self.search(client, f'sort={sort}&limit=1')
+
+                while names:
+                    pages[sort] += names
+                    names, next_cursor = self.search(client, f'sort={sort}&limit=1&cursor={next_cursor}') \
+                        if next_cursor else ([], None)
+
+            # Assert
+            self.assertEqual(pages['price_per_person'], ['sushi', 'feijoada', 'ramen', 'pasta'])
+            self.assertEqual(pages['-price_per_person'], ['pasta', 'ramen', 'feijoada', 'sushi'])
+
+    def test_search_events_with_fields_paginated(self):
+        with self.app.test_client() as client:
+            # Act
+            first_names, next_cursor = self.search(client, 'sort=price_per_person&limit=2&fields=name')
+            second_names, _ = self.search(client, f'sort=price_per_person&limit=2&fields=name&cursor={next_cursor}')
+
+            # Assert
+            self.assertEqual(first_names, ['ramen', 'pasta'])
+            self.assertEqual(second_names, ['feijoada', 'sushi'])
+
+    def test_search_events_invalid_sort(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(f'{Routes.EVENTS_SEARCH_V1}?sort=name')
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_400_BAD_REQUEST)
+            self.assertIsNotNone(response.json['message'].get('sort'))
+
+    def test_search_events_invalid_cursor(self):
+        with self.app.test_client() as client:
+            # Arrange
+            _, next_cursor = self.search(client, 'limit=1')
+
+            # Act
+            response = client.get(f'{Routes.EVENTS_V1}?cursor={next_cursor}')
+
+            # Assert
+            self.assert_response(response, b'[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    def test_search_events_cursor_with_query_operator(self):
+        with self.app.test_client() as client:
+            # Arrange
+            cursor = base64.urlsafe_b64encode(bson.encode({'k': [{'$ne': None}, ObjectId()]})).decode('ascii')
+
+            # Act
+            response = client.get(f'{Routes.EVENTS_SEARCH_V1}?cursor={cursor}')
+
+            # Assert
+            self.assert_response(response, b'[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
+    def test_search_events_cursor_of_other_sort(self):
+        with self.app.test_client() as client:
+            # Arrange
+            _, next_cursor = self.search(client, 'sort=price_per_person&limit=1')
+
+            # Act
+            response = client.get(f'{Routes.EVENTS_SEARCH_V1}?cursor={next_cursor}')
+
+            # Assert
+            self.assert_response(response, b'[HTTP_400_BAD_REQUEST]', HttpStatusCode.HTTP_400_BAD_REQUEST)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,196 @@
+import unittest
+import os
+
+from types import SimpleNamespace
+from unittest import mock
+
+import redis
+
+from api.db.clients import CommandTimingListener, TimedRedis
+from api.metrics import server_timing
+from api.metrics.prometheus import RequestMetrics
+from api.metrics.spans import finish_request, record, span, start_request
+from api.resources.constants import HttpStatusCode, Routes
+from config import TestingConfig
+from tests.utils import create_app, create_event, create_token, create_user
+
+os.environ['FLASK_ENV'] = 'testing'
+
+
+class TestSpansMethods(unittest.TestCase):
+    def tearDown(self):
+        finish_request()
+
+    def test_span_is_recorded_during_request(self):
+        # Arrange
+        start_request()
+
+        # Act
+        with span('jwt'):
+            pass
+
+        record('jwt', 0.5)
+
+        # Assert
+        spans = finish_request()
+
+        self.assertGreaterEqual(spans.durations['jwt'], 0.5)
+
+    def test_span_is_not_recorded_outside_request(self):
+        # Act
+        record('jwt', 0.5)
+
+        # Assert
+        self.assertIsNone(finish_request())
+
+    def test_command_timing_listener_records_mongo_span(self):
+        # Arrange
+        listener = CommandTimingListener()
+        start_request()
+
+        # Act
+        listener.succeeded(SimpleNamespace(duration_micros=1500))
+        listener.failed(SimpleNamespace(duration_micros=500))
+
+        # Assert
+        self.assertAlmostEqual(finish_request().durations['mongo'], 0.002)
+
+    def test_timed_redis_records_redis_span(self):
+        # Arrange
+        client = TimedRedis()
+        start_request()
+
+        # Act
+        with mock.patch.object(redis.Redis, 'execute_command', return_value=b'bar') as execute_command:
+            value = client.get('foo')
+
+        # Assert
+        execute_command.assert_called_with('GET', 'foo', keys=['foo'])
+        self.assertEqual(value, b'bar')
+        self.assertIn('redis', finish_request().durations)
+
+    def test_server_timing(self):
+        # Act
+        value = server_timing({'mongo': 0.0012, 'bcrypt': 0.25}, 0.2534)
+
+        # Assert
+        self.assertEqual(value, 'mongo;dur=1.200, bcrypt;dur=250.000, total;dur=253.400')
+
+
+class TestRequestMetricsMethods(unittest.TestCase):
+    def test_requests_are_added_when_rendered(self):
+        # Arrange
+        metrics = RequestMetrics((0.1, 1.0))
+
+        # Act
+        metrics.observe('GET', '/foo', '200', 0.05, {'mongo': 0.01})
+
+        # Assert
+        self.assertEqual(metrics.requests._values, {})
+        self.assertIn('http_requests_total{method="GET",route="/foo",status="200"} 1', metrics.render())
+        self.assertIn('http_request_span_duration_seconds_count{method="GET",route="/foo",span="mongo"} 1',
+                      metrics.render())
+
+    def test_requests_are_added_when_buffer_is_full(self):
+        # Arrange
+        metrics = RequestMetrics((0.1, 1.0), max_pending=2)
+
+        # Act
+        metrics.observe('GET', '/foo', '200', 0.05, {})
+        metrics.observe('GET', '/foo', '500', 0.5, {})
+
+        # Assert
+        self.assertEqual(metrics.requests._values, {('GET', '/foo', '200'): 1, ('GET', '/foo', '500'): 1})
+        self.assertEqual(metrics.errors._values, {('GET', '/foo'): 1})
+
+
+class TestMetricsMethods(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+
+        self.user = create_user(self.app)
+        self.token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+
+    def tearDown(self):
+        pass
+
+    def test_login_has_server_timing(self):
+        # Arrange
+        with mock.patch.object(TestingConfig, 'SERVER_TIMING_ENABLED', True):
+            app = create_app()
+
+        create_user(app)
+
+        with app.test_client() as client:
+            # Act
+            response = client.post(Routes.LOGIN_V1, json={'email': 'foo@foo.com', 'password': 'foo'})
+
+            # Assert
+            metrics = [metric.split(';')[0] for metric in response.headers['Server-Timing'].split(', ')]
+
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_201_CREATED)
+            self.assertEqual(metrics, ['bcrypt', 'jwt', 'total'])
+
+    def test_login_without_server_timing_by_default(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.post(Routes.LOGIN_V1, json={'email': 'foo@foo.com', 'password': 'foo'})
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_201_CREATED)
+            self.assertNotIn('Server-Timing', response.headers)
+
+    def test_metrics_without_token(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(Routes.METRICS)
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_403_FORBIDDEN)
+
+    def test_metrics_has_route_histogram(self):
+        with self.app.test_client() as client:
+            # Arrange
+            event = create_event(self.app, str(self.user['_id']))
+            client.get(f'{Routes.EVENTS_V1}/{str(event["_id"])}')
+
+            # Act
+            response = client.get(Routes.METRICS, headers={'Access-Token': self.token})
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual(response.mimetype, 'text/plain')
+            self.assertIn('http_request_duration_seconds_count{method="GET",route="/api/v1/events/<string:id>"} 1',
+                          response.get_data(as_text=True))
+            self.assertIn('http_requests_total{method="GET",route="/api/v1/events/<string:id>",status="200"} 1',
+                          response.get_data(as_text=True))
+
+    def test_metrics_has_error_count(self):
+        with self.app.test_client() as client:
+            # Arrange
+            with mock.patch('api.resources.auth.verify_token', side_effect=RuntimeError):
+                client.get(Routes.STATS_V1, headers={'Access-Token': 'foo'})
+
+            # Act
+            response = client.get(Routes.METRICS, headers={'Access-Token': self.token})
+
+            # Assert
+            self.assertIn('http_request_errors_total{method="GET",route="/api/v1/stats"} 1',
+                          response.get_data(as_text=True))
+
+    def test_metrics_disabled(self):
+        # Arrange
+        with mock.patch.object(TestingConfig, 'METRICS_ENABLED', False):
+            app = create_app()
+
+        with app.test_client() as client:
+            # Act
+            response = client.get(Routes.USERS_V1)
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertNotIn('Server-Timing', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
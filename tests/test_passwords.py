@@ -0,0 +1,101 @@
+import unittest
+import os
+import threading
+
+import bcrypt
+
+from api.passwords.hasher import PasswordHasher, PasswordHasherBusy
+
+
+def thread_names():
+    return [thread.name for thread in threading.enumerate()]
+
+
+def start_app_thread():
+    # Stands for the background threads of the app restarted in forked processes, see `api.cache`
+    threading.Thread(target=threading.Event().wait, name='token-denylist', daemon=True).start()
+
+
+class TestPasswordHasherMethods(unittest.TestCase):
+    def setUp(self):
+        self.hasher = PasswordHasher(rounds=4, workers=0, max_pending=1)
+
+    def tearDown(self):
+        pass
+
+    def test_hash_password_with_configured_rounds(self):
+        # Act
+        hashed_password, password_salt = self.hasher.hash('foo')
+
+        # Assert
+        self.assertTrue(hashed_password.startswith(password_salt))
+        self.assertFalse(self.hasher.needs_rehash(hashed_password))
+
+    def test_check_password(self):
+        # Arrange
+        hashed_password, _ = self.hasher.hash('foo')
+
+        # Act / Assert
+        self.assertTrue(self.hasher.check('foo', hashed_password))
+        self.assertFalse(self.hasher.check('not_foo', hashed_password))
+
+    def test_check_password_in_process_pool(self):
+        # Arrange
+        hasher = PasswordHasher(rounds=4, workers=1, max_pending=1)
+        hashed_password, _ = hasher.hash('foo')
+
+        # Act / Assert
+        self.assertTrue(hasher.check('foo', hashed_password))
+
+    def test_process_pool_starts_no_app_threads(self):
+        # Arrange
+        hasher = PasswordHasher(rounds=4, workers=1, max_pending=1)
+        os.register_at_fork(after_in_child=start_app_thread)
+
+        # Act
+        names = hasher._get_executor().submit(thread_names).result()
+
+        # Assert
+        self.assertNotIn('token-denylist', names)
+        self.assertNotEqual(hasher._get_executor()._mp_context.get_start_method(), 'fork')
+
+    def test_needs_rehash_other_rounds(self):
+        # Arrange
+        hashed_password = bcrypt.hashpw(b'foo', bcrypt.gensalt(5))
+
+        # Act / Assert
+        self.assertTrue(self.hasher.needs_rehash(hashed_password))
+
+    def test_needs_rehash_malformed_hash(self):
+        # Act / Assert
+        for hashed_password in (b'5f4dcc3b5aa765d61d8327deb882cf99', b'$2b$xx$foo', None):
+            self.assertTrue(self.hasher.needs_rehash(hashed_password))
+
+    def test_needs_rehash_hash_stored_as_str(self):
+        # Arrange
+        hashed_password = bcrypt.hashpw(b'foo', bcrypt.gensalt(4)).decode('utf-8')
+
+        # Act / Assert
+        self.assertFalse(self.hasher.needs_rehash(hashed_password))
+
+    def test_hash_password_busy(self):
+        # Arrange
+        self.hasher._pending.acquire()
+
+        # Act / Assert
+        with self.assertRaises(PasswordHasherBusy):
+            self.hasher.hash('foo')
+
+    def test_hash_password_unbounded_pending(self):
+        # Arrange
+        hasher = PasswordHasher(rounds=4, workers=0, max_pending=0)
+
+        # Act
+        hashed_password, password_salt = hasher.hash('foo')
+
+        # Assert
+        self.assertTrue(hasher.check('foo', hashed_password))
+
+
+if __name__ == '__main__':
+    unittest.main()
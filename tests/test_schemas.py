@@ -0,0 +1,145 @@
+import unittest
+import os
+
+from datetime import datetime
+from werkzeug.datastructures import MultiDict
+
+from api.schemas import Field, Schema, ValidationError, parse_boolean, parse_datetime
+from tests.utils import create_app
+
+os.environ['FLASK_ENV'] = 'testing'
+
+
+class TestSchemaMethods(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+
+        self.schema = Schema(
+            Field('name'),
+            Field('start_datetime', type=parse_datetime),
+            Field('max_guests_allowed', type=int),
+            Field('cuisine', many=True),
+            Field('sort', required=False, default='start_datetime', choices=('start_datetime', 'price_per_person'))
+        )
+
+        self.source = {
+            'name': 'foo',
+            'start_datetime': '2030-01-05T18:30:00+02:00',
+            'max_guests_allowed': '10',
+            'cuisine': 'Japanese'
+        }
+
+    def tearDown(self):
+        pass
+
+    def test_validate_converts_arguments(self):
+        # Act
+        args = self.schema.validate(self.source)
+
+        # Assert
+        self.assertEqual(args, {
+            'name': 'foo',
+            'start_datetime': datetime(2030, 1, 5, 16, 30),
+            'max_guests_allowed': 10,
+            'cuisine': ['Japanese'],
+            'sort': 'start_datetime'
+        })
+
+    def test_validate_missing_required_argument(self):
+        # Arrange
+        del self.source['name']
+
+        # Act
+        with self.assertRaises(ValidationError) as context:
+            self.schema.validate(self.source)
+
+        # Assert
+        self.assertEqual(context.exception.errors, {'name': 'Missing required parameter in the JSON body'})
+
+    def test_validate_null_required_argument(self):
+        # Arrange
+        self.source['cuisine'] = None
+
+        # Act
+        with self.assertRaises(ValidationError) as context:
+            self.schema.validate(self.source)
+
+        # Assert
+        self.assertEqual(context.exception.errors, {'cuisine': 'Missing required parameter in the JSON body'})
+
+    def test_validate_invalid_argument(self):
+        # Arrange
+        self.source['max_guests_allowed'] = 'ten'
+
+        # Act
+        with self.assertRaises(ValidationError) as context:
+            self.schema.validate(self.source)
+
+        # Assert
+        self.assertIn('max_guests_allowed', context.exception.errors)
+
+    def test_validate_invalid_choice(self):
+        # Arrange
+        self.source['sort'] = 'name'
+
+        # Act / Assert
+        with self.assertRaises(ValidationError):
+            self.schema.validate(self.source)
+
+    def test_validate_multi_dict(self):
+        # Arrange
+        source = MultiDict([('cuisine', 'Japanese'), ('cuisine', 'Brazilian')])
+        schema = Schema(Field('cuisine', many=True), location='args')
+
+        # Act
+        args = schema.validate(source)
+
+        # Assert
+        self.assertEqual(args['cuisine'], ['Japanese', 'Brazilian'])
+
+    def test_partial_makes_fields_optional(self):
+        # Arrange
+        schema = self.schema.partial(Field('rating', required=False))
+
+        # Act
+        args = schema.validate({'rating': '5'})
+
+        # Assert
+        self.assertIsNone(args['name'])
+        self.assertEqual(args['rating'], '5')
+        self.assertTrue(self.schema.fields[0].required)
+
+    def test_parse_aborts_with_bad_request(self):
+        # Arrange
+        with self.app.test_client() as client:
+            # Act
+            response = client.post('/api/v1/users', json={'email': 'foo@bar.com'})
+
+        # Assert
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['message'], {'first_name': 'Missing required parameter in the JSON body'})
+
+    def test_parse_boolean(self):
+        # Act / Assert
+        self.assertTrue(parse_boolean('true'))
+        self.assertFalse(parse_boolean('false'))
+        self.assertFalse(parse_boolean(False))
+
+        with self.assertRaises(ValueError):
+            parse_boolean('foo')
+
+    def test_parse_datetime_http_date(self):
+        # Act
+        value = parse_datetime('Sat, 05 Jan 2030 18:30:00 GMT')
+
+        # Assert
+        self.assertEqual(value, datetime(2030, 1, 5, 18, 30))
+
+    def test_parse_datetime_invalid(self):
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            parse_datetime('foo')
+
+
+if __name__ == '__main__':
+    unittest.main()
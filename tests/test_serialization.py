@@ -0,0 +1,74 @@
+import unittest
+import os
+
+from bson import ObjectId
+from datetime import datetime, timezone, timedelta
+
+from api.serialization import JSONProvider, OrjsonProvider, to_json_default
+from tests.utils import create_app
+
+os.environ['FLASK_ENV'] = 'testing'
+
+
+class TestSerializationMethods(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+
+        self.document = {
+            '_id': ObjectId('5f0c5a3c8e1b2a3d4c5b6a79'),
+            'hashed_password': b'$2b$04$foo',
+            'created_datetime': datetime(2030, 1, 5, 18, 30),
+            'cuisine': ['Japanese'],
+            'price_per_person': 16.0
+        }
+
+        self.expected = {
+            '_id': '5f0c5a3c8e1b2a3d4c5b6a79',
+            'hashed_password': '$2b$04$foo',
+            'created_datetime': '2030-01-05T18:30:00+00:00',
+            'cuisine': ['Japanese'],
+            'price_per_person': 16.0
+        }
+
+    def tearDown(self):
+        pass
+
+    def test_to_json_default_datetime_with_timezone(self):
+        # Arrange
+        value = datetime(2030, 1, 5, 20, 30, tzinfo=timezone(timedelta(hours=2)))
+
+        # Act / Assert
+        self.assertEqual(to_json_default(value), '2030-01-05T20:30:00+02:00')
+
+    def test_to_json_default_not_serializable(self):
+        # Act / Assert
+        with self.assertRaises(TypeError):
+            to_json_default(object())
+
+    def test_orjson_provider_is_default(self):
+        # Assert
+        self.assertIsInstance(self.app.json, OrjsonProvider)
+
+    def test_providers_encode_documents_alike(self):
+        # Arrange
+        providers = [OrjsonProvider(self.app), JSONProvider(self.app)]
+
+        for provider in providers:
+            # Act
+            encoded = provider.dumps(self.document)
+
+            # Assert
+            self.assertEqual(provider.loads(encoded), self.expected)
+
+    def test_response_encodes_documents(self):
+        with self.app.app_context():
+            # Act
+            response = self.app.json.response({'data': self.document})
+
+            # Assert
+            self.assertEqual(response.mimetype, 'application/json')
+            self.assertEqual(response.json, {'data': self.expected})
+
+
+if __name__ == '__main__':
+    unittest.main()
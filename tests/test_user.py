@@ -1,12 +1,15 @@
 import unittest
 import os
+import json
 
 from flask import jsonify
 from bson import ObjectId
+from unittest import mock
 
-from api import create_app
+from api.cache.session import SESSION_INVALIDATION_CHANNEL
 from api.resources.constants import HttpStatusCode, Routes
-from tests.utils import CustomAssertions, create_token, create_user
+from config import TestingConfig
+from tests.utils import create_app, CustomAssertions, create_token, create_user
 
 os.environ['FLASK_ENV'] = 'testing'
 
@@ -44,8 +47,8 @@ class TestUserMethods(unittest.TestCase, CustomAssertions):
             # Arrange
             expected_user = self.user
             expected_user['_id'] = str(expected_user['_id'])
-            expected_user['hashed_password'] = expected_user['hashed_password'].decode('utf-8')
-            expected_user['password_salt'] = expected_user['password_salt'].decode('utf-8')
+            del expected_user['hashed_password']
+            del expected_user['password_salt']
 
             # Act
             response = client.get(f'{Routes.USERS_V1}/{expected_user["_id"]}')
@@ -53,6 +56,25 @@ class TestUserMethods(unittest.TestCase, CustomAssertions):
             # Assert
             self.assert_response(response, jsonify({'data': expected_user}).data, HttpStatusCode.HTTP_200_OK)
 
+    def test_get_user_with_fields(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(f'{Routes.USERS_V1}/{str(self.user["_id"])}?fields=first_name, last_name')
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual(response.json['data'], {'_id': str(self.user['_id']), 'first_name': 'foo',
+                                                     'last_name': 'foo'})
+
+    def test_get_user_with_hidden_field(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(f'{Routes.USERS_V1}/{str(self.user["_id"])}?fields=email,hashed_password')
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json['message'], {'fields': 'hashed_password is not a valid field'})
+
     def test_put_user_without_token(self):
         with self.app.test_client() as client:
             # Act
@@ -74,7 +96,7 @@ class TestUserMethods(unittest.TestCase, CustomAssertions):
             response = client.put(f'{Routes.USERS_V1}/{user_id}', headers={'Access-Token': token})
 
             # Assert
-            self.assert_response(response, b'[INVALID_TOKEN]', HttpStatusCode.HTTP_500_INTERNAL_SERVER_ERROR)
+            self.assert_response(response, b'[TOKEN_EXPIRED]', HttpStatusCode.HTTP_401_UNAUTHORIZED)
 
     def test_put_user_successful(self):
         with self.app.test_client() as client:
@@ -94,8 +116,53 @@ class TestUserMethods(unittest.TestCase, CustomAssertions):
             self.assert_response(response, b'', HttpStatusCode.HTTP_204_NO_CONTENT)
 
             user = self.app.mongo.db.users.find_one({'_id': self.user['_id']})
-            # TODO: Review this syntax of accessing collection and potentially check phone against user 'collection-view / consolidate-collection'
-            self.assertEqual(user['changes'][0]['fields']['phone'], fields['phone'])
+            change = self.app.mongo.db.user_changes.find_one({'user_id': self.user['_id']})
+
+            self.assertEqual(user['phone'], fields['phone'])
+            self.assertEqual(change['version'], user['version'])
+            self.assertEqual(change['fields'], fields)
+            self.app.redis.publish.assert_called_with(SESSION_INVALIDATION_CHANNEL, f'auth|{user_id}')
+
+    def test_put_user_password_is_hashed(self):
+        with self.app.test_client() as client:
+            # Arrange
+            user_id = str(self.user['_id'])
+
+            token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+
+            self.app.redis.get.return_value = token
+
+            # Act
+            response = client.put(f'{Routes.USERS_V1}/{user_id}', json={'password': 'bar'},
+                                  headers={'Access-Token': token})
+
+            # Assert
+            self.assert_response(response, b'', HttpStatusCode.HTTP_204_NO_CONTENT)
+
+            user = self.app.mongo.db.users.find_one({'_id': self.user['_id']})
+            change = self.app.mongo.db.user_changes.find_one({'user_id': self.user['_id']})
+
+            self.assertNotIn('password', user)
+            self.assertTrue(self.app.password_hasher.check('bar', user['hashed_password']))
+            self.assertEqual(change['fields'], {'password_changed': True})
+
+    def test_put_user_email_already_exists(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.mongo.db.users.insert_one({'email': 'foo2@foo.com'})
+
+            user_id = str(self.user['_id'])
+
+            token = create_token(self.user, 60, self.app.config['SECRET_KEY'])
+
+            self.app.redis.get.return_value = token
+
+            # Act
+            response = client.put(f'{Routes.USERS_V1}/{user_id}', json={'email': 'foo2@foo.com'},
+                                  headers={'Access-Token': token})
+
+            # Assert
+            self.assert_response(response, b'[HTTP_409_CONFLICT]', HttpStatusCode.HTTP_409_CONFLICT)
 
 
 class TestUserListMethods(unittest.TestCase, CustomAssertions):
@@ -116,15 +183,98 @@ class TestUserListMethods(unittest.TestCase, CustomAssertions):
 
             for user in collection:
                 user['_id'] = str(user['_id'])
-                user['hashed_password'] = user['hashed_password'].decode('utf-8')
-                user['password_salt'] = user['password_salt'].decode('utf-8')
+                del user['hashed_password']
+                del user['password_salt']
                 users.append(user)
 
             # Act
             response = client.get(Routes.USERS_V1)
 
             # Assert
-            self.assert_response(response, jsonify({'data': users}).data, HttpStatusCode.HTTP_200_OK)
+            self.assert_response(response, jsonify({'data': users, 'next_cursor': None}).data,
+                                 HttpStatusCode.HTTP_200_OK)
+
+    def test_get_users_paginated(self):
+        with self.app.test_client() as client:
+            # Arrange
+            user = self.app.mongo.db.users.find_one({'email': 'foo@foo.com'})
+            user.pop('_id')
+            user['email'] = 'foo2@foo.com'
+            self.app.mongo.db.users.insert_one(user)
+
+            expected_ids = [str(user['_id']) for user in self.app.mongo.db.users.find()]
+
+            # Act
+            first_page = client.get(f'{Routes.USERS_V1}?limit=1')
+            second_page = client.get(f'{Routes.USERS_V1}?limit=1&cursor={first_page.json["next_cursor"]}')
+
+            # Assert
+            self.assertEqual([user['_id'] for user in first_page.json['data']], expected_ids[:1])
+            self.assertEqual([user['_id'] for user in second_page.json['data']], expected_ids[1:])
+            self.assertIsNone(second_page.json['next_cursor'])
+
+    def test_lookup_users_successful(self):
+        with self.app.test_client() as client:
+            # Arrange
+            user_id = str(self.app.mongo.db.users.find_one({'email': 'foo@foo.com'})['_id'])
+            missing_id = str(ObjectId())
+
+            # Act
+            response = client.post(Routes.USERS_LOOKUP_V1, json={'ids': [missing_id, user_id, user_id]})
+
+            # Assert
+            users = response.json['data']
+
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual([user['_id'] for user in users], [missing_id, user_id, user_id])
+            self.assertEqual(users[0]['error'], '[HTTP_404_NOT_FOUND]')
+            self.assertEqual(users[1]['email'], 'foo@foo.com')
+            self.assertEqual(users[1], users[2])
+
+    def test_lookup_users_without_ids(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.post(Routes.USERS_LOOKUP_V1, json={})
+
+            # Assert
+            self.assertIsNotNone(response.json['message'].get('ids'))
+
+    def test_lookup_users_null_ids(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.post(Routes.USERS_LOOKUP_V1, json={'ids': None})
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_400_BAD_REQUEST)
+            self.assertIsNotNone(response.json['message'].get('ids'))
+
+    def test_export_users_successful(self):
+        with self.app.test_client() as client:
+            # Arrange
+            user = self.app.mongo.db.users.find_one({'email': 'foo@foo.com'})
+
+            token = create_token(user, 60, self.app.config['SECRET_KEY'])
+
+            # Act
+            response = client.get(Routes.USERS_EXPORT_V1, headers={'Access-Token': token})
+
+            # Assert
+            users = [json.loads(line) for line in response.data.splitlines()]
+
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual(len(users), 1)
+            self.assertEqual(users[0]['_id'], str(user['_id']))
+            self.assertNotIn('hashed_password', users[0])
+            self.assertNotIn('password_salt', users[0])
+
+    def test_get_users_with_fields(self):
+        with self.app.test_client() as client:
+            # Act
+            response = client.get(f'{Routes.USERS_V1}?fields=email')
+
+            # Assert
+            self.assertEqual(response.status_code, HttpStatusCode.HTTP_200_OK)
+            self.assertEqual([set(user) for user in response.json['data']], [{'_id', 'email'}])
 
     def test_post_user_without_request_args(self):
         with self.app.test_client() as client:
@@ -150,6 +300,55 @@ class TestUserListMethods(unittest.TestCase, CustomAssertions):
 
             # Assert
             self.assert_response(response, b'[HTTP_409_CONFLICT]', HttpStatusCode.HTTP_409_CONFLICT)
+            self.assertEqual(self.app.mongo.db.users.count_documents({'email': 'foo@foo.com'}), 1)
+
+    def test_post_user_before_indexes_are_created(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.indexes_ready.clear()
+
+            # Act
+            response = client.post(Routes.USERS_V1, json={'email': 'bar@bar.com', 'first_name': 'bar',
+                                                          'last_name': 'bar', 'password': 'bar', 'phone': '+49'})
+
+            # Assert
+            self.assert_response(response, b'[HTTP_503_SERVICE_UNAVAILABLE]',
+                                 HttpStatusCode.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertIsNone(self.app.mongo.db.users.find_one({'email': 'bar@bar.com'}))
+
+    def test_post_user_rate_limited(self):
+        with self.app.test_client() as client:
+            # Arrange
+            self.app.config['RATE_LIMIT_ENABLED'] = True
+            self.app.redis.eval.return_value = 120000
+
+            # Act
+            response = client.post(Routes.USERS_V1, json={'email': 'bar@bar.com', 'first_name': 'bar',
+                                                          'last_name': 'bar', 'password': 'bar', 'phone': '+49'})
+
+            # Assert
+            self.assert_response(response, b'[HTTP_429_TOO_MANY_REQUESTS]', HttpStatusCode.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(response.headers['Retry-After'], '120')
+            self.assertIsNone(self.app.mongo.db.users.find_one({'email': 'bar@bar.com'}))
+            self.assertEqual(self.app.redis.eval.call_args[0][2:4], ('rate-limit|registration|ip|127.0.0.1',
+                                                                    'rate-limit|registration|email|bar@bar.com'))
+
+    def test_post_user_rate_limited_by_forwarded_ip(self):
+        # Arrange
+        with mock.patch.object(TestingConfig, 'PROXY_FIX_X_FOR', 1):
+            app = create_app()
+
+        app.config['RATE_LIMIT_ENABLED'] = True
+        app.redis.eval.return_value = 120000
+
+        with app.test_client() as client:
+            # Act
+            client.post(Routes.USERS_V1, json={'email': 'bar@bar.com', 'first_name': 'bar', 'last_name': 'bar',
+                                               'password': 'bar', 'phone': '+49'},
+                        headers={'X-Forwarded-For': '203.0.113.7, 10.0.0.1'})
+
+            # Assert
+            self.assertEqual(app.redis.eval.call_args[0][2], 'rate-limit|registration|ip|10.0.0.1')
 
     def test_post_user_successful(self):
         with self.app.test_client() as client:
@@ -166,7 +365,11 @@ class TestUserListMethods(unittest.TestCase, CustomAssertions):
             response = client.post(Routes.USERS_V1, json=user)
 
             # Assert
+            created_user = self.app.mongo.db.users.find_one({'email': 'foo2@foo.com'})
+
             self.assert_response(response, b'[HTTP_201_CREATED]', HttpStatusCode.HTTP_201_CREATED)
+            self.assertEqual(created_user['created_by_user'], str(created_user['_id']))
+            self.assertTrue(self.app.password_hasher.check('654321', created_user['hashed_password']))
 
 
 if __name__ == '__main__':
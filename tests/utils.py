@@ -1,10 +1,28 @@
 import unittest
+import os
 import jwt
 import bcrypt
+import uuid
 
 from datetime import datetime, timedelta
 
 
+def create_app():
+    """
+    This function creates the app under test with the factory named in `API_FACTORY`:
+
+    - `wsgi` (default): `api.create_app`
+    - `asgi`: `api.asgi.create_asgi_app`, whose test client sends the requests through the ASGI app
+    """
+
+    if os.environ.get('API_FACTORY', 'wsgi') == 'asgi':
+        from api.asgi import create_asgi_app
+        return create_asgi_app().app
+
+    from api import create_app
+    return create_app()
+
+
 def create_event(app, user_id):
     """
     This function creates a test event in mongomock to be used throughout the tests
@@ -20,7 +38,7 @@ def create_event(app, user_id):
         'price_per_person': 16.0,
         'description': 'Japanese food by foo',
         'published:': True,
-        'view_count:': 0,
+        'view_count': 0,
         'created_by_user': user_id,
         'created_datetime': datetime.utcnow()
     }
@@ -51,13 +69,15 @@ def create_user(app):
     return app.mongo.db.users.find_one({ 'email': user['email'] })
 
 
-def create_token(user, expiration: int, secret: str):
+def create_token(user, expiration: int, secret: str, sid: str = 'session', token_type: str = 'access'):
     """
     This function creates a jwt token for the test user
 
     :param user: The user to be encoded (`_id`, `email` and `phone` are required attributes). 
     :param expiration: The expiration in days
     :param secret: The token secret
+    :param sid: The id of the session of the token
+    :param token_type: The type of the token, `access` or `refresh`
     :return: A jwt token
 
     """
@@ -69,7 +89,10 @@ def create_token(user, expiration: int, secret: str):
         'iat': datetime.utcnow(),
         'sub': f'auth|{user_id}',
         'email': user['email'],
-        'phone:': user['phone']
+        'phone:': user['phone'],
+        'sid': sid,
+        'jti': uuid.uuid4().hex,
+        'type': token_type
     }
 
     return jwt.encode(payload, secret, algorithm='HS256').decode('utf-8')